@@ -0,0 +1,15 @@
+from td.models.streaming import LevelOneEquityData
+from td.streaming.benchmark import format_results, run_load_test
+from samples.stream_client.example_handlers import QuoteHandler
+
+# Benchmarks the client against the local stand-in streamer, no login needed
+quote_handler = QuoteHandler(LevelOneEquityData, use_records=True)
+
+results = run_load_test(
+    rates=[100, 1000, 5000, 10000, 20000],
+    duration=5,
+    service="QUOTE",
+    symbols=["SPY", "QQQ", "IWM"],
+    handler=quote_handler.data_message_handler,
+)
+print(format_results(results))
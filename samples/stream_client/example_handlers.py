@@ -29,8 +29,8 @@ from td.utils.helpers import dict_to_json, get_default_file_path, save_raw_json
 class SymbolDataUpdater(BaseDataMessageHandler):
     """Handles data messages related to symbol data."""
 
-    def __init__(self, model):
-        super().__init__(model)
+    def __init__(self, model, use_records=False):
+        super().__init__(model, use_records)
         self.latest_data_by_symbol = {}
         self.latest_message = None
         self.subscribers = {}
@@ -69,12 +69,19 @@ class SymbolDataUpdater(BaseDataMessageHandler):
 
     async def handle_debug(self):
         self.log.debug("\n")
-        print_json(self.latest_message.model_dump_json(exclude_none=True))
+        message = self.latest_message
+        if self.use_records:
+            message = message.to_model()
+        print_json(message.model_dump_json(exclude_none=True))
+
+    def _to_dict(self, data):
+        """Records and models both sent as dicts of their fields."""
+        return data.to_dict() if self.use_records else data.dict()
 
     async def subscribe_websocket(self, websocket, symbol):
         if symbol in self.latest_data_by_symbol:
             await websocket.send_json(
-                [x.dict() for x in self.latest_data_by_symbol[symbol]]
+                [self._to_dict(x) for x in self.latest_data_by_symbol[symbol]]
             )
         if websocket not in self.subscribers:
             self.subscribers[websocket] = set()
@@ -91,7 +98,7 @@ class SymbolDataUpdater(BaseDataMessageHandler):
             for ws, symbols in self.subscribers.items():
                 for data in data_list:
                     if data.symbol in symbols:
-                        await ws.send_json(data.dict())
+                        await ws.send_json(self._to_dict(data))
 
     def get_latest_data(self, symbol):
         return self.latest_data_by_symbol.get(symbol, None)
@@ -164,6 +171,8 @@ chart_equity_handler = ChartDataHandler(ChartEquityData)
 book_handler = BookHandler(LevelTwoBookData)
 
 level_one_handler = QuoteHandler(LevelOneEquityData)
+# Compact records instead of validated models, e.g. for large watchlists
+# level_one_handler = QuoteHandler(LevelOneEquityData, use_records=True)
 level_one_options_handler = QuoteHandler(LevelOneOptionData)
 level_one_futures_handler = QuoteHandler(LevelOneFuturesData)
 level_one_forex_handler = QuoteHandler(LevelOneForexData)
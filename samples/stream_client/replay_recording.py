@@ -0,0 +1,42 @@
+import asyncio
+import sys
+
+from td.client import TdAmeritradeClient
+from td.streaming.replay import StreamReplayer, make_offline_client
+from samples.stream_client.example_handlers import level_one_handler
+
+RECORDING_DIRECTORY = "recordings/quotes"
+
+
+async def record(seconds: int):
+    """Records the raw SPY / QQQ quote frames."""
+    td_client = TdAmeritradeClient()
+    stream_client = td_client.streaming_api_client()
+    stream_client.open_stream(asyncio.get_running_loop())
+    stream_client.start_recording(RECORDING_DIRECTORY)
+
+    stream_client.services.level_one_quotes(symbols=["SPY", "QQQ"])
+    await asyncio.sleep(seconds)
+
+    print(stream_client.stop_recording().stats())
+
+
+def replay(speed: float | None):
+    """Replays the recording through the level one handler, no login needed."""
+    stream_client = make_offline_client()
+    stream_client.add_handler("data", "QUOTE", level_one_handler.data_message_handler)
+
+    replayer = StreamReplayer(
+        stream_client, RECORDING_DIRECTORY, speed=speed, wait_for_handlers=True
+    )
+    print(replayer.replay())
+    print(stream_client.get_handler_stats())
+    print(level_one_handler.latest_data_by_symbol)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "record":
+        asyncio.run(record(60))
+    else:
+        # None replays as fast as the handler allows, 1.0 at the recorded pace
+        replay(speed=None)
@@ -3,13 +3,16 @@ import asyncio
 from td.client import TdAmeritradeClient
 from td.enums.enums import QOSLevel
 from td.config import TdConfiguration
-
-# from samples.stream_client.example_handlers import news_handler
+from td.streaming.account_state import AccountStateEngine
 
 
 async def callback_func(msg):
-    # pass
-    print(msg)
+    pass
+    # print(msg)
+
+
+def on_account_update(event):
+    print(event)
 
 
 config = TdConfiguration()
@@ -17,25 +20,32 @@ td_client = TdAmeritradeClient()
 stream_client = td_client.streaming_api_client(on_message_received=callback_func)
 stream_services = stream_client.services
 
+account_state = AccountStateEngine(
+    accounts_service=td_client.accounts(),
+    stream_client=stream_client,
+    account_id=config.accounts.default_account,
+    reconcile_interval=60,
+    on_update=on_account_update,
+)
+
 
 async def run_td_stream_client():
     stream_client.open_stream(asyncio.get_running_loop())
     stream_services.quality_of_service(qos_level=QOSLevel.EXPRESS)
 
 
-async def add_account_activity_handler():
-    pass
-    # TODO: Implement Handlers for ACCT_ACTIVITY
-    # stream_services.add_handler("data", "NEWS_HEADLINE", news_handler.data_message_handler)
-
-
 async def main():
     await run_td_stream_client()
-    await add_account_activity_handler()
 
-    stream_services.account_activity()
+    # Seeds from get_accounts, adds the ACCT_ACTIVITY handler and subscribes
+    await asyncio.get_running_loop().run_in_executor(None, account_state.start)
 
-    await asyncio.sleep(30)
+    for _ in range(6):
+        await asyncio.sleep(5)
+        print(f"Cash: {account_state.cash_balance}")
+        for symbol, position in account_state.positions.items():
+            print(f"{symbol}: long {position.long_quantity}, short {position.short_quantity}")
+        print(f"Open orders: {list(account_state.open_orders)}")
 
 
 if __name__ == "__main__":
@@ -24,8 +24,6 @@ td_client = TdAmeritradeClient()
 stream_client = td_client.streaming_api_client(on_message_received=callback_func)
 stream_services = stream_client.services
 
-chart_history_symbol_queue = asyncio.Queue()
-
 try:
     tda_futures_csv_path = Path(config.symbols.tda_future_symbols_path)
 except AttributeError:
@@ -43,73 +41,49 @@ async def run_td_stream_client():
     stream_services.quality_of_service(qos_level=QOSLevel.EXPRESS)
 
 
-async def bulk_add_to_chart_history_symbol_queue(
-    futures_list, timeframe_list, start_date, end_date
-):
-    for future in futures_list:
-        for timeframe in timeframe_list:
-            await chart_history_symbol_queue.put(
-                (future, timeframe, start_date, end_date)
-            )
-
-
-async def get_futures_data():
-    while True:
-        future, timeframe, start_date, end_date = await chart_history_symbol_queue.get()
-
-        handled_event = asyncio.Event()
-
-        async def chart_history_handler_func(msg):
-            await chart_history_handler.snapshot_message_handler(
-                handled_event, future, timeframe, msg
-            )
-
-        func_ref = chart_history_handler_func
-        stream_services.add_handler("snapshot", "CHART_HISTORY_FUTURES", func_ref)
-
-        print(f"Attempting to pull data for {future}, {timeframe}")
-        if timeframe == "minute":
-            chart_futures_frequencies = ChartFuturesFrequencies.ONE_MINUTE
-        elif timeframe == "daily":
-            chart_futures_frequencies = ChartFuturesFrequencies.ONE_DAY
-        elif timeframe == "weekly":
-            chart_futures_frequencies = ChartFuturesFrequencies.ONE_WEEK
-        elif timeframe == "monthly":
-            chart_futures_frequencies = ChartFuturesFrequencies.ONE_MONTH
-
-        stream_services.futures_chart_history(
-            symbol=[future],
-            frequency=chart_futures_frequencies,
-            start_time=start_date,
-            end_time=end_date,
+TIMEFRAME_FREQUENCIES = {
+    "minute": ChartFuturesFrequencies.ONE_MINUTE,
+    "daily": ChartFuturesFrequencies.ONE_DAY,
+    "weekly": ChartFuturesFrequencies.ONE_WEEK,
+    "monthly": ChartFuturesFrequencies.ONE_MONTH,
+}
+FREQUENCY_TIMEFRAMES = {v.value: k for k, v in TIMEFRAME_FREQUENCIES.items()}
+
+
+async def get_futures_data(futures_list, timeframe_list, start_date, end_date):
+    requests = [
+        {
+            "symbol": future,
+            "frequency": TIMEFRAME_FREQUENCIES[timeframe],
+            "start_time": start_date,
+            "end_time": end_date,
+        }
+        for future in futures_list
+        for timeframe in timeframe_list
+    ]
+
+    # Up to 10 requests in flight, snapshots are matched by request id
+    async for result in stream_services.chart_history_bulk(
+        requests, max_concurrency=10, timeout=15, as_model=False
+    ):
+        future = result.request["symbol"]
+        timeframe = FREQUENCY_TIMEFRAMES[result.request["frequency"].value]
+        if not result.ok:
+            print(f"Failed to pull data for {future} {timeframe}: {result.error}")
+            continue
+
+        print(f"Pulled data for {future}, {timeframe} in {result.elapsed_ms:.0f}ms")
+        msg = {
+            "service": "CHART_HISTORY_FUTURES",
+            "timestamp": 0,
+            "command": "GET",
+            "content": [result.snapshot],
+        }
+        await chart_history_handler.snapshot_message_handler(
+            asyncio.Event(), future, timeframe, msg
         )
 
-        try:
-            await asyncio.wait_for(handled_event.wait(), timeout=15)
-        except asyncio.TimeoutError:
-            print(
-                f"Timeout occurred while waiting for {future} {timeframe} {start_date} {end_date}"
-            )
-
-        stream_services.remove_handler("snapshot", "CHART_HISTORY_FUTURES", func_ref)
-        stream_services.futures_unsub_chart_history()
-
-        continue_requests = False
-        unsubscribed = False
-        handler_removed = False
-        while not continue_requests:
-            await asyncio.sleep(0.3)
-            if not stream_services.is_subscribed("CHART_HISTORY_FUTURES"):
-                unsubscribed = True
-            if not stream_services.has_handler(
-                "snapshot", "CHART_HISTORY_FUTURES", func_ref
-            ):
-                handler_removed = True
-            if handler_removed and unsubscribed:
-                continue_requests = True
-
-        if chart_history_symbol_queue.empty():
-            break
+    stream_services.futures_unsub_chart_history()
 
 
 async def main():
@@ -134,10 +108,7 @@ async def main():
     # futures_list.remove("/ES")
 
     await run_td_stream_client()
-    await bulk_add_to_chart_history_symbol_queue(
-        futures_list, timeframe_list, start_date, end_date
-    )
-    await get_futures_data()
+    await get_futures_data(futures_list, timeframe_list, start_date, end_date)
 
     await asyncio.sleep(30)
 
@@ -5,6 +5,7 @@ from rich import print_json
 from td.client import TdAmeritradeClient
 from td.config import TdConfiguration
 from td.models.rest.response import SecuritiesAccount, Transaction
+from td.rest.transaction_history import TransactionHistoryFetcher
 
 # A config object
 config = TdConfiguration()
@@ -100,3 +101,13 @@ elif isinstance(transactions, list):
             print_json(transaction_json)
 elif isinstance(transactions, Transaction):
     print_json(transactions.model_dump_json(exclude_none=True))
+
+
+# Multi-year Transactions, completed windows are cached on disk
+
+transaction_history = TransactionHistoryFetcher(accounts_service, max_workers=4)
+
+transactions = transaction_history.get_transactions(
+    account_number, start_date="2019-01-01"
+)
+print(f"Fetched {len(transactions)} transactions since 2019")
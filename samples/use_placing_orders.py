@@ -8,11 +8,13 @@ from td.orders.builder import (
     first_triggers_second,
     one_triggers_one_cancels_other,
 )
+from td.orders.equities import equity_buy_limit
 from td.orders.options import (
     OptionSymbol,
     option_buy_to_open_limit,
     option_sell_to_close_limit,
 )
+from td.orders.templates import OrderTemplate
 
 # A config object
 config = TdConfiguration("config-example/config.ini")
@@ -71,3 +73,26 @@ option_market_sell_order = option_sell_to_close_limit(option_symbol, 1, 0.10).bu
 fts = first_triggers_second(option_market_buy_order, option_market_sell_order).build()
 print_json(fts.model_dump_json(exclude_none=True))
 # orders_service.place_order(account_number, fts)
+
+
+# Precompiled Order Templates
+#  Validated and serialized once, filling only formats symbol/quantity/price
+
+equity_buy_limit_template = OrderTemplate(equity_buy_limit("SPY", 1, 1.00))
+
+prepared_order = equity_buy_limit_template.fill(symbol="AAPL", quantity=10, price=100.00)
+print_json(prepared_order.payload)
+# orders_service.place_order(account_number, prepared_order)
+
+
+# Order Latency Tracing
+#  Times build -> serialize -> HTTP ack -> working -> fill, fills come from ACCT_ACTIVITY
+
+# from td.orders.tracing import OrderLatencyTracer
+# stream_client = td_client.streaming_api_client()
+# stream_client.open_stream()
+# tracer = OrderLatencyTracer(orders_service, stream_client=stream_client)
+# tracer.start()
+# trace = tracer.place_order(account_number, equity_buy_limit("SPY", 1, 1.00))
+# print(trace.order_id, trace.stages())
+# print(tracer.get_stats("LIMIT"))
@@ -231,9 +231,29 @@ class TdAmeritradeClient:
         # return SavedOrders(session=self.td_session)
 
     def streaming_api_client(
-        self, on_message_received=None, on_stream_restarted=None
+        self,
+        on_message_received=None,
+        on_stream_restarted=None,
+        request_batch_window: float = 0.0,
+        request_timeout: float = 30.0,
+        replay_subscriptions: bool = True,
     ) -> StreamingApiClient:
         """Used to access the `StreamingApiClient` Services and metadata.
+
+        Parameters
+        ----
+        request_batch_window: float (optional, Default=0.0)
+            Seconds to wait after a data request is added so a burst of
+            requests is sent in a single frame, 0 sends immediately.
+
+        request_timeout: float (optional, Default=30.0)
+            Seconds before a data request without a response resolves as
+            timed out.
+
+        replay_subscriptions: bool (optional, Default=True)
+            Send the subscriptions again right after a restarted stream
+            logged in.
+
         Returns
         ---
         StreamingApiClient:
@@ -250,4 +270,7 @@ class TdAmeritradeClient:
             on_stream_restarted=on_stream_restarted,
             log_received_messages=self._log_received_messages,
             log_sent_messages=self._log_sent_messages,
+            request_batch_window=request_batch_window,
+            request_timeout=request_timeout,
+            replay_subscriptions=replay_subscriptions,
         )
@@ -602,6 +602,45 @@ class ServiceState(_BaseEnum):
     SUBSCRIBED = "subscribed"
 
 
+class BackpressurePolicy(_BaseEnum):
+    """What a streaming service's handler queue does when it's full.
+
+    Usage
+    ----
+        >>> from td.enums.enums import BackpressurePolicy
+        >>> BackpressurePolicy.DROP_OLDEST.value
+    """
+
+    BLOCK = "block"  # reader waits for space, up to a limit
+    DROP_OLDEST = "drop_oldest"
+    CONFLATE = "conflate"  # merge updates per symbol, keep the latest state
+
+
+class AccountActivityMessageType(_BaseEnum):
+    """Represents the message types sent by the ACCT_ACTIVITY
+    streaming service (field 2 of each content entry).
+
+    Usage
+    ----
+        >>> from td.enums import AccountActivityMessageType
+        >>> AccountActivityMessageType.ORDER_FILL.value
+    """
+
+    SUBSCRIBED = "SUBSCRIBED"
+    ERROR = "ERROR"
+    BROKEN_TRADE = "BrokenTrade"
+    MANUAL_EXECUTION = "ManualExecution"
+    ORDER_ACTIVATION = "OrderActivation"
+    ORDER_CANCEL_REPLACE_REQUEST = "OrderCancelReplaceRequest"
+    ORDER_CANCEL_REQUEST = "OrderCancelRequest"
+    ORDER_ENTRY_REQUEST = "OrderEntryRequest"
+    ORDER_FILL = "OrderFill"
+    ORDER_PARTIAL_FILL = "OrderPartialFill"
+    ORDER_REJECTION = "OrderRejection"
+    TOO_LATE_TO_CANCEL = "TooLateToCancel"
+    UR_OUT = "UROUT"
+
+
 # class LevelTwoOptions(_BaseEnum):
 #     """Represents the Level Two Options Fields.
 
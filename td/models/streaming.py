@@ -542,6 +542,37 @@ class ActivesData(DataResponseContent):
     actives_data: ActivesDataGroup = Field(alias="1")
 
 
+class AccountActivityData(DataResponseContent):
+    subscription_key: str = Field(alias="key")  # Streamer subscription key
+    account: str | None = Field(alias="1", default=None)  # Account #
+    message_type: str | None = Field(
+        alias="2", default=None
+    )  # AccountActivityMessageType, e.g. OrderFill
+    message_data: str | None = Field(
+        alias="3", default=None
+    )  # XML body of the message, empty for SUBSCRIBED
+    seq: int | None = None
+
+
+class AccountActivityOrderEvent(BaseStreamingModel):
+    """Order fields pulled out of the ACCT_ACTIVITY XML message data."""
+
+    account: str | None = None
+    message_type: str
+    order_id: int | None = None
+    symbol: str | None = None
+    security_type: str | None = None  # e.g. Common Stock, Call Option
+    instruction: str | None = None  # e.g. Buy, Sell
+    order_type: str | None = None
+    original_quantity: float | None = None
+    limit_price: float | None = None
+    execution_type: str | None = None  # Bought / Sold
+    execution_quantity: float | None = None
+    execution_price: float | None = None
+    leaves_quantity: float | None = None
+    activity_timestamp: str | None = None
+
+
 # snapshot response type
 
 
@@ -0,0 +1,249 @@
+"""
+Compact record types for the streaming models.
+
+Each model of `td.models.streaming` has a matching `__slots__` record type,
+built straight from the wire keys of a content entry without validation.
+Values are kept as they arrive on the wire (missing fields are None), so a
+record converts back to its pydantic model losslessly with `to_model`.
+
+    >>> record = LevelOneEquityRecord.from_wire({"key": "SPY", "1": 450.1, "2": 450.2})
+    >>> record.bid_price
+    >>> record.to_model()
+"""
+
+import inspect
+import types
+import typing
+
+from pydantic import BaseModel
+
+from td.models import streaming
+from td.models.streaming import BaseStreamingModel
+
+# model -> record type
+RECORD_TYPES: dict[type[BaseStreamingModel], type] = {}
+
+
+def _nested_model(annotation) -> tuple[type | None, bool]:
+    """The streaming model inside an annotation, and whether it's a list of it."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        return _nested_model(typing.get_args(annotation)[0])
+    if origin in (list, typing.List):
+        model, _ = _nested_model(typing.get_args(annotation)[0])
+        return model, True
+    if origin is typing.Union or isinstance(annotation, types.UnionType):
+        for arg in typing.get_args(annotation):
+            model, is_list = _nested_model(arg)
+            if model is not None:
+                return model, is_list
+        return None, False
+    if inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+class BaseStreamingRecord:
+    """
+    Base class of the generated record types, each of which gets its own
+    `from_wire(entry)` classmethod from `make_record_type`.
+    """
+
+    __slots__ = ()
+
+    # Set on the generated types
+    _model: type[BaseStreamingModel] = None
+    _fields: tuple = ()
+    # field name -> wire key
+    _aliases: dict = {}
+    # field name -> (record type, is list) of nested models
+    _nested: dict = {}
+
+    def to_wire(self) -> dict:
+        """The content entry the record was built from, wire keys as keys."""
+        wire = {}
+        nested = self._nested
+        for name in self._fields:
+            value = getattr(self, name)
+            if value is None:
+                continue
+            if name in nested:
+                value = (
+                    [x.to_wire() for x in value]
+                    if nested[name][1]
+                    else value.to_wire()
+                )
+            wire[self._aliases[name]] = value
+        return wire
+
+    def to_dict(self) -> dict:
+        """The fields by name, nested records as dicts."""
+        values = {}
+        nested = self._nested
+        for name in self._fields:
+            value = getattr(self, name)
+            if value is not None and name in nested:
+                value = (
+                    [x.to_dict() for x in value]
+                    if nested[name][1]
+                    else value.to_dict()
+                )
+            values[name] = value
+        return values
+
+    def to_model(self) -> BaseStreamingModel:
+        """Validates the record into its pydantic model."""
+        return self._model.model_validate(self.to_wire())
+
+    def __eq__(self, other) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, x) == getattr(other, x) for x in self._fields)
+
+    def __repr__(self) -> str:
+        values = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in self._fields
+            if getattr(self, name) is not None
+        )
+        return f"{type(self).__name__}({values})"
+
+
+class RecordMessage:
+    """
+    Light stand-in for `DataResponseMessage` / `SnapshotResponseMessage`
+    whose content holds records.
+    """
+
+    __slots__ = ("service", "timestamp", "command", "content")
+
+    def __init__(self, service: str, timestamp: int, command: str, content: list) -> None:
+        self.service = service
+        self.timestamp = timestamp
+        self.command = command
+        self.content = content
+
+    def to_model(self, message_type=streaming.DataResponseMessage):
+        """Validates the message and its records into the pydantic models."""
+        return message_type(
+            service=self.service,
+            timestamp=self.timestamp,
+            command=self.command,
+            content=[x.to_model() for x in self.content],
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"RecordMessage(service={self.service!r}, timestamp={self.timestamp!r}, "
+            f"command={self.command!r}, content={self.content!r})"
+        )
+
+
+def _nested_list(record_type, value):
+    if not value:
+        return value
+    from_wire = record_type.from_wire
+    return [from_wire(x) for x in value]
+
+
+def _nested_one(record_type, value):
+    if value is None:
+        return None
+    return record_type.from_wire(value)
+
+
+def make_record_type(model: type[BaseStreamingModel]) -> type:
+    """
+    Generates (once) the record type of a streaming model: a `__slots__`
+    class with the model's field names and a `from_wire` constructor that
+    reads the wire keys directly.
+    """
+    record_type = RECORD_TYPES.get(model, None)
+    if record_type is not None:
+        return record_type
+
+    fields = tuple(model.model_fields)
+    aliases = {}
+    nested = {}
+    for name, field in model.model_fields.items():
+        aliases[name] = field.alias or name
+        nested_model, is_list = _nested_model(field.annotation)
+        if nested_model is not None and issubclass(nested_model, BaseStreamingModel):
+            nested[name] = (make_record_type(nested_model), is_list)
+
+    # The constructor is generated like dataclasses / namedtuple do, so each
+    # field is a single dict lookup
+    namespace = {"_nested_list": _nested_list, "_nested_one": _nested_one}
+    lines = ["def from_wire(cls, entry):", "    self = _new(cls)", "    get = entry.get"]
+    for i, name in enumerate(fields):
+        if name in nested:
+            namespace[f"_type_{i}"] = nested[name][0]
+            helper = "_nested_list" if nested[name][1] else "_nested_one"
+            lines.append(f"    self.{name} = {helper}(_type_{i}, get({aliases[name]!r}))")
+        else:
+            lines.append(f"    self.{name} = get({aliases[name]!r})")
+    lines.append("    return self")
+
+    # LevelOneEquityData -> LevelOneEquityRecord, unless the name is taken
+    name = model.__name__
+    if name.endswith("Data") and not hasattr(streaming, name[: -len("Data")]):
+        name = name[: -len("Data")]
+    record_type = type(
+        f"{name}Record",
+        (BaseStreamingRecord,),
+        {
+            "__slots__": fields,
+            "__module__": __name__,
+            "__doc__": f"Compact record of `{model.__name__}`.",
+            "_model": model,
+            "_fields": fields,
+            "_aliases": aliases,
+            "_nested": nested,
+        },
+    )
+    namespace["_new"] = object.__new__
+    exec("\n".join(lines), namespace)
+    record_type.from_wire = classmethod(namespace["from_wire"])
+
+    RECORD_TYPES[model] = record_type
+    return record_type
+
+
+def get_record_type(model: type[BaseStreamingModel]) -> type:
+    """The record type of a streaming model."""
+    return make_record_type(model)
+
+
+# Every content model of td.models.streaming, the message envelopes are
+# left out
+for _model in list(vars(streaming).values()):
+    if (
+        inspect.isclass(_model)
+        and issubclass(_model, BaseStreamingModel)
+        and not issubclass(_model, streaming.BaseResponseMessage)
+        and _model.__module__ == streaming.__name__
+        and _model.model_fields
+    ):
+        make_record_type(_model)
+
+ExchangeRecord = RECORD_TYPES[streaming.ExchangeData]
+PriceLevelRecord = RECORD_TYPES[streaming.PriceLevelData]
+LevelTwoBookRecord = RECORD_TYPES[streaming.LevelTwoBookData]
+LevelOneEquityRecord = RECORD_TYPES[streaming.LevelOneEquityData]
+LevelOneOptionRecord = RECORD_TYPES[streaming.LevelOneOptionData]
+LevelOneFuturesRecord = RECORD_TYPES[streaming.LevelOneFuturesData]
+LevelOneForexRecord = RECORD_TYPES[streaming.LevelOneForexData]
+LevelOneFuturesOptionsRecord = RECORD_TYPES[streaming.LevelOneFuturesOptionsData]
+NewsHeadlineRecord = RECORD_TYPES[streaming.NewsHeadlineData]
+TimesaleRecord = RECORD_TYPES[streaming.TimesaleData]
+ChartRecord = RECORD_TYPES[streaming.ChartData]
+ChartEquityRecord = RECORD_TYPES[streaming.ChartEquityData]
+ChartFuturesOrOptionsRecord = RECORD_TYPES[streaming.ChartFuturesOrOptionsData]
+ActivesSymbolRecord = RECORD_TYPES[streaming.ActivesSymbol]
+ActivesGroupRecord = RECORD_TYPES[streaming.ActivesGroup]
+ActivesDataGroupRecord = RECORD_TYPES[streaming.ActivesDataGroup]
+ActivesRecord = RECORD_TYPES[streaming.ActivesData]
+AccountActivityRecord = RECORD_TYPES[streaming.AccountActivityData]
+AccountActivityOrderEventRecord = RECORD_TYPES[streaming.AccountActivityOrderEvent]
+ChartHistorySnapshotRecord = RECORD_TYPES[streaming.ChartHistorySnapshot]
+ChartHistorySnapshotDataRecord = RECORD_TYPES[streaming.ChartHistorySnapshotData]
@@ -0,0 +1,258 @@
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from pydantic import BaseModel, ValidationError
+
+from td.logger import TdLogger
+from td.models.orders import Order
+from td.orders.builder import OrderBuilder
+from td.orders.templates import OrderTemplate, PreparedOrder
+from td.rest.orders import Orders
+
+
+class OrderSubmissionResult(BaseModel):
+    """Outcome of a single order in an `OrderBatchSubmitter` batch."""
+
+    index: int
+    account_id: str
+    status: str  # "placed", "invalid" or "failed"
+    order_id: int | None = None
+    error: str | None = None
+    wait_ms: float | None = None  # Time spent waiting on the pacing limits
+    request_ms: float | None = None  # HTTP request until the response
+    total_ms: float | None = None  # Batch start until the response
+
+
+class OrderBatchReport(BaseModel):
+    """Per order results and totals of an `OrderBatchSubmitter` batch."""
+
+    results: List[OrderSubmissionResult]
+    placed: int
+    invalid: int
+    failed: int
+    validation_ms: float
+    total_ms: float
+
+    @property
+    def order_ids(self) -> List[int]:
+        return [r.order_id for r in self.results if r.order_id is not None]
+
+
+class _AccountPacer:
+    """Sliding window rate limit and in flight limit for a single account."""
+
+    def __init__(self, orders_per_minute: int, max_in_flight: int) -> None:
+        self.orders_per_minute = orders_per_minute
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._sent = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        self.in_flight.acquire()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= 60:
+                    self._sent.popleft()
+                if len(self._sent) < self.orders_per_minute:
+                    self._sent.append(now)
+                    return
+                wait = 60 - (now - self._sent[0])
+            time.sleep(wait)
+
+    def release(self) -> None:
+        self.in_flight.release()
+
+
+class OrderBatchSubmitter:
+    """Places many orders concurrently while pacing each account.
+
+    All orders are validated before the first one is sent. Orders are then
+    placed from a thread pool, limited per account to `orders_per_minute`
+    (TD's default throttle is 120) and to `max_in_flight_per_account`
+    concurrent requests. Order ids are read from the Location header of
+    each response.
+
+    Args:
+        orders_service (Orders): The `Orders` service used to place the orders.
+        max_workers (int, optional): Concurrent requests over all accounts. Defaults to 8.
+        orders_per_minute (int, optional): Orders per account per minute. Defaults to 120.
+        max_in_flight_per_account (int, optional): Concurrent requests per account.
+            Defaults to 4.
+
+    Example:
+        ```
+        submitter = OrderBatchSubmitter(td_client.orders())
+        report = submitter.submit(
+            [equity_sell_market(symbol, quantity) for symbol, quantity in trims],
+            account_id=account_number,
+        )
+        print(report.placed, report.failed, report.order_ids)
+        ```
+    """
+
+    def __init__(
+        self,
+        orders_service: Orders,
+        max_workers: int = 8,
+        orders_per_minute: int = 120,
+        max_in_flight_per_account: int = 4,
+    ) -> None:
+        self.orders_service = orders_service
+        self.max_workers = max_workers
+        self.orders_per_minute = orders_per_minute
+        self.max_in_flight_per_account = max_in_flight_per_account
+
+        self._pacers = defaultdict(
+            lambda: _AccountPacer(
+                self.orders_per_minute, self.max_in_flight_per_account
+            )
+        )
+        self._pacers_lock = threading.Lock()
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    @staticmethod
+    def validate_order(
+        order: OrderBuilder | Order | OrderTemplate | PreparedOrder,
+    ) -> Order | PreparedOrder:
+        """Builds / validates an order and returns what should be placed.
+
+        Raises:
+            ValueError: If the order is invalid.
+        """
+        if isinstance(order, OrderBuilder):
+            order = order.build()
+        elif isinstance(order, OrderTemplate):
+            order = order.default
+        elif isinstance(order, Order):
+            # Orders can be changed after they were built, check them again
+            order = Order.model_validate(order.model_dump(by_alias=True))
+
+        if isinstance(order, PreparedOrder):
+            return order
+        if not isinstance(order, Order):
+            raise ValueError(f"Unsupported order type {type(order)}")
+        if not order.order_leg_collection and not order.child_order_strategies:
+            raise ValueError("Order has no legs and no child orders")
+        for leg in order.order_leg_collection or []:
+            if leg.quantity <= 0:
+                raise ValueError(f"Invalid quantity {leg.quantity} for {leg.instrument.symbol}")
+        return order
+
+    def _get_pacer(self, account_id: str) -> _AccountPacer:
+        with self._pacers_lock:
+            return self._pacers[account_id]
+
+    def _place(
+        self,
+        index: int,
+        account_id: str,
+        order: Order | PreparedOrder,
+        batch_start: float,
+    ) -> OrderSubmissionResult:
+        pacer = self._get_pacer(account_id)
+        wait_start = time.perf_counter()
+        pacer.acquire()
+        try:
+            request_start = time.perf_counter()
+            try:
+                response = self.orders_service.place_order(account_id, order)
+            except Exception as e:
+                status, order_id, error = "failed", None, str(e)
+            else:
+                status, error = "placed", None
+                order_id = self.orders_service.get_order_id_from_response(response)
+            end = time.perf_counter()
+        finally:
+            pacer.release()
+
+        if status == "failed":
+            self.log.error(f"Batch order {index} for {account_id} failed: {error}")
+
+        return OrderSubmissionResult(
+            index=index,
+            account_id=account_id,
+            status=status,
+            order_id=order_id,
+            error=error,
+            wait_ms=(request_start - wait_start) * 1000,
+            request_ms=(end - request_start) * 1000,
+            total_ms=(end - batch_start) * 1000,
+        )
+
+    def submit(
+        self,
+        orders: List[OrderBuilder | Order | OrderTemplate | PreparedOrder | Tuple],
+        account_id: str | None = None,
+        abort_on_invalid: bool = False,
+    ) -> OrderBatchReport:
+        """Validates and places a batch of orders.
+
+        Args:
+            orders (List): Orders, or (account_id, order) tuples for orders going to
+                other accounts than `account_id`.
+            account_id (str, optional): Account for orders passed without one.
+            abort_on_invalid (bool, optional): Raise before placing anything if an
+                order is invalid, otherwise invalid orders are reported and skipped.
+                Defaults to False.
+
+        Returns:
+            OrderBatchReport: The per order results, in the order they were passed.
+        """
+        batch_start = time.perf_counter()
+
+        results: List[OrderSubmissionResult | None] = [None] * len(orders)
+        to_place = []
+        for index, item in enumerate(orders):
+            order_account_id, order = (
+                item if isinstance(item, tuple) else (account_id, item)
+            )
+            if order_account_id is None:
+                raise ValueError(f"No account_id for order {index}")
+            order_account_id = str(order_account_id)
+            try:
+                to_place.append((index, order_account_id, self.validate_order(order)))
+            except (ValidationError, ValueError) as e:
+                if abort_on_invalid:
+                    raise ValueError(f"Order {index} is invalid: {e}") from e
+                results[index] = OrderSubmissionResult(
+                    index=index, account_id=order_account_id, status="invalid", error=str(e)
+                )
+
+        validation_ms = (time.perf_counter() - batch_start) * 1000
+
+        if to_place:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(to_place))
+            ) as executor:
+                futures = [
+                    executor.submit(self._place, index, order_account_id, order, batch_start)
+                    for index, order_account_id, order in to_place
+                ]
+                for future in futures:
+                    result = future.result()
+                    results[result.index] = result
+
+        counts = defaultdict(int)
+        for result in results:
+            counts[result.status] += 1
+
+        report = OrderBatchReport(
+            results=results,
+            placed=counts["placed"],
+            invalid=counts["invalid"],
+            failed=counts["failed"],
+            validation_ms=validation_ms,
+            total_ms=(time.perf_counter() - batch_start) * 1000,
+        )
+
+        self.log.info(
+            f"Order batch done - placed {report.placed}, invalid {report.invalid}, failed {report.failed} in {report.total_ms:.1f} ms"
+        )
+        return report
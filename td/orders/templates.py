@@ -0,0 +1,178 @@
+import json
+import math
+from typing import List
+
+from td.models.orders import Order
+from td.orders.builder import OrderBuilder
+
+_SLOT = "__td_template_slot_{}__"
+
+
+class PreparedOrder:
+    """A filled in `OrderTemplate`, holding the JSON body sent to the API.
+
+    `template` is None for orders serialized without a template.
+    """
+
+    __slots__ = ("template", "payload")
+
+    def __init__(self, template: "OrderTemplate | None", payload: str) -> None:
+        self.template = template
+        self.payload = payload
+
+    def to_order(self) -> Order:
+        """Builds the validated `Order` model for the payload, not needed to place it."""
+        return Order(**json.loads(self.payload))
+
+
+class OrderTemplate:
+    """A precompiled order for low latency placement.
+
+    The order is built and validated once, then serialized to JSON with slots
+    for the symbol and quantity of each leg and the (stop) price. Filling a
+    template only formats those values into the cached JSON, skipping the
+    `Order` validation and `model_dump` of a full build.
+
+    Only the legs and prices of the top level order are slots, child orders
+    are placed exactly as compiled.
+
+    Args:
+        order (Union[OrderBuilder, Order]): The order to compile, the values it was
+            built with are the defaults for `fill`.
+
+    Example:
+        ```
+        buy_limit = OrderTemplate(equity_buy_limit("SPY", 1, 1.00))
+        orders_service.place_order(
+            account_number, buy_limit.fill(symbol="AAPL", quantity=10, price=180.25)
+        )
+
+        vertical = OrderTemplate(
+            bull_call_vertical_open(long_call_symbol, short_call_symbol, 1, 0.50)
+        )
+        orders_service.place_order(
+            account_number,
+            vertical.fill(symbol=[long_call, short_call], quantity=2, price=0.45),
+        )
+        ```
+    """
+
+    def __init__(self, order: OrderBuilder | Order) -> None:
+        if isinstance(order, OrderBuilder):
+            order = order.build()
+        if not isinstance(order, Order):
+            raise ValueError("order must be OrderBuilder or Order")
+
+        self.order = order
+        payload = order.model_dump(mode="json", by_alias=True)
+
+        slots = []
+
+        def add_slot(container, key, name):
+            slots.append(name)
+            container[key] = _SLOT.format(len(slots) - 1)
+
+        legs = payload.get("orderLegCollection") or []
+        self.num_legs = len(legs)
+        self._default_symbols = [leg["instrument"]["symbol"] for leg in legs]
+        self._default_quantities = [leg["quantity"] for leg in legs]
+        for i, leg in enumerate(legs):
+            add_slot(leg["instrument"], "symbol", ("symbol", i))
+            add_slot(leg, "quantity", ("quantity", i))
+
+        self._default_price = payload.get("price", None)
+        if self._default_price is not None:
+            add_slot(payload, "price", ("price", None))
+
+        self._default_stop_price = payload.get("stopPrice", None)
+        if self._default_stop_price is not None:
+            add_slot(payload, "stopPrice", ("stop_price", None))
+
+        serialized = json.dumps(payload, separators=(",", ":"))
+
+        # Split the JSON around the quoted slot markers, values go in between
+        markers = sorted(
+            (serialized.index(f'"{_SLOT.format(i)}"'), i) for i in range(len(slots))
+        )
+        parts = [serialized]
+        for _, i in markers:
+            head, tail = parts[-1].split(f'"{_SLOT.format(i)}"', 1)
+            parts[-1:] = [head, tail]
+        self._parts = parts
+        self._slots = [slots[i] for _, i in markers]
+
+        self.default = self.fill()
+
+    @staticmethod
+    def _per_leg(value, default: List, name: str) -> List:
+        if value is None:
+            return default
+        if isinstance(value, (list, tuple)):
+            if len(value) != len(default):
+                raise ValueError(
+                    f"{name} needs {len(default)} values, one per leg, got {len(value)}"
+                )
+            return list(value)
+        return [value] * len(default)
+
+    @staticmethod
+    def _format_price(value) -> str:
+        value = float(value)
+        if not math.isfinite(value) or value < 0:
+            raise ValueError(f"Invalid price {value}")
+        return repr(value)
+
+    def fill(
+        self,
+        symbol: str | List[str] | None = None,
+        quantity: int | List[int] | None = None,
+        price: float | None = None,
+        stop_price: float | None = None,
+    ) -> PreparedOrder:
+        """Fills the template with new values.
+
+        Args:
+            symbol (Union[str, List[str]], optional): Symbol for all legs or one per leg.
+                Defaults to the compiled symbols.
+            quantity (Union[int, List[int]], optional): Quantity for all legs or one per
+                leg. Defaults to the compiled quantities.
+            price (float, optional): Defaults to the compiled price.
+            stop_price (float, optional): Defaults to the compiled stop price.
+
+        Returns:
+            PreparedOrder: The order ready for `Orders.place_order`.
+        """
+        symbols = self._per_leg(symbol, self._default_symbols, "symbol")
+        quantities = self._per_leg(quantity, self._default_quantities, "quantity")
+
+        values = {}
+        for i, leg_symbol in enumerate(symbols):
+            if not isinstance(leg_symbol, str) or not leg_symbol:
+                raise ValueError(f"Invalid symbol {leg_symbol}")
+            values[("symbol", i)] = json.dumps(leg_symbol)
+        for i, leg_quantity in enumerate(quantities):
+            if isinstance(leg_quantity, bool) or int(leg_quantity) != leg_quantity:
+                raise ValueError(f"Invalid quantity {leg_quantity}")
+            if leg_quantity <= 0:
+                raise ValueError(f"Invalid quantity {leg_quantity}")
+            values[("quantity", i)] = str(int(leg_quantity))
+
+        if price is not None and self._default_price is None:
+            raise ValueError("Template was compiled without a price")
+        if stop_price is not None and self._default_stop_price is None:
+            raise ValueError("Template was compiled without a stop price")
+        if self._default_price is not None:
+            values[("price", None)] = self._format_price(
+                self._default_price if price is None else price
+            )
+        if self._default_stop_price is not None:
+            values[("stop_price", None)] = self._format_price(
+                self._default_stop_price if stop_price is None else stop_price
+            )
+
+        parts = self._parts
+        payload = [parts[0]]
+        for i, slot in enumerate(self._slots):
+            payload.append(values[slot])
+            payload.append(parts[i + 1])
+        return PreparedOrder(self, "".join(payload))
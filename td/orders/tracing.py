@@ -0,0 +1,334 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from pydantic import ValidationError
+
+from td.enums.orders import OrderStatus
+from td.logger import TdLogger
+from td.models.orders import Order
+from td.models.streaming import AccountActivityOrderEvent
+from td.orders.builder import OrderBuilder
+from td.orders.templates import OrderTemplate, PreparedOrder
+from td.rest.orders import Orders
+from td.streaming.handlers import FILL_MESSAGE_TYPES, BaseAccountActivityHandler
+from td.utils.metrics import LatencyStats
+
+# (stage, start mark, end mark), a stage is recorded once both marks are set
+TRACE_STAGES = (
+    ("build", "submit", "built"),
+    ("serialize", "built", "serialized"),
+    ("http", "serialized", "acked"),
+    ("ack_to_working", "acked", "working"),
+    ("ack_to_first_fill", "acked", "first_fill"),
+    ("ack_to_fill", "acked", "filled"),
+    ("submit_to_fill", "submit", "filled"),
+)
+
+_WORKING_STATUSES = (OrderStatus.QUEUED.value, OrderStatus.WORKING.value)
+_DONE_STATUSES = (
+    OrderStatus.FILLED.value,
+    OrderStatus.CANCELED.value,
+    OrderStatus.REJECTED.value,
+)
+
+
+class OrderTrace:
+    """Timestamps (`time.perf_counter`) of a single order placed by the tracer."""
+
+    __slots__ = ("account_id", "order_type", "order_id", "marks", "status", "error")
+
+    def __init__(self, account_id: str, order_type: str) -> None:
+        self.account_id = account_id
+        self.order_type = order_type
+        self.order_id: int | None = None
+        self.marks: dict[str, float] = {}
+        self.status: str | None = None
+        self.error: str | None = None
+
+    def stage_ms(self, stage: str) -> float | None:
+        """Latency of a stage in milliseconds, None if it hasn't completed."""
+        for name, start, end in TRACE_STAGES:
+            if name == stage:
+                if start in self.marks and end in self.marks:
+                    return (self.marks[end] - self.marks[start]) * 1000
+                return None
+        raise ValueError(f"Unknown stage {stage}")
+
+    def stages(self) -> dict[str, float]:
+        """All completed stages in milliseconds."""
+        return {
+            name: (self.marks[end] - self.marks[start]) * 1000
+            for name, start, end in TRACE_STAGES
+            if start in self.marks and end in self.marks
+        }
+
+
+class OrderLatencyTracer(BaseAccountActivityHandler):
+    """
+    Overview
+    ----
+    Measures the lifecycle latency of orders placed through it: building the
+    order, serializing it, the HTTP request until the order id comes back in
+    the Location header, and the ACCT_ACTIVITY events until the order is
+    working and filled. Stream events are correlated to the placed orders by
+    order id, events arriving before the HTTP response are held until the id
+    is known.
+
+    Latency distributions are kept per stage for each order type and for all
+    orders. Stages measured from the ack can be negative when the stream
+    delivered the event before the REST response returned.
+
+    Usage
+    ----
+        >>> tracer = OrderLatencyTracer(
+                orders_service=td_client.orders(),
+                stream_client=stream_client,
+            )
+        >>> tracer.start()
+        >>> trace = tracer.place_order('123456789', equity_buy_limit("SPY", 1, 400.0))
+        >>> trace.order_id, trace.stages()
+        >>> tracer.get_stats("LIMIT")
+    """
+
+    def __init__(
+        self,
+        orders_service: Orders,
+        stream_client=None,
+        max_traces: int = 10000,
+        max_samples: int = 10000,
+        max_unmatched: int = 1000,
+    ) -> None:
+        """
+        Parameters
+        ----
+        orders_service: Orders
+            The `Orders` service used to place the orders.
+
+        stream_client: StreamingApiClient (optional, Default=None)
+            The stream client delivering ACCT_ACTIVITY messages. Only required
+            for `start`.
+
+        max_traces: int (optional, Default=10000)
+            Number of traces kept for `get_trace`, oldest are dropped first.
+
+        max_samples: int (optional, Default=10000)
+            Samples kept per stage for the percentiles.
+
+        max_unmatched: int (optional, Default=1000)
+            Stream events for unknown order ids held for a late ack.
+        """
+        super().__init__()
+        from td.streaming.client import StreamingApiClient
+
+        self.orders_service = orders_service
+        self.stream_client: StreamingApiClient | None = stream_client
+        self.max_traces = max_traces
+        self.max_samples = max_samples
+        self.max_unmatched = max_unmatched
+
+        self.traces: OrderedDict[int, OrderTrace] = OrderedDict()
+        self._unmatched: OrderedDict[int, list] = OrderedDict()
+        self._stats = defaultdict(dict)
+        self._lock = threading.RLock()
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    @staticmethod
+    def _order_type(order: Order) -> str:
+        return order.order_type or order.order_strategy_type or "UNKNOWN"
+
+    def _mark(self, trace: OrderTrace, mark: str, timestamp: float) -> None:
+        """Sets a mark once and records the stages it completes."""
+        if mark in trace.marks:
+            return
+        trace.marks[mark] = timestamp
+        for name, start, end in TRACE_STAGES:
+            if end == mark and start in trace.marks:
+                value = (timestamp - trace.marks[start]) * 1000
+                for key in (trace.order_type, "ALL"):
+                    stats = self._stats[key].get(name, None)
+                    if stats is None:
+                        stats = self._stats[key][name] = LatencyStats(self.max_samples)
+                    stats.add(value)
+
+    def place_order(
+        self,
+        account_id: str,
+        order: OrderBuilder | Order | OrderTemplate | PreparedOrder,
+    ) -> OrderTrace:
+        """
+        Builds, serializes and places an order, timing each step.
+
+        Parameters
+        ----
+        account_id: str
+            The account number to place the order for.
+
+        order: OrderBuilder | Order | OrderTemplate | PreparedOrder
+            The order, builders are built and models serialized as part of
+            the trace.
+
+        Returns
+        ----
+        OrderTrace
+            The trace, its `order_id` is None if the order wasn't placed.
+        """
+        submit = time.perf_counter()
+
+        if isinstance(order, OrderBuilder):
+            order = order.build()
+        built = time.perf_counter()
+
+        if isinstance(order, OrderTemplate):
+            order = order.default
+        if isinstance(order, PreparedOrder):
+            if order.template is not None:
+                order_type = self._order_type(order.template.order)
+            else:
+                payload = json.loads(order.payload)
+                order_type = (
+                    payload.get("orderType", None)
+                    or payload.get("orderStrategyType", None)
+                    or "UNKNOWN"
+                )
+        else:
+            order_type = self._order_type(order)
+            order = PreparedOrder(
+                None,
+                json.dumps(
+                    order.model_dump(mode="json", by_alias=True), separators=(",", ":")
+                ),
+            )
+        serialized = time.perf_counter()
+
+        trace = OrderTrace(str(account_id), order_type)
+        try:
+            response = self.orders_service.place_order(account_id, order)
+        except Exception as e:
+            trace.error = str(e)
+            self.log.error(f"Traced order failed: {e}")
+            return trace
+        acked = time.perf_counter()
+
+        trace.order_id = self.orders_service.get_order_id_from_response(response)
+
+        with self._lock:
+            for mark, timestamp in (
+                ("submit", submit),
+                ("built", built),
+                ("serialized", serialized),
+                ("acked", acked),
+            ):
+                self._mark(trace, mark, timestamp)
+
+            if trace.order_id is None:
+                return trace
+
+            self.traces[trace.order_id] = trace
+            while len(self.traces) > self.max_traces:
+                self.traces.popitem(last=False)
+
+            # Events that beat the REST response
+            for received_at, event in self._unmatched.pop(trace.order_id, []):
+                self._apply_to_trace(trace, event, received_at)
+
+        return trace
+
+    def get_trace(self, order_id: int) -> OrderTrace | None:
+        """Returns the trace of a placed order."""
+        return self.traces.get(int(order_id), None)
+
+    def get_stats(self, order_type: str | None = None) -> dict[str, dict]:
+        """
+        Returns the latency summary (count, min, mean, max, p50, p90, p99 in
+        milliseconds) of each stage, for one order type or all orders.
+        """
+        with self._lock:
+            stats = dict(self._stats.get(order_type or "ALL", {}))
+        return {stage: stats[stage].summary() for stage, _, _ in TRACE_STAGES if stage in stats}
+
+    @property
+    def order_types(self) -> list[str]:
+        """Order types with recorded stages."""
+        return [x for x in self._stats if x != "ALL"]
+
+    def reset(self) -> None:
+        """Drops all traces and statistics."""
+        with self._lock:
+            self.traces.clear()
+            self._unmatched.clear()
+            self._stats.clear()
+
+    def data_message_handler(self, msg) -> None:
+        """Handler for ACCT_ACTIVITY data messages."""
+        received_at = time.perf_counter()
+        try:
+            events = self.construct_order_events(msg)
+        except ValidationError as e:
+            self.log.error(f"Message Construction Error: {e}")
+            return
+
+        for event in events:
+            self.apply_event(event, received_at)
+
+    def apply_event(
+        self, event: AccountActivityOrderEvent, received_at: float | None = None
+    ) -> None:
+        """Correlates a parsed account activity event with its trace."""
+        if event.order_id is None:
+            return
+        received_at = time.perf_counter() if received_at is None else received_at
+
+        with self._lock:
+            trace = self.traces.get(event.order_id, None)
+            if trace is None:
+                self._unmatched.setdefault(event.order_id, []).append(
+                    (received_at, event)
+                )
+                while len(self._unmatched) > self.max_unmatched:
+                    self._unmatched.popitem(last=False)
+                return
+            self._apply_to_trace(trace, event, received_at)
+
+    def _apply_to_trace(
+        self, trace: OrderTrace, event: AccountActivityOrderEvent, received_at: float
+    ) -> None:
+        status = self.order_status(event)
+        if status is None:
+            return
+        if event.message_type in FILL_MESSAGE_TYPES:
+            self._mark(trace, "working", received_at)
+            self._mark(trace, "first_fill", received_at)
+        if status in _WORKING_STATUSES:
+            self._mark(trace, "working", received_at)
+        elif status == OrderStatus.FILLED.value:
+            self._mark(trace, "filled", received_at)
+        trace.status = status
+
+        if self._log_debug_enabled and status in _DONE_STATUSES:
+            self.log.debug(f"Order {trace.order_id} {status} - {trace.stages()}")
+
+    def start(self) -> None:
+        """
+        Adds the ACCT_ACTIVITY handler and subscribes to the service.
+
+        The stream needs to be open before calling this.
+        """
+        if self.stream_client is None:
+            raise ValueError("start requires a stream_client")
+
+        self.stream_client.services.add_handler(
+            "data", "ACCT_ACTIVITY", self.data_message_handler
+        )
+        self.stream_client.services.account_activity()
+
+    def stop(self) -> None:
+        """Removes the ACCT_ACTIVITY handler."""
+        if self.stream_client is not None:
+            self.stream_client.services.remove_handler(
+                "data", "ACCT_ACTIVITY", self.data_message_handler
+            )
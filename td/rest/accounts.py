@@ -115,6 +115,7 @@ class Accounts:
         symbol: str = None,
         start_date: datetime | date | str = None,
         end_date: datetime | date | str = None,
+        validate: bool = True,
     ) -> dict:
         """Queries the transactions for an account.
 
@@ -147,6 +148,10 @@ class Accounts:
             Note: The maximum date range is one year. Valid ISO-8601
             formats are: yyyy-MM-dd.
 
+        validate: bool (optional, default=True)
+            If set to `False` the raw JSON dicts are returned instead
+            of `Transaction` models.
+
         Usage
         ----
             >>> account_services = td_client.accounts()
@@ -182,6 +187,8 @@ class Accounts:
         )
 
         if len(res):
+            if not validate:
+                return res
             return [Transaction(**x) for x in res]
         return []
 
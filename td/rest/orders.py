@@ -5,6 +5,7 @@ from typing import List
 from td.enums.orders import OrderStatus
 from td.models.base_api_model import BaseApiModel
 from td.models.orders import Order
+from td.orders.templates import OrderTemplate, PreparedOrder
 from td.session import TdAmeritradeSession
 
 
@@ -29,6 +30,38 @@ class Orders:
 
         self.session = session
 
+    @staticmethod
+    def _order_payload(order_object: Order | OrderTemplate | PreparedOrder) -> dict:
+        """Returns the request body arguments for an order or a precompiled order."""
+        if isinstance(order_object, OrderTemplate):
+            order_object = order_object.default
+        if isinstance(order_object, PreparedOrder):
+            return {"data": order_object.payload}
+        return {"json_payload": order_object.model_dump(mode="json", by_alias=True)}
+
+    @staticmethod
+    def get_order_id_from_response(response: dict) -> int | None:
+        """Returns the order id from the Location header of a placed order.
+
+        Parameters
+        ----
+        response: dict
+            The dict returned by `place_order` or `replace_order`.
+
+        Usage
+        ----
+            >>> response = orders_service.place_order(account_number, order)
+            >>> order_id = orders_service.get_order_id_from_response(response)
+        """
+        headers = response.get("headers", None) if isinstance(response, dict) else None
+        if not headers:
+            return None
+        location = headers.get("Location", None) or headers.get("location", None)
+        if not location:
+            return None
+        order_id = location.rstrip("/").rsplit("/", 1)[-1]
+        return int(order_id) if order_id.isdigit() else None
+
     def get_orders_by_path(
         self,
         account_id: str,
@@ -207,7 +240,9 @@ class Orders:
             )
         ]
 
-    def place_order(self, account_id: str, order_object: Order) -> dict:
+    def place_order(
+        self, account_id: str, order_object: Order | OrderTemplate | PreparedOrder
+    ) -> dict:
         """Place an order for a specific account. Order throttle
         limits may apply.
 
@@ -221,9 +256,12 @@ class Orders:
             The account number that you want to
             place the order for.
 
-        order_object: Order (optional, Default=None)
+        order_object: Order | OrderTemplate | PreparedOrder (optional, Default=None)
             Represents an `Order` object that can be used to
-            submit a new order to the TD Ameritrade API.
+            submit a new order to the TD Ameritrade API. A precompiled
+            `OrderTemplate` (placed with its compiled values) or a
+            `PreparedOrder` from `OrderTemplate.fill` is sent without
+            being validated or serialized again.
 
         Usage
         ----
@@ -232,17 +270,25 @@ class Orders:
                 account_id='123456789',
                 order_object={}
             )
+            >>> buy_limit = OrderTemplate(equity_buy_limit("SPY", 1, 1.00))
+            >>> orders_service.place_order(
+                account_id='123456789',
+                order_object=buy_limit.fill(symbol="AAPL", quantity=10, price=180.25)
+            )
         """
         endpoint = f"accounts/{account_id}/orders"
 
         return self.session.make_request(
             method="post",
             endpoint=endpoint,
-            json_payload=order_object.model_dump(mode="json", by_alias=True),
+            **self._order_payload(order_object),
         )
 
     def replace_order(
-        self, account_id: str, order_id: str, order_object: Order
+        self,
+        account_id: str,
+        order_id: str,
+        order_object: Order | OrderTemplate | PreparedOrder,
     ) -> dict:
         """Replace an existing order for an account.
 
@@ -265,7 +311,7 @@ class Orders:
         order_id: str (optional, Default=None)
             The order you want to be replaced.
 
-        order_object: Order (optional, Default=None)
+        order_object: Order | OrderTemplate | PreparedOrder (optional, Default=None)
             Represents an `Order` object that can be used to
             submit a replacing order to the TD Ameritrade API.
 
@@ -284,7 +330,7 @@ class Orders:
         return self.session.make_request(
             method="put",
             endpoint=endpoint,
-            json_payload=order_object.model_dump(mode="json", by_alias=True),
+            **self._order_payload(order_object),
         )
 
     def cancel_order(self, account_id: str, order_id: str) -> dict:
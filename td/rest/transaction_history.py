@@ -0,0 +1,285 @@
+import configparser
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from enum import Enum
+from pathlib import Path
+from typing import List
+
+from td.config import TdConfiguration
+from td.enums.enums import QueryTransactionType
+from td.logger import TdLogger
+from td.models.rest.response import Transaction
+from td.rest.accounts import Accounts
+
+
+class TransactionHistoryFetcher:
+
+    """
+    Overview
+    ----
+    Fetches transaction history over arbitrary date ranges. The range is
+    split into windows the API accepts (at most a year each), the windows are
+    requested concurrently, transactions are deduplicated by id and windows
+    that ended before today are cached on disk, so later calls only refetch
+    the current window.
+
+    Windows are aligned to calendar months so the cached windows are reused
+    regardless of the requested start and end dates.
+    """
+
+    def __init__(
+        self,
+        accounts_service: Accounts,
+        cache_dir: str | Path | None = None,
+        max_workers: int = 4,
+        window_months: int = 12,
+    ) -> None:
+        """Initializes the `TransactionHistoryFetcher`.
+
+        Parameters
+        ----
+        accounts_service : Accounts
+            The `Accounts` service used to make the requests.
+
+        cache_dir: str | Path (optional, default=None)
+            Directory for the cached windows. Defaults to a `transactions`
+            directory in the config's `data_paths` section, caching is
+            disabled if neither is available.
+
+        max_workers: int (optional, default=4)
+            Maximum number of windows requested at the same time.
+
+        window_months: int (optional, default=12)
+            Calendar months per window, between 1 and 12.
+        """
+
+        if not 1 <= window_months <= 12:
+            raise ValueError("window_months must be between 1 and 12")
+
+        self.accounts_service = accounts_service
+        self.max_workers = max_workers
+        self.window_months = window_months
+
+        if cache_dir is None:
+            try:
+                cache_dir = (
+                    Path(TdConfiguration().data_paths.data_base_path) / "transactions"
+                )
+            except (AttributeError, TypeError, configparser.Error):
+                cache_dir = None
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    @staticmethod
+    def _to_date(value: datetime | date | str) -> date:
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str):
+            return datetime.fromisoformat(value).date()
+        raise ValueError(
+            "Invalid date format. Must be a date, datetime or YYYY-MM-DD string."
+        )
+
+    def split_windows(
+        self, start_date: datetime | date | str, end_date: datetime | date | str
+    ) -> List[tuple]:
+        """
+        Splits a date range into calendar aligned windows.
+
+        Returns
+        ----
+        List[tuple]
+            (window_start, window_end) date pairs, both inclusive. The first
+            and last windows are always full windows, results are trimmed to
+            the requested range afterwards.
+        """
+        start = self._to_date(start_date)
+        end = self._to_date(end_date)
+        if start > end:
+            raise ValueError("start_date must be before end_date")
+
+        windows = []
+        month_index = (start.month - 1) // self.window_months * self.window_months
+        year = start.year
+        while True:
+            window_start = date(year, month_index + 1, 1)
+            if window_start > end:
+                break
+            next_index = month_index + self.window_months
+            next_year = year + next_index // 12
+            next_index %= 12
+            window_end = date.fromordinal(
+                date(next_year, next_index + 1, 1).toordinal() - 1
+            )
+            windows.append((window_start, window_end))
+            year, month_index = next_year, next_index
+        return windows
+
+    def _cache_path(
+        self,
+        account_id: str,
+        transaction_type: str | None,
+        symbol: str | None,
+        window: tuple,
+    ) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        symbol_key = symbol.replace("/", "") if symbol else "ALL_SYMBOLS"
+        return (
+            self.cache_dir
+            / str(account_id)
+            / (transaction_type or "ALL")
+            / symbol_key
+            / f"{window[0].isoformat()}_{window[1].isoformat()}.json"
+        )
+
+    def _fetch_window(
+        self,
+        account_id: str,
+        transaction_type: str | None,
+        symbol: str | None,
+        window: tuple,
+        use_cache: bool,
+    ) -> List[dict]:
+        """Fetches a single window, using or filling the disk cache when possible."""
+        if window[0] > date.today():
+            return []
+
+        path = self._cache_path(account_id, transaction_type, symbol, window)
+        is_complete = window[1] < date.today()
+
+        if use_cache and is_complete and path is not None and path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                if self._log_debug_enabled:
+                    self.log.debug(f"Transactions cache hit: {path}")
+                return json.load(f)
+
+        res = self.accounts_service.get_transactions(
+            account_id=account_id,
+            transaction_type=transaction_type,
+            symbol=symbol,
+            start_date=window[0],
+            end_date=min(window[1], date.today()),
+            validate=False,
+        )
+        # No content responses come back as a status dict
+        transactions = res if isinstance(res, list) else []
+
+        if is_complete and path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(transactions, f)
+            temp_path.replace(path)
+
+        return transactions
+
+    def get_transactions(
+        self,
+        account_id: str,
+        start_date: datetime | date | str,
+        end_date: datetime | date | str | None = None,
+        transaction_type: str | QueryTransactionType | None = None,
+        symbol: str | None = None,
+        use_cache: bool = True,
+        validate: bool = True,
+    ) -> List[Transaction] | List[dict]:
+        """Queries the transactions for an account over any date range.
+
+        Parameters
+        ----
+        account_id: str
+            The account number you want to query transactions
+            for.
+
+        start_date: datetime | date | str
+            Only transactions on or after the start date will be returned.
+
+        end_date: datetime | date | str (optional, default=None)
+            Only transactions on or before the end date will be returned.
+            Defaults to today.
+
+        transaction_type: str | QueryTransactionType (optional, default=None)
+            The type of transaction you want to query.
+
+        symbol: str (optional, default=None)
+            Filters the transaction to the ones that only include
+            the symbol provided.
+
+        use_cache: bool (optional, default=True)
+            Set to `False` to refetch completed windows, the cache is
+            still updated.
+
+        validate: bool (optional, default=True)
+            If set to `False` the raw JSON dicts are returned instead
+            of `Transaction` models.
+
+        Usage
+        ----
+            >>> history = TransactionHistoryFetcher(td_client.accounts())
+            >>> history.get_transactions(
+                account_id='123456789',
+                start_date='2019-01-01',
+            )
+        """
+
+        if isinstance(transaction_type, str):
+            QueryTransactionType(transaction_type)
+        if isinstance(transaction_type, Enum):
+            transaction_type = transaction_type.value
+
+        start = self._to_date(start_date)
+        end = self._to_date(end_date) if end_date is not None else date.today()
+        windows = self.split_windows(start, end)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(
+                lambda window: self._fetch_window(
+                    account_id, transaction_type, symbol, window, use_cache
+                ),
+                windows,
+            )
+            window_results = list(results)
+
+        start_str, end_str = start.isoformat(), end.isoformat()
+        transactions_by_id = {}
+        for transactions in window_results:
+            for transaction in transactions:
+                transaction_date = transaction.get("transactionDate", "")[:10]
+                if not start_str <= transaction_date <= end_str:
+                    continue
+                transactions_by_id.setdefault(
+                    transaction.get("transactionId"), transaction
+                )
+
+        transactions = sorted(
+            transactions_by_id.values(),
+            key=lambda x: (x.get("transactionDate", ""), x.get("transactionId", 0)),
+        )
+
+        self.log.info(
+            f"Fetched {len(transactions)} transactions in {len(windows)} windows for {start_str} - {end_str}"
+        )
+
+        if not validate:
+            return transactions
+        return [Transaction(**x) for x in transactions]
+
+    def clear_cache(self, account_id: str | None = None) -> None:
+        """Removes the cached windows, for one account or all of them."""
+        if self.cache_dir is None:
+            return
+        root = self.cache_dir / str(account_id) if account_id else self.cache_dir
+        if not root.exists():
+            return
+        for path in sorted(root.rglob("*"), reverse=True):
+            if path.is_file():
+                path.unlink()
+            else:
+                path.rmdir()
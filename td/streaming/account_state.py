@@ -0,0 +1,375 @@
+import asyncio
+import logging
+import threading
+import time
+
+from pydantic import ValidationError
+
+from td.enums.enums import AccountActivityMessageType
+from td.enums.orders import AssetType, OrderStatus
+from td.logger import TdLogger
+from td.models.instruments import BaseInstrument
+from td.models.orders import Order
+from td.models.rest.response import AccountPositions, SecuritiesAccount
+from td.models.streaming import AccountActivityOrderEvent
+from td.rest.accounts import Accounts
+from td.streaming.handlers import (
+    FILL_MESSAGE_TYPES,
+    OPEN_ORDER_STATUSES,
+    BaseAccountActivityHandler,
+)
+
+
+class AccountStateEngine(BaseAccountActivityHandler):
+    """
+    Overview
+    ----
+    Keeps the positions, cash balance and open orders of a single account
+    in memory. The state is seeded with one `get_accounts` call, kept current
+    by applying ACCT_ACTIVITY stream events, and periodically reconciled with
+    a balances only REST request.
+
+    Usage
+    ----
+        >>> stream_client = td_client.streaming_api_client()
+        >>> stream_client.open_stream()
+        >>> account_state = AccountStateEngine(
+                accounts_service=td_client.accounts(),
+                stream_client=stream_client,
+                account_id='123456789',
+            )
+        >>> account_state.start()
+        >>> account_state.get_position("SPY")
+    """
+
+    def __init__(
+        self,
+        accounts_service: Accounts,
+        stream_client=None,
+        account_id: str | None = None,
+        reconcile_interval: float | None = 60,
+        cash_tolerance: float = 0.01,
+        on_update=None,
+    ) -> None:
+        """
+        Parameters
+        ----
+        accounts_service: Accounts
+            The `Accounts` service used to seed and reconcile the state.
+
+        stream_client: StreamingApiClient (optional, Default=None)
+            The stream client delivering ACCT_ACTIVITY messages. Only required
+            for `start`.
+
+        account_id: str (optional, Default=None)
+            The account to track, defaults to the first account of the stream
+            client's user principals.
+
+        reconcile_interval: float | None (optional, Default=60)
+            Seconds between REST reconciliations, None disables them.
+
+        cash_tolerance: float (optional, Default=0.01)
+            Allowed difference between the tracked and reported cash balance
+            before a full refresh is done.
+
+        on_update: Callable (optional, Default=None)
+            Called with each applied `AccountActivityOrderEvent`.
+        """
+        super().__init__()
+        from td.streaming.client import StreamingApiClient
+
+        self.accounts_service = accounts_service
+        self.stream_client: StreamingApiClient | None = stream_client
+        if account_id is None and stream_client is not None:
+            account_id = stream_client.user_principal_data["accounts"][0]["accountId"]
+        self.account_id = account_id
+        self.reconcile_interval = reconcile_interval
+        self.cash_tolerance = cash_tolerance
+        self._on_update = on_update
+
+        self.account: SecuritiesAccount | None = None
+        self.positions: dict[str, AccountPositions] = {}
+        self.open_orders: dict[int, Order] = {}
+        # symbol -> [long average price, short average price]
+        self.average_prices: dict[str, list[float]] = {}
+        self.cash_balance: float | None = None
+        self.last_seeded: float | None = None
+        self.last_event: float | None = None
+        self.events_applied = 0
+        self.reconciliations = 0
+        self.refreshes = 0
+
+        # Set when something happened that the incremental state can't follow
+        self._needs_refresh = False
+        self._state_lock = threading.RLock()
+        self._reconcile_task = None
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    def seed(self) -> None:
+        """Loads positions, balances and orders with a single `get_accounts` call."""
+        account = self.accounts_service.get_accounts(
+            account_id=self.account_id, include_orders=True, include_positions=True
+        )
+        if not isinstance(account, SecuritiesAccount):
+            raise ValueError(f"No securities account returned for {self.account_id}")
+
+        positions = {}
+        average_prices = {}
+        for position in account.positions or []:
+            symbol = position.instrument.symbol
+            positions[symbol] = position
+            # Only one average is reported, it belongs to the open side
+            average_prices[symbol] = [position.average_price, position.average_price]
+
+        open_orders = {}
+        for order in account.order_strategies or []:
+            if order.order_id is not None and order.status in OPEN_ORDER_STATUSES:
+                open_orders[order.order_id] = order
+
+        with self._state_lock:
+            self.account = account
+            self.positions = positions
+            self.average_prices = average_prices
+            self.open_orders = open_orders
+            self.cash_balance = (
+                account.current_balances.cash_balance
+                if account.current_balances
+                else None
+            )
+            self.last_seeded = time.time()
+            self._needs_refresh = False
+            self.refreshes += 1
+
+        self.log.info(
+            f"Account state seeded - {len(positions)} positions, {len(open_orders)} open orders"
+        )
+
+    def get_position(self, symbol: str) -> AccountPositions | None:
+        """Returns the current position for a symbol, None if flat or unknown."""
+        return self.positions.get(symbol, None)
+
+    def get_average_prices(self, symbol: str) -> tuple[float, float] | None:
+        """Returns the long and short average prices of a symbol."""
+        averages = self.average_prices.get(symbol, None)
+        return tuple(averages) if averages is not None else None
+
+    def get_open_order(self, order_id: int) -> Order | None:
+        """Returns an open order by id."""
+        return self.open_orders.get(order_id, None)
+
+    def start(self) -> None:
+        """
+        Seeds the state, adds the ACCT_ACTIVITY handler, subscribes to the
+        service and starts the reconcile loop on the stream client's loop.
+
+        The stream needs to be open before calling this.
+        """
+        if self.stream_client is None:
+            raise ValueError("start requires a stream_client")
+
+        self.seed()
+        self.stream_client.services.add_handler(
+            "data", "ACCT_ACTIVITY", self.data_message_handler
+        )
+        self.stream_client.services.account_activity()
+
+        if self.reconcile_interval:
+            self._reconcile_task = asyncio.run_coroutine_threadsafe(
+                self._reconcile_forever(), self.stream_client.loop
+            )
+
+    def stop(self) -> None:
+        """Removes the handler and stops reconciling."""
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            self._reconcile_task = None
+        if self.stream_client is not None:
+            self.stream_client.services.remove_handler(
+                "data", "ACCT_ACTIVITY", self.data_message_handler
+            )
+
+    def data_message_handler(self, msg) -> None:
+        """Handler for ACCT_ACTIVITY data messages."""
+        try:
+            events = self.construct_order_events(msg)
+        except ValidationError as e:
+            self.log.error(f"Message Construction Error: {e}")
+            self._needs_refresh = True
+            return
+
+        for event in events:
+            self.apply_event(event)
+
+    def apply_event(self, event: AccountActivityOrderEvent) -> None:
+        """Applies a single parsed account activity event to the state."""
+        if self.account_id and event.account and event.account != str(self.account_id):
+            return
+
+        message_type = event.message_type
+        with self._state_lock:
+            status = self.order_status(event)
+            if message_type in FILL_MESSAGE_TYPES:
+                self._apply_fill(event, status)
+            elif message_type == AccountActivityMessageType.BROKEN_TRADE.value:
+                # A busted trade can't be reversed reliably from the message
+                self._needs_refresh = True
+            elif status in OPEN_ORDER_STATUSES:
+                self._update_order(event, status)
+            elif status is not None:
+                self.open_orders.pop(event.order_id, None)
+            else:
+                return
+
+            self.events_applied += 1
+            self.last_event = time.time()
+
+        if self._log_debug_enabled:
+            self.log.debug(f"Account state applied {message_type} - {event.order_id}")
+
+        if self._on_update:
+            self._on_update(event)
+
+    def _update_order(self, event: AccountActivityOrderEvent, status: str) -> None:
+        if event.order_id is None:
+            return
+        order = self.open_orders.get(event.order_id, None)
+        if order is None:
+            order = self.order_from_event(event)
+            self.open_orders[event.order_id] = order
+        order.status = status
+
+    def _apply_fill(self, event: AccountActivityOrderEvent, status: str) -> None:
+        quantity = event.execution_quantity
+        price = event.execution_price
+        if not event.symbol or quantity is None or price is None:
+            self._needs_refresh = True
+            return
+
+        is_buy = self.is_buy(event)
+        multiplier = 100 if self.is_option(event) else 1
+
+        position = self.positions.get(event.symbol, None)
+        if position is None:
+            asset_type = (
+                AssetType.OPTION.value
+                if self.is_option(event)
+                else AssetType.EQUITY.value
+            )
+            position = AccountPositions.model_construct(
+                average_price=0.0,
+                current_day_cost=0.0,
+                current_day_profit_loss=0.0,
+                current_day_profit_loss_percentage=0.0,
+                instrument=BaseInstrument.model_construct(
+                    asset_type=asset_type, symbol=event.symbol
+                ),
+                long_quantity=0.0,
+                maintenance_requirement=0.0,
+                market_value=0.0,
+                previous_session_long_quantity=0.0,
+                settled_long_quantity=0.0,
+                settled_short_quantity=0.0,
+                short_quantity=0.0,
+            )
+            self.positions[event.symbol] = position
+        averages = self.average_prices.setdefault(
+            event.symbol, [position.average_price, position.average_price]
+        )
+
+        # Close out the opposite side first, the remainder opens or adds. Each
+        # side keeps its own average so a long and a short never blend
+        if is_buy:
+            closing = min(position.short_quantity, quantity)
+            position.short_quantity -= closing
+            opening = quantity - closing
+            if opening:
+                total = position.long_quantity + opening
+                averages[0] = (
+                    averages[0] * position.long_quantity + price * opening
+                ) / total
+                position.long_quantity = total
+        else:
+            closing = min(position.long_quantity, quantity)
+            position.long_quantity -= closing
+            opening = quantity - closing
+            if opening:
+                total = position.short_quantity + opening
+                averages[1] = (
+                    averages[1] * position.short_quantity + price * opening
+                ) / total
+                position.short_quantity = total
+        if position.long_quantity == 0:
+            averages[0] = 0.0
+        if position.short_quantity == 0:
+            averages[1] = 0.0
+        position.average_price = averages[0] if position.long_quantity else averages[1]
+
+        position.current_day_cost += (
+            (1 if is_buy else -1) * quantity * price * multiplier
+        )
+
+        if position.long_quantity == 0 and position.short_quantity == 0:
+            del self.positions[event.symbol]
+            del self.average_prices[event.symbol]
+
+        if self.cash_balance is not None:
+            self.cash_balance -= (1 if is_buy else -1) * quantity * price * multiplier
+
+        if event.order_id is not None:
+            order = self.open_orders.get(event.order_id, None)
+            if status == OrderStatus.FILLED.value:
+                self.open_orders.pop(event.order_id, None)
+            elif order is not None:
+                order.filled_quantity = (order.filled_quantity or 0) + quantity
+                order.remaining_quantity = event.leaves_quantity
+                order.status = status
+
+    def reconcile(self) -> bool:
+        """
+        Compares the tracked cash balance to a balances only `get_accounts`
+        request and does a full `seed` when they disagree or when an event
+        couldn't be applied incrementally.
+
+        Returns
+        ----
+        bool
+            True if a full refresh was done.
+        """
+        self.reconciliations += 1
+
+        if self._needs_refresh:
+            self.seed()
+            return True
+
+        account = self.accounts_service.get_accounts(
+            account_id=self.account_id, include_orders=False, include_positions=False
+        )
+        if not isinstance(account, SecuritiesAccount) or not account.current_balances:
+            return False
+
+        reported_cash = account.current_balances.cash_balance
+        if (
+            self.cash_balance is None
+            or abs(reported_cash - self.cash_balance) > self.cash_tolerance
+        ):
+            self.log.warning(
+                f"Account state drift - tracked cash {self.cash_balance}, reported {reported_cash}, refreshing"
+            )
+            self.seed()
+            return True
+
+        with self._state_lock:
+            self.account.current_balances = account.current_balances
+        return False
+
+    async def _reconcile_forever(self) -> None:
+        """Runs `reconcile` every `reconcile_interval` seconds off the event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await loop.run_in_executor(None, self.reconcile)
+            except Exception as e:
+                self.log.error(f"Account state reconcile failed: {e}")
@@ -0,0 +1,344 @@
+import asyncio
+import inspect
+import logging
+import time
+
+from td.enums.enums import TimesaleServices
+from td.logger import TdLogger
+
+BAR_TYPES = ("time", "tick", "volume", "dollar")
+
+TIMESALE_SERVICES = tuple(TimesaleServices.all_values())
+
+
+class Bar:
+    """An OHLCV bar built from trades, `start` and `end` in ms since epoch."""
+
+    __slots__ = (
+        "symbol",
+        "bar_type",
+        "size",
+        "start",
+        "end",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "dollar_volume",
+        "trades",
+        "complete",
+    )
+
+    def __init__(
+        self, symbol: str, bar_type: str, size: float, timestamp: int, price: float
+    ) -> None:
+        self.symbol = symbol
+        self.bar_type = bar_type
+        self.size = size
+        self.start = timestamp
+        self.end = timestamp
+        self.open = price
+        self.high = price
+        self.low = price
+        self.close = price
+        self.volume = 0.0
+        self.dollar_volume = 0.0
+        self.trades = 0
+        self.complete = False
+
+    def add(self, timestamp: int, price: float, volume: float) -> None:
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+        self.dollar_volume += price * volume
+        self.trades += 1
+        if timestamp > self.end:
+            self.end = timestamp
+
+    @property
+    def vwap(self) -> float | None:
+        return self.dollar_volume / self.volume if self.volume else None
+
+    def copy(self) -> "Bar":
+        bar = Bar.__new__(Bar)
+        for slot in Bar.__slots__:
+            setattr(bar, slot, getattr(self, slot))
+        return bar
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in Bar.__slots__}
+
+    def __repr__(self) -> str:
+        return (
+            f"Bar({self.symbol} {self.bar_type}:{self.size} {self.start}-{self.end} "
+            f"O={self.open} H={self.high} L={self.low} C={self.close} V={self.volume} "
+            f"N={self.trades} complete={self.complete})"
+        )
+
+
+class TimesaleBarAggregator:
+    """
+    Overview
+    ----
+    Builds bars incrementally from the TIMESALE_* services. Every trade
+    updates one open bar per bar spec and symbol, closed bars are passed to
+    `on_bar`.
+
+    Bar specs are `(bar_type, size)` pairs:
+
+    - `("time", seconds)`: bars aligned to multiples of `seconds` since epoch,
+      closed by the first trade of a later bar or by `flush`.
+    - `("tick", trades)`: closed after `trades` trades.
+    - `("volume", shares)`: closed once the volume reaches `shares`.
+    - `("dollar", amount)`: closed once price * volume reaches `amount`.
+
+    Trades are checked against the per symbol `seq` of the messages,
+    duplicates (a `seq` already seen) are skipped and gaps are counted and
+    passed to `on_gap`. The sequences start over on a new connection: with
+    a `stream_client` they're reset when it restarts, and a `seq` more than
+    `max_seq_rewind` behind the last one is taken as a reset, not a
+    duplicate.
+
+    Usage
+    ----
+        >>> bars = TimesaleBarAggregator(
+                [("time", 60), ("volume", 50000)],
+                on_bar=lambda bar: print(bar),
+                stream_client=stream_client,
+            )
+        >>> stream_services.add_handler("data", "TIMESALE_EQUITY", bars.data_message_handler)
+        >>> stream_services.timesale(TimesaleServices.TIMESALE_EQUITY, ["SPY"], fields=[0, 1, 2, 3, 4])
+        >>> bars.start_timer(interval=1.0, on_partial=lambda bar: print("partial", bar))
+    """
+
+    def __init__(
+        self,
+        bar_specs: list[tuple[str, float]],
+        on_bar=None,
+        on_gap=None,
+        stream_client=None,
+        max_seq_rewind: int = 100,
+    ) -> None:
+        """
+        Parameters
+        ----
+        bar_specs: list[tuple[str, float]]
+            The bars to build, see the class docstring.
+
+        on_bar: Callable (optional, Default=None)
+            Called with each closed `Bar`.
+
+        on_gap: Callable (optional, Default=None)
+            Called as `on_gap(symbol, expected_seq, received_seq)`.
+
+        stream_client: StreamingApiClient (optional, Default=None)
+            Resets the sequences when the client restarts its stream, also
+            needed for `start_timer` without a running loop.
+
+        max_seq_rewind: int (optional, Default=100)
+            Furthest a `seq` can go back and still count as a duplicate,
+            larger rewinds are sequence resets.
+        """
+        self.bar_specs = []
+        for bar_type, size in bar_specs:
+            if bar_type not in BAR_TYPES:
+                raise ValueError(f"Invalid bar type {bar_type}, must be one of {BAR_TYPES}")
+            if size <= 0:
+                raise ValueError(f"Bar size must be positive, got {size}")
+            self.bar_specs.append((bar_type, size))
+
+        self._on_bar = on_bar
+        self._on_gap = on_gap
+        self._on_partial = None
+        self.stream_client = stream_client
+        self.max_seq_rewind = max_seq_rewind
+        self._restarts = stream_client.restarts if stream_client is not None else 0
+
+        # symbol -> open bar (or None) per spec
+        self.bars: dict[str, list[Bar | None]] = {}
+        self.last_seq: dict[str, int] = {}
+        self.trades = 0
+        self.duplicates = 0
+        self.gaps = 0
+        self.missed = 0
+        self.sequence_resets = 0
+        self._timer_task = None
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    def _emit(self, bar: Bar) -> None:
+        bar.complete = True
+        if self._on_bar is None:
+            return
+        result = self._on_bar(bar)
+        if inspect.isawaitable(result):
+            asyncio.ensure_future(result)
+
+    def _check_seq(self, symbol: str, seq: int | None) -> bool:
+        """Returns False for a duplicate trade."""
+        if seq is None:
+            return True
+        last = self.last_seq.get(symbol, None)
+        if last is not None:
+            if seq <= last:
+                if last - seq <= self.max_seq_rewind:
+                    self.duplicates += 1
+                    return False
+                # The sequence started over, e.g. on a new connection
+                self.sequence_resets += 1
+                self.log.warning(
+                    f"Timesale sequence reset {symbol} - last {last}, got {seq}"
+                )
+            elif seq != last + 1:
+                self.gaps += 1
+                self.missed += seq - last - 1
+                if self._on_gap:
+                    self._on_gap(symbol, last + 1, seq)
+                elif self._log_debug_enabled:
+                    self.log.debug(f"Timesale gap {symbol} - expected {last + 1}, got {seq}")
+        self.last_seq[symbol] = seq
+        return True
+
+    def add_trade(
+        self,
+        symbol: str,
+        timestamp: int,
+        price: float,
+        volume: float,
+        seq: int | None = None,
+    ) -> bool:
+        """
+        Adds a single trade to the bars of a symbol.
+
+        Returns
+        ----
+        bool
+            False if the trade was skipped as a duplicate.
+        """
+        if not self._check_seq(symbol, seq):
+            return False
+        self.trades += 1
+
+        open_bars = self.bars.get(symbol, None)
+        if open_bars is None:
+            open_bars = self.bars[symbol] = [None] * len(self.bar_specs)
+
+        for i, (bar_type, size) in enumerate(self.bar_specs):
+            bar = open_bars[i]
+            if bar_type == "time":
+                bar_ms = int(size * 1000)
+                start = timestamp - timestamp % bar_ms
+                if bar is not None and start > bar.start:
+                    self._emit(bar)
+                    bar = None
+                if bar is None:
+                    bar = open_bars[i] = Bar(symbol, bar_type, size, start, price)
+                    bar.end = start + bar_ms
+                bar.add(timestamp, price, volume)
+                continue
+
+            if bar is None:
+                bar = open_bars[i] = Bar(symbol, bar_type, size, timestamp, price)
+            bar.add(timestamp, price, volume)
+            if (
+                (bar_type == "tick" and bar.trades >= size)
+                or (bar_type == "volume" and bar.volume >= size)
+                or (bar_type == "dollar" and bar.dollar_volume >= size)
+            ):
+                self._emit(bar)
+                open_bars[i] = None
+        return True
+
+    def data_message_handler(self, msg: dict) -> None:
+        """Handler for the raw data messages of the TIMESALE_* services."""
+        stream_client = self.stream_client
+        if stream_client is not None and stream_client.restarts != self._restarts:
+            self._restarts = stream_client.restarts
+            self.reset_sequences()
+        for entry in msg.get("content", None) or []:
+            price = entry.get("2", None)
+            timestamp = entry.get("1", None)
+            if price is None or timestamp is None:
+                continue
+            self.add_trade(
+                entry["key"],
+                int(timestamp),
+                float(price),
+                float(entry.get("3", None) or 0),
+                entry.get("seq", None),
+            )
+
+    def flush(self, now_ms: int | None = None, grace_ms: int = 0) -> int:
+        """
+        Closes the time bars whose interval ended `grace_ms` before
+        `now_ms` (defaults to the current time).
+
+        Returns
+        ----
+        int
+            Number of bars closed.
+        """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        closed = 0
+        for open_bars in self.bars.values():
+            for i, (bar_type, _) in enumerate(self.bar_specs):
+                bar = open_bars[i]
+                if bar_type == "time" and bar is not None and bar.end + grace_ms <= now_ms:
+                    self._emit(bar)
+                    open_bars[i] = None
+                    closed += 1
+        return closed
+
+    def get_open_bars(self, symbol: str) -> list[Bar | None]:
+        """The open bars of a symbol, one per spec."""
+        return list(self.bars.get(symbol, None) or [None] * len(self.bar_specs))
+
+    def reset_sequences(self) -> None:
+        """Forgets the last seen sequences, e.g. after a stream restart."""
+        self.last_seq.clear()
+
+    def start_timer(
+        self, interval: float = 1.0, on_partial=None, grace: float = 1.0
+    ) -> None:
+        """
+        Every `interval` seconds closes the time bars that ended more than
+        `grace` seconds ago and passes copies of the open bars to
+        `on_partial`.
+        """
+        self._on_partial = on_partial
+        coro = self._timer_forever(interval, grace)
+        try:
+            asyncio.get_running_loop()
+            self._timer_task = asyncio.ensure_future(coro)
+        except RuntimeError:
+            if self.stream_client is None or self.stream_client.loop is None:
+                coro.close()
+                raise ValueError("start_timer requires a running loop or a stream_client")
+            self._timer_task = asyncio.run_coroutine_threadsafe(
+                coro, self.stream_client.loop
+            )
+
+    def stop_timer(self) -> None:
+        if self._timer_task:
+            self._timer_task.cancel()
+            self._timer_task = None
+
+    async def _timer_forever(self, interval: float, grace: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.flush(grace_ms=int(grace * 1000))
+                if self._on_partial:
+                    for open_bars in list(self.bars.values()):
+                        for bar in open_bars:
+                            if bar is not None:
+                                result = self._on_partial(bar.copy())
+                                if inspect.isawaitable(result):
+                                    await result
+            except Exception as e:
+                self.log.error(f"Bar timer error: {e}")
@@ -0,0 +1,198 @@
+import time
+from enum import Enum
+
+from td.streaming.local_server import LocalStreamerServer
+
+
+class _Counter:
+    """Counts the data messages and entries a service delivered."""
+
+    __slots__ = ("messages", "entries")
+
+    def __init__(self) -> None:
+        self.messages = 0
+        self.entries = 0
+
+    def __call__(self, msg: dict) -> None:
+        self.messages += 1
+        self.entries += len(msg.get("content", ()))
+
+
+def _wait_for(condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def run_load_test(
+    rates: list[float] = (100, 1000, 5000, 10000, 20000),
+    duration: float = 5.0,
+    warmup: float = 1.0,
+    service: str | Enum = "QUOTE",
+    symbols: list[str] = ("SPY",),
+    fields: list[int] = (0, 1, 2, 3, 4, 5),
+    handler=None,
+    server: LocalStreamerServer | None = None,
+    client_kwargs: dict | None = None,
+    measure_restart: bool = True,
+) -> dict:
+    """
+    Streams from a `LocalStreamerServer` through a `StreamingApiClient` at
+    increasing rates and measures what the client keeps up with.
+
+    For each rate the server sends `rate` frames a second (each with an
+    entry per symbol) for `duration` seconds after `warmup`, and the result
+    holds the frames sent and received a second, the frames the server
+    couldn't send in time, and the `StreamMonitor` percentiles (ms) of the
+    timestamp to dispatch latency, decoding and handlers. With
+    `measure_restart` the server then drops the connection and the client's
+    restart statistics are added.
+
+    The server runs in a thread of the same process, so at high rates the
+    two compete for the GIL and the results are a lower bound of what the
+    client alone keeps up with.
+
+    Parameters
+    ----
+    rates: list[float] (optional)
+        Frames per second to test, in order.
+
+    duration: float (optional, Default=5.0)
+        Seconds measured per rate.
+
+    warmup: float (optional, Default=1.0)
+        Seconds streamed at a new rate before measuring.
+
+    service: str | Enum (optional, Default="QUOTE")
+        The service streamed.
+
+    symbols: list[str] (optional, Default=("SPY",))
+        The keys subscribed.
+
+    fields: list[int] (optional, Default=(0, 1, 2, 3, 4, 5))
+        The fields subscribed.
+
+    handler: Callable (optional, Default=None)
+        A data handler to benchmark, added next to the counter.
+
+    server: LocalStreamerServer (optional, Default=None)
+        A started server to use, e.g. one streaming a recording. By
+        default a new one on a free port.
+
+    client_kwargs: dict (optional, Default=None)
+        Passed to `LocalStreamerServer.make_client`.
+
+    measure_restart: bool (optional, Default=True)
+        Drop the connection after the load steps and measure the restart.
+
+    Returns
+    ----
+    dict
+        `steps` (one dict per rate) and `restart`.
+
+    Usage
+    ----
+        >>> results = run_load_test(rates=[1000, 10000], duration=3)
+        >>> print(format_results(results))
+    """
+    if isinstance(service, Enum):
+        service = service.value
+    own_server = server is None
+    if own_server:
+        server = LocalStreamerServer(port=0, rate=0, heartbeat_interval=1.0)
+        server.start()
+
+    stream_client = server.make_client(**(client_kwargs or {}))
+    counter = _Counter()
+    results = {"steps": [], "restart": None}
+    try:
+        stream_client.open_stream()
+        if not _wait_for(stream_client.logged_in_event.is_set, 10):
+            raise TimeoutError(f"The client did not log in to {server.url}")
+        stream_client.add_handler("data", service, counter)
+        if handler is not None:
+            stream_client.add_handler("data", service, handler)
+        monitor = stream_client.enable_monitor(
+            lag_threshold_ms=None, stall_after=None, heartbeat_timeout=None
+        )
+        stream_client.subscriptions.subscribe(service, list(symbols), list(fields))
+
+        for rate in rates:
+            server.set_rate(rate)
+            time.sleep(warmup)
+
+            monitor.reset()
+            stream_client._router.reset_stats()
+            messages, entries = counter.messages, counter.entries
+            sent, skipped = server.data_items_sent, server.frames_skipped
+            started = time.perf_counter()
+            time.sleep(duration)
+            elapsed = time.perf_counter() - started
+
+            lag = monitor.stats()["services"].get(service, None) or {}
+            results["steps"].append(
+                {
+                    "rate": rate,
+                    "sent_per_sec": (server.data_items_sent - sent) / elapsed,
+                    "received_per_sec": (counter.messages - messages) / elapsed,
+                    "entries_per_sec": (counter.entries - entries) / elapsed,
+                    "skipped_by_server": server.frames_skipped - skipped,
+                    "latency_ms": lag.get("total_lag_ms", None),
+                    "decode_ms": lag.get("decode_ms", None),
+                    "handler_ms": lag.get("handler_ms", None),
+                    "handlers": stream_client.get_handler_stats(),
+                }
+            )
+        server.set_rate(rates[-1] if rates else 0)
+
+        if measure_restart:
+            # Counted once the restarted stream delivered its first data
+            first_data = stream_client.time_to_first_data.count
+            server.disconnect()
+            restarted = _wait_for(
+                lambda: stream_client.time_to_first_data.count > first_data, 30
+            )
+            results["restart"] = {
+                "restarted": restarted,
+                **stream_client.get_restart_stats(),
+            }
+    finally:
+        server.set_rate(0)
+        stream_client.disable_monitor()
+        if stream_client.loop is not None:
+            stream_client.loop.call_soon_threadsafe(stream_client.shutdown_event.set)
+        if own_server:
+            server.stop()
+    return results
+
+
+def format_results(results: dict) -> str:
+    """A table of the `run_load_test` steps and the restart timing."""
+    lines = [
+        f"{'rate':>8} {'sent/s':>9} {'recv/s':>9} {'skipped':>8} "
+        f"{'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'decode p99':>11} {'handler p99':>12}"
+    ]
+
+    def value(summary, key):
+        number = (summary or {}).get(key, None)
+        return f"{number:.2f}" if number is not None else "-"
+
+    for step in results["steps"]:
+        lines.append(
+            f"{step['rate']:>8.0f} {step['sent_per_sec']:>9.0f} "
+            f"{step['received_per_sec']:>9.0f} {step['skipped_by_server']:>8} "
+            f"{value(step['latency_ms'], 'p50'):>8} {value(step['latency_ms'], 'p99'):>8} "
+            f"{value(step['latency_ms'], 'max'):>8} {value(step['decode_ms'], 'p99'):>11} "
+            f"{value(step['handler_ms'], 'p99'):>12}"
+        )
+    restart = results.get("restart", None)
+    if restart:
+        lines.append(
+            f"restart: restarted={restart['restarted']} "
+            f"outage p50={value(restart['outage_ms'], 'p50')} ms "
+            f"time to first data p50={value(restart['time_to_first_data_ms'], 'p50')} ms"
+        )
+    return "\n".join(lines)
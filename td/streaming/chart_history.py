@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from enum import Enum
+
+from pydantic import ValidationError
+
+from td.enums.enums import ChartHistoryServices
+from td.logger import TdLogger
+from td.models.streaming import ChartHistorySnapshot
+
+
+class ChartHistoryResult:
+    """The outcome of a single chart history request."""
+
+    __slots__ = (
+        "request",
+        "request_id",
+        "symbol",
+        "snapshot",
+        "error",
+        "elapsed_ms",
+    )
+
+    def __init__(self, request: dict, symbol: str) -> None:
+        self.request = request
+        self.request_id: int | None = None
+        self.symbol = symbol
+        # ChartHistorySnapshot, or the raw content entry when not parsed
+        self.snapshot = None
+        self.error: str | None = None
+        self.elapsed_ms = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.snapshot is not None
+
+    def __repr__(self) -> str:
+        return (
+            f"ChartHistoryResult({self.symbol} request_id={self.request_id} "
+            f"ok={self.ok} error={self.error} elapsed_ms={self.elapsed_ms:.1f})"
+        )
+
+
+class ChartHistoryDownloader:
+    """
+    Overview
+    ----
+    Runs many chart history requests at once over a single stream. Each
+    request is sent as its own `GET`, the server echoes the request id in
+    field 0 of the snapshot (`ChartHistorySnapshot.request_id`), which is
+    used to hand the snapshot back to the request that asked for it. One
+    snapshot handler serves all requests, so nothing has to be added or
+    removed between requests.
+
+    Has to run on the stream client's event loop. Usually used through
+    `StreamingServices.chart_history_bulk`.
+
+    Usage
+    ----
+        >>> downloader = ChartHistoryDownloader(stream_services, max_concurrency=10)
+        >>> async for result in downloader.download(requests):
+                print(result.symbol, len(result.snapshot.data))
+    """
+
+    def __init__(
+        self,
+        services,
+        service: str | Enum = ChartHistoryServices.CHART_HISTORY_FUTURES,
+        max_concurrency: int = 10,
+        timeout: float = 15.0,
+        as_model: bool = True,
+        max_unmatched: int = 100,
+    ) -> None:
+        """
+        Parameters
+        ----
+        services: StreamingServices
+            The streaming services of an open stream client.
+
+        service: str | Enum (optional, Default=CHART_HISTORY_FUTURES)
+            The chart history service.
+
+        max_concurrency: int (optional, Default=10)
+            Requests waiting for a snapshot at the same time.
+
+        timeout: float (optional, Default=15.0)
+            Seconds to wait for the snapshot of a request.
+
+        as_model: bool (optional, Default=True)
+            Parse snapshots into `ChartHistorySnapshot`, otherwise results
+            hold the raw content entry.
+
+        max_unmatched: int (optional, Default=100)
+            Snapshots kept for request ids that aren't registered yet.
+        """
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+        if isinstance(service, Enum):
+            service = service.value
+
+        self.services = services
+        self.stream_client = services.stream_client
+        self.service = service
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.as_model = as_model
+        self.max_unmatched = max_unmatched
+
+        # request id -> future of the snapshot content entry
+        self._pending: dict[str, asyncio.Future] = {}
+        # snapshots received before their request id was registered
+        self._unmatched: OrderedDict[str, dict] = OrderedDict()
+        self.received = 0
+        self.unknown = 0
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    def snapshot_message_handler(self, msg: dict) -> None:
+        """Routes the snapshot content entries to the requests by request id."""
+        for entry in msg.get("content", None) or []:
+            request_id = entry.get("0", None)
+            if request_id is None:
+                continue
+            request_id = str(request_id)
+            self.received += 1
+            future = self._pending.pop(request_id, None)
+            if future is None:
+                self.unknown += 1
+                self._unmatched[request_id] = entry
+                if len(self._unmatched) > self.max_unmatched:
+                    self._unmatched.popitem(last=False)
+                continue
+            if not future.done():
+                future.set_result(entry)
+
+    async def _request(
+        self, semaphore: asyncio.Semaphore, kwargs: dict
+    ) -> ChartHistoryResult:
+        symbol = kwargs.get("symbol", None)
+        result = ChartHistoryResult(kwargs, symbol)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                request = self.services.chart_history_request(
+                    service=self.service, **kwargs
+                )
+            except (TypeError, ValueError) as e:
+                result.error = str(e)
+                return result
+
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            request_id = await self.stream_client._add_data_request(request)
+            result.request_id = request_id
+            key = str(request_id)
+            entry = self._unmatched.pop(key, None)
+            if entry is not None:
+                future.set_result(entry)
+            else:
+                self._pending[key] = future
+
+            try:
+                entry = await asyncio.wait_for(future, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                self._pending.pop(key, None)
+                result.error = f"Timeout after {self.timeout}s"
+                result.elapsed_ms = (time.perf_counter() - start) * 1000
+                return result
+
+            result.elapsed_ms = (time.perf_counter() - start) * 1000
+            if not self.as_model:
+                result.snapshot = entry
+                return result
+            try:
+                result.snapshot = ChartHistorySnapshot(**entry)
+                result.symbol = result.snapshot.symbol
+            except ValidationError as e:
+                result.error = f"Message Construction Error: {e}"
+            return result
+
+    async def download(self, requests: list[dict]):
+        """
+        Sends the requests, at most `max_concurrency` at a time, and yields
+        a `ChartHistoryResult` per request as they complete.
+
+        Parameters
+        ----
+        requests: list[dict]
+            `chart_history` keyword arguments (`symbol`, `frequency` and
+            `period` or `start_time` / `end_time`), one symbol each.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        await self.stream_client._add_handler(
+            "snapshot", self.service, self.snapshot_message_handler
+        )
+        tasks = [asyncio.ensure_future(self._request(semaphore, r)) for r in requests]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if self._log_debug_enabled:
+                    self.log.debug(f"Chart history - {result}")
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._pending.clear()
+            self._unmatched.clear()
+            await self.stream_client._remove_handler(
+                "snapshot", self.service, self.snapshot_message_handler
+            )
@@ -3,6 +3,7 @@ import inspect
 import urllib
 import asyncio
 import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
 import logging
 from datetime import datetime
@@ -10,11 +11,17 @@ from websockets import client as ws_client
 from websockets import exceptions as ws_exceptions
 import json
 
-from td.enums.enums import ServiceState, StreamApiResponse
+from td.enums.enums import BackpressurePolicy, ServiceState
 from td.logger import TdLogger
 from td.rest.user_info import UserInfo
 from td.session import TdAmeritradeSession
+from td.streaming.dispatch import HandlerRouter
+from td.streaming.monitor import StreamMonitor
+from td.streaming.recorder import StreamRecorder
+from td.streaming.request_tracker import RequestResult, RequestTracker
 from td.streaming.services import StreamingServices
+from td.streaming.subscriptions import SubscriptionManager
+from td.utils.metrics import LatencyStats
 
 
 class ShutdownException(Exception):
@@ -37,25 +44,48 @@ class StreamingApiClient:
         on_stream_restarted=None,
         log_received_messages=False,
         log_sent_messages=True,
+        request_batch_window: float = 0.0,
+        request_timeout: float = 30.0,
+        replay_subscriptions: bool = True,
+        user_principal_data: dict | None = None,
     ) -> None:
         """
         Initalizes the Streaming Client which handles websocket based requests for the
         TD Streaming API in an event loop.
 
+        Data requests are sent as soon as they are added. With a
+        `request_batch_window` (seconds) the sender waits that long after the
+        first request so a burst of requests goes out in a single frame.
+
+        Every data request gets a future, resolved with a `RequestResult`
+        when its `response` arrives or after `request_timeout` seconds, see
+        `wait_for_request`.
+
+        With `replay_subscriptions` the subscriptions (and QOS) are sent
+        again in a single frame as soon as a restarted stream logged in.
+
+        `user_principal_data` skips fetching the user principals, e.g. for
+        a client that only replays recordings or connects to a local
+        server.
+
         Usage
         ----
             >>> stream_client = td_client.streaming_api_client()
         """
         self._services = None
 
+        # Only guards (re)connecting and reads, sends never wait behind a recv()
         self._websocket_lock = asyncio.Lock()
+        self._receive_lock = asyncio.Lock()
         self._req_num_lock = asyncio.Lock()
         self._data_requests_lock = asyncio.Lock()
         self._subscribed_services_lock = asyncio.Lock()
         self._handlers_lock = asyncio.Lock()
         self._restart_lock = asyncio.Lock()
 
-        self.user_principal_data = UserInfo(session=session).get_user_principals()
+        if user_principal_data is None:
+            user_principal_data = UserInfo(session=session).get_user_principals()
+        self.user_principal_data = user_principal_data
         socket_url = self.user_principal_data["streamerInfo"]["streamerSocketUrl"]
         self.websocket_url = f"wss://{socket_url}/ws"
 
@@ -64,8 +94,36 @@ class StreamingApiClient:
         self.is_stream_restarted = False
 
         self._handlers = defaultdict(list)
+        self._router = HandlerRouter()
         self.subscribed_services = {}
         self.data_requests = {"requests": []}
+        self._data_requests_enqueued_at = []
+        self._data_requests_event = asyncio.Event()
+        self.request_batch_window = request_batch_window
+
+        # Enqueue to send latency (ms) of data requests
+        self.request_latency = LatencyStats()
+        self.request_frames_sent = 0
+        self.requests_sent = 0
+        self.request_tracker = RequestTracker(timeout=request_timeout)
+        self.subscriptions = SubscriptionManager(self)
+        self.replay_subscriptions = replay_subscriptions
+
+        # Restart to first data message after it (ms), from the re-login and
+        # from the moment the connection was found closed
+        self.restarts = 0
+        self.time_to_first_data = LatencyStats()
+        self.restart_outage = LatencyStats()
+        self._restart_started_at = None
+        self._restart_logged_in_at = None
+        # Set by `enable_monitor` / `start_recording`
+        self.monitor = None
+        self.recorder = None
+
+        # Messages parsed directly / only after sanitizing / not at all
+        self.parse_fast_count = 0
+        self.parse_slow_count = 0
+        self.parse_failed_count = 0
 
         self.log = TdLogger(__name__).logger
         self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
@@ -156,20 +214,204 @@ class StreamingApiClient:
 
     async def _add_data_request(self, request: dict) -> int:
         """Adds a data request to be sent"""
+        request_ids = await self._add_data_requests([request])
+        return request_ids[0]
+
+    async def _add_data_requests(
+        self, requests: list[dict], observe: bool = True
+    ) -> list[int]:
+        """
+        Adds data requests to be sent together, in order.
+
+        With `observe` the subscription manager follows the subscription
+        changes in the requests.
+        """
         await self.logged_in_event.wait()
         async with self._data_requests_lock:
-            request["requestid"] = await self._req_num()
-            self.data_requests["requests"].append(request)
-
-        service = request["service"]
-        if not self.subscribed_services.get(service, None):
-            await self._add_subscribed_service(service)
-        return request["requestid"]
+            enqueued_at = time.perf_counter()
+            for request in requests:
+                request["requestid"] = await self._req_num()
+                self.request_tracker.track(request)
+                if observe:
+                    self.subscriptions.observe(request)
+                self.data_requests["requests"].append(request)
+                self._data_requests_enqueued_at.append(enqueued_at)
+            self._data_requests_event.set()
+
+        for request in requests:
+            service = request["service"]
+            if not self.subscribed_services.get(service, None):
+                await self._add_subscribed_service(service)
+        return [request["requestid"] for request in requests]
 
     def add_data_request(self, request: dict) -> int:
         """Adds a data request to be sent"""
         return self._run_threadsafe_wrapper(self._add_data_request, request)
 
+    async def _submit_data_request(
+        self, request: dict, timeout: float | None = None
+    ) -> RequestResult:
+        """Adds a data request and waits for its response"""
+        request_id = await self._add_data_request(request)
+        return await self._wait_for_request(request_id, timeout)
+
+    def submit_data_request(
+        self, request: dict, timeout: float | None = None
+    ) -> RequestResult:
+        """
+        Adds a data request and waits for its response.
+
+        Usage
+        ----
+            >>> request = stream_services.service_helper("QUOTE", ["SPY"], fields=[0, 1, 2])
+            >>> result = stream_client.submit_data_request(request, timeout=5)
+            >>> result.ok, result.message
+        """
+        return self._run_threadsafe_wrapper(self._submit_data_request, request, timeout)
+
+    async def _wait_for_request(
+        self, request_id: int, timeout: float | None = None
+    ) -> RequestResult | None:
+        """Waits for the result of a request"""
+        future = self.request_tracker.get_future(request_id)
+        if future is None:
+            return None
+        if timeout is None:
+            return await future
+        try:
+            # Shielded, a short wait here doesn't expire the request
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def wait_for_request(
+        self, request_id: int, timeout: float | None = None
+    ) -> RequestResult | None:
+        """
+        Waits for the response of a request added earlier, e.g. the request
+        number returned by a `StreamingServices` method.
+
+        Parameters
+        ----
+        request_id: int
+            The request number.
+
+        timeout: float (optional, Default=None)
+            Seconds to wait, defaults to the request's own timeout.
+
+        Returns
+        ----
+        RequestResult | None
+            The result, `timed_out` is set if the request expired. None if the
+            request is unknown (or resolved long ago), or `timeout` passed first.
+
+        Usage
+        ----
+            >>> request_id = stream_services.level_one_quotes(["SPY"])
+            >>> result = stream_client.wait_for_request(request_id)
+            >>> result.ok, result.code, result.latency_ms
+        """
+        return self._run_threadsafe_wrapper(self._wait_for_request, request_id, timeout)
+
+    def _record_first_data(self) -> None:
+        now = time.perf_counter()
+        self.time_to_first_data.add((now - self._restart_logged_in_at) * 1000)
+        if self._restart_started_at is not None:
+            self.restart_outage.add((now - self._restart_started_at) * 1000)
+        self._restart_logged_in_at = None
+        self._restart_started_at = None
+
+    def get_restart_stats(self) -> dict:
+        """
+        Returns the number of restarts, the time from re-login to the first
+        data message (ms) and the time from the dropped connection to it.
+
+        Usage
+        ----
+            >>> stream_client.get_restart_stats()
+        """
+        return {
+            "restarts": self.restarts,
+            "time_to_first_data_ms": self.time_to_first_data.summary(),
+            "outage_ms": self.restart_outage.summary(),
+        }
+
+    def get_request_stats(self) -> dict:
+        """
+        Returns the pending, succeeded, failed and timed out requests and the
+        enqueue to response latency (ms).
+
+        Usage
+        ----
+            >>> stream_client.get_request_stats()
+        """
+        return self.request_tracker.stats()
+
+    def enable_monitor(self, interval: float = 1.0, **kwargs) -> StreamMonitor:
+        """
+        Starts measuring the lag of every service and checking for stalled
+        services and missed heartbeats, see `StreamMonitor` for the
+        arguments. Requires an open stream.
+
+        Usage
+        ----
+            >>> stream_client.enable_monitor(
+                    lag_threshold_ms=500, on_alert=lambda alert: print(alert)
+                )
+        """
+        self.disable_monitor()
+        monitor = StreamMonitor(stream_client=self, **kwargs)
+        monitor.start(interval)
+        self.monitor = monitor
+        return monitor
+
+    def disable_monitor(self) -> None:
+        if self.monitor is not None:
+            self.monitor.stop()
+            self.monitor = None
+
+    def get_monitor_stats(self) -> dict | None:
+        """
+        Returns the per service lag percentiles (ms), stalled services and
+        heartbeat state, None if the monitor isn't enabled.
+
+        Usage
+        ----
+            >>> stream_client.get_monitor_stats()
+        """
+        if self.monitor is None:
+            return None
+        return self.monitor.stats()
+
+    def start_recording(self, directory, **kwargs) -> StreamRecorder:
+        """
+        Starts recording every raw frame received, with its receive time,
+        to compressed segment files in `directory`. See `StreamRecorder`
+        for the arguments.
+
+        Usage
+        ----
+            >>> stream_client.start_recording("recordings", max_segment_age=900)
+            >>> stream_client.stop_recording()
+        """
+        self.stop_recording()
+        recorder = StreamRecorder(directory, **kwargs)
+        recorder.start()
+        self.recorder = recorder
+        return recorder
+
+    def stop_recording(self) -> StreamRecorder | None:
+        """
+        Stops the recorder after writing its buffered frames, see
+        `StreamRecorder.stop` for the `TimeoutError` when that takes too long.
+        """
+        recorder = self.recorder
+        if recorder is None:
+            return None
+        self.recorder = None
+        recorder.stop()
+        return recorder
+
     # ADMIN - LOGIN
     async def _build_login_request(self) -> dict:
         """
@@ -225,6 +467,7 @@ class StreamingApiClient:
 
         async with self._handlers_lock:
             self._handlers[(response_type, service)].append(func_)
+            self._router.compile(self._handlers)
 
     def add_handler(self, response_type: str, service: str, func_) -> None:
         """Adds a handler for a received message"""
@@ -243,6 +486,7 @@ class StreamingApiClient:
                     self.log.error(
                         f"Not in handlers / already removed?\n {response_type} - {service} - {func_}"
                     )
+                self._router.compile(self._handlers)
 
     def remove_handler(self, response_type: str, service: str, func_):
         """Removes a handler for a received message"""
@@ -252,16 +496,9 @@ class StreamingApiClient:
         )
 
     async def _has_handler(self, response_type: str, service: str, func_):
-        """Removes a handler for a received message"""
+        """Checks if a specific handler exists"""
         async with self._handlers_lock:
-            if self._handlers.get((response_type, service), None):
-                try:
-                    handler = self._handlers[(response_type, service)]
-                    if handler == func_:
-                        return True
-                except ValueError:
-                    return False
-            return False
+            return func_ in self._handlers.get((response_type, service), [])
 
     def has_handler(self, response_type: str, service: str, func_):
         """Checks if a specific handler exists"""
@@ -270,26 +507,145 @@ class StreamingApiClient:
             self._has_handler, response_type, service, func_
         )
 
+    async def _set_backpressure_policy(
+        self,
+        service: str,
+        policy: str | BackpressurePolicy,
+        max_queue: int | None,
+        workers: int,
+        max_block: float,
+        interval: float,
+    ) -> None:
+        async with self._handlers_lock:
+            blocked = self._router.set_policy(
+                service, policy, max_queue, workers, max_block, interval
+            )
+        # Queued messages moved into a full `block` queue
+        if blocked:
+            for put in blocked:
+                await put
+
+    def set_backpressure_policy(
+        self,
+        service: str,
+        policy: str | BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+        max_queue: int | None = 1000,
+        workers: int = 1,
+        max_block: float = 1.0,
+        interval: float = 0.0,
+    ) -> None:
+        """
+        Runs a service's data handlers from a bounded queue instead of the
+        websocket reader.
+
+        Services with async handlers and no policy already use an unbounded
+        queue that never drops or waits. `block` is the only policy that
+        makes the websocket reader wait, it trades reader latency (for every
+        service on the connection) for not dropping messages.
+
+        Parameters
+        ----
+        service: str
+            The streaming service, e.g. `QUOTE`.
+
+        policy: str | BackpressurePolicy (optional, Default="drop_oldest")
+            What to do when the queue is full. `block` makes the reader wait
+            up to `max_block` seconds then drops the oldest message,
+            `drop_oldest` drops the oldest message right away and `conflate`
+            merges updates per symbol, separately for each handler, so
+            handlers get the latest state.
+
+        max_queue: int | None (optional, Default=1000)
+            Messages held, or symbols when conflating. None doesn't bound the
+            queue (not for `conflate`).
+
+        workers: int (optional, Default=1)
+            Tasks running the handlers, more than one doesn't keep the
+            message order.
+
+        max_block: float (optional, Default=1.0)
+            Longest the reader waits for space under the `block` policy.
+
+        interval: float (optional, Default=0.0)
+            With `conflate`, the least seconds between calls of a handler.
+
+        Usage
+        ----
+            >>> stream_client.set_backpressure_policy("QUOTE", "conflate")
+            >>> stream_client.set_backpressure_policy("TIMESALE_EQUITY", "drop_oldest", max_queue=5000)
+        """
+        return self._run_threadsafe_wrapper(
+            self._set_backpressure_policy,
+            service,
+            policy,
+            max_queue,
+            workers,
+            max_block,
+            interval,
+        )
+
+    async def _clear_backpressure_policy(self, service: str) -> None:
+        async with self._handlers_lock:
+            blocked = self._router.clear_policy(service)
+        if blocked:
+            for put in blocked:
+                await put
+
+    def clear_backpressure_policy(self, service: str) -> None:
+        """Removes a service's backpressure policy."""
+        return self._run_threadsafe_wrapper(self._clear_backpressure_policy, service)
+
+    def get_queue_stats(self) -> list[dict]:
+        """
+        Returns depth, drops, merges and blocking of every service queue.
+
+        Usage
+        ----
+            >>> stream_client.get_queue_stats()
+        """
+        return self._router.get_queue_stats()
+
+    def get_handler_stats(self) -> list[dict]:
+        """
+        Returns the call count, errors and durations (ms) of every handler.
+
+        Usage
+        ----
+            >>> stream_client.get_handler_stats()
+        """
+        return self._router.get_stats()
+
     async def _send_data_requests(self):
-        """Sends the data requests added, forever."""
+        """
+        Sends the data requests added, forever.
+
+        This is the only task writing to the websocket once logged in, with
+        `data_requests` as its outbound queue, so it never contends with the
+        reader task.
+        """
 
         await self.logged_in_event.wait()
 
-        # Send the data requests, and start getting messages.
+        # Wake up when requests are added instead of polling for them.
         while not self.shutdown_event.is_set():
-            await asyncio.sleep(0.1)
+            await self._data_requests_event.wait()
+            if self.shutdown_event.is_set():
+                break
+            if self.request_batch_window:
+                await asyncio.sleep(self.request_batch_window)
             async with self._data_requests_lock:
+                self._data_requests_event.clear()
                 if not self.data_requests["requests"]:
                     continue
 
+                requests = self.data_requests["requests"]
+                request_ids = [r["requestid"] for r in requests]
                 data_requests = json.dumps(self.data_requests)
+                enqueued_at = self._data_requests_enqueued_at
                 self.data_requests = {"requests": []}
+                self._data_requests_enqueued_at = []
             try:
-                data_request_task = self.loop.create_task(
-                    self._send_message(data_requests)
-                )
-                self.background_tasks.add(data_request_task)
-                data_request_task.add_done_callback(self.background_tasks.discard)
+                sent = await self._send_message(data_requests)
             except ws_exceptions.ConnectionClosed:
                 try:
                     self.log.debug(
@@ -301,15 +657,24 @@ class StreamingApiClient:
                     self.log.error(
                         f"Error while restarting the stream: {restart_stream_error}"
                     )
+                    self.request_tracker.fail(request_ids, "Stream restart failed")
                     raise  # This will re-raise the exception to the calling function
-                try:
-                    data_request_task = self.loop.create_task(
-                        self._send_message(data_requests)
-                    )
-                    self.background_tasks.add(data_request_task)
-                    data_request_task.add_done_callback(self.background_tasks.discard)
-                except Exception as e:
-                    self.log.error("Error after restarting in data_requests... %s", e)
+                # Sent again, ahead of the requests added during the outage
+                async with self._data_requests_lock:
+                    self.data_requests["requests"][:0] = requests
+                    self._data_requests_enqueued_at[:0] = enqueued_at
+                    self._data_requests_event.set()
+                continue
+
+            if not sent:
+                self.request_tracker.fail(request_ids, "Sending the request failed")
+                continue
+            sent_at = time.perf_counter()
+            for timestamp in enqueued_at:
+                self.request_latency.add((sent_at - timestamp) * 1000)
+            self.request_tracker.mark_sent(request_ids, sent_at)
+            self.request_frames_sent += 1
+            self.requests_sent += len(requests)
 
     async def _connect(self, restart=False) -> None:
         """Connects the Client to the TD Websocket or attempts to reconnect."""
@@ -360,7 +725,7 @@ class StreamingApiClient:
                                 self.logged_in_event.set()
                                 return
 
-    async def _send_message(self, message: str) -> None:
+    async def _send_message(self, message: str) -> bool:
         """Sends a message to webSocket server
 
         Parameters
@@ -368,37 +733,41 @@ class StreamingApiClient:
         message: str
             The JSON string with the data streaming
             service subscription.
+
+        Returns
+        ----
+        bool
+            Whether the message was sent. A closed connection raises
+            `ConnectionClosed` so the caller can restart the stream.
         """
         if self._log_debug_enabled and self._log_sent_messages:
-            modified_data = json.loads(message)
-            # Remove the credential and token fields from the copy
-            for req in modified_data["requests"]:
-                params = req["parameters"]
-                if "credential" in params:
-                    params["credential"] = "<redacted>"
-                if "token" in params:
-                    params["token"] = "<redacted>"
-
-            # Log the modified message
-            log_safe_message = json.dumps(modified_data)
-            self.log.debug(f"Sending message:\n{log_safe_message}")
+            self.log.debug(f"Sending message:\n{self._redact_message(message)}")
 
-        async with self._websocket_lock:
-            try:
-                await self._connection.send(message)
-            except:
-                modified_data = json.loads(message)
-                # Remove the credential and token fields from the copy
-                for req in modified_data["requests"]:
-                    params = req["parameters"]
-                    if "credential" in params:
-                        params["credential"] = "<redacted>"
-                    if "token" in params:
-                        params["token"] = "<redacted>"
-
-                # Log the modified message
-                log_safe_message = json.dumps(modified_data)
-                self.log.error(f"Exception sending message:\n{log_safe_message}")
+        try:
+            await self._connection.send(message)
+        except ws_exceptions.ConnectionClosed:
+            self.log.error(
+                f"Connection closed sending message:\n{self._redact_message(message)}"
+            )
+            raise
+        except Exception as e:
+            self.log.error(
+                f"Exception sending message: {e}\n{self._redact_message(message)}"
+            )
+            return False
+        return True
+
+    @staticmethod
+    def _redact_message(message: str) -> str:
+        """A copy of a request message without the credential and token fields."""
+        modified_data = json.loads(message)
+        for req in modified_data["requests"]:
+            params = req["parameters"]
+            if "credential" in params:
+                params["credential"] = "<redacted>"
+            if "token" in params:
+                params["token"] = "<redacted>"
+        return json.dumps(modified_data)
 
     async def _receive_message(self, return_value: bool = False) -> dict:
         """Receives and processes the messages as needed.
@@ -414,83 +783,13 @@ class StreamingApiClient:
         dict:
             The streaming message.
         """
-        response_types = StreamApiResponse.all_values()
-
         while not self.shutdown_event.is_set():
             try:
-                async with self._websocket_lock:
+                async with self._receive_lock:
                     message = await self._connection.recv()
-                msg = await self._parse_json_message(message=message)
-
-                if self._log_debug_enabled and self._log_received_messages:
-                    self.log.debug(msg)
-
-                if "notify" in msg:
-                    for r in msg["notify"]:
-                        service = r.get("service", None)
-                        content = r.get("content", None)
-                        if service and content:
-                            content_msg = content.get("msg", None)
-                            if content_msg:
-                                if service == "ADMIN":
-                                    # capture Stop streaming due to empty subscription
-                                    #  and other potential admin messages
-                                    self.log.info(content["msg"])
-                                    if (
-                                        content_msg
-                                        == "Stop streaming due to empty subscription"
-                                    ):
-                                        # If server says we aren't subscribed to anything then set it as such
-                                        self.subscribed_services = {}
-                                        self.logged_in_event.clear()
-
-                if "response" in msg or "snapshot" in msg:
-                    received_type = None
-                    if "snapshot" in msg:
-                        received_type = "snapshot"
-                    else:
-                        received_type = "response"
-                    for r in msg[received_type]:
-                        service = r.get("service", None)
-                        command = r.get("command", None)
-
-                        if service and command:
-                            if command == "SUBS":
-                                content = r.get("content", None)
-                                if content:
-                                    code = content.get("code", None)
-                                    if code == 0:
-                                        await self._add_subscribed_service(
-                                            service,
-                                            service_state=ServiceState.SUBSCRIBED,
-                                        )
-                                    else:
-                                        await self._remove_subscribed_service(
-                                            service, failed_add=True, content=content
-                                        )
-                            elif command == "GET":
-                                await self._add_subscribed_service(
-                                    service, service_state=ServiceState.SUBSCRIBED
-                                )
-                            elif command == "UNSUBS":
-                                await self._remove_subscribed_service(service)
-
-                if self._on_message_received:
-                    result = self._on_message_received(msg)
-                    if inspect.isawaitable(result):
-                        asyncio.ensure_future(result)
-
-                if any(key in msg for key in response_types):
-                    for type_ in response_types:
-                        if type_ in msg:
-                            for d in msg[type_]:
-                                service = d.get("service", None)
-                                if service:
-                                    if (type_, service) in self._handlers:
-                                        for handler in self._handlers[(type_, service)]:
-                                            result = handler(d)
-                                            if inspect.isawaitable(result):
-                                                asyncio.ensure_future(result)
+                if self.recorder is not None:
+                    self.recorder.record(message)
+                msg = await self._process_message(message)
 
                 if return_value:
                     return msg
@@ -512,7 +811,119 @@ class StreamingApiClient:
                 self.log.error(e)
                 return
 
+    async def _process_message(
+        self, message: str | bytes, received_at: float | None = None
+    ) -> dict:
+        """Parses a received frame and runs it through the handlers.
+
+        Parameters
+        ----
+        message: str | bytes
+            The raw frame.
+
+        received_at: float (optional, Default=None)
+            `time.time()` when the frame was received, e.g. the recorded
+            time of a replayed frame. Defaults to now.
+
+        Returns
+        ----
+        dict:
+            The parsed message.
+        """
+        monitor = self.monitor
+        if monitor is not None:
+            if received_at is None:
+                received_at = time.time()
+            decode_start = time.perf_counter()
+        msg = await self._parse_json_message(message=message)
+        if monitor is not None:
+            decoded_at = time.perf_counter()
+
+        if self._log_debug_enabled and self._log_received_messages:
+            self.log.debug(msg)
+
+        if self._restart_logged_in_at is not None and "data" in msg:
+            self._record_first_data()
+
+        if "notify" in msg:
+            for r in msg["notify"]:
+                service = r.get("service", None)
+                content = r.get("content", None)
+                if service and content:
+                    content_msg = content.get("msg", None)
+                    if content_msg:
+                        if service == "ADMIN":
+                            # capture Stop streaming due to empty subscription
+                            #  and other potential admin messages
+                            self.log.info(content["msg"])
+                            if content_msg == "Stop streaming due to empty subscription":
+                                # If server says we aren't subscribed to anything then set it as such
+                                self.subscribed_services = {}
+                                self.logged_in_event.clear()
+
+        if "response" in msg or "snapshot" in msg:
+            received_type = None
+            if "snapshot" in msg:
+                received_type = "snapshot"
+            else:
+                received_type = "response"
+            for r in msg[received_type]:
+                service = r.get("service", None)
+                command = r.get("command", None)
+                if received_type == "response":
+                    self.request_tracker.resolve(r)
+                elif command == "GET":
+                    self.request_tracker.resolve_snapshot(r)
+
+                if service and command:
+                    if command == "SUBS" or command == "ADD":
+                        content = r.get("content", None)
+                        if content:
+                            code = content.get("code", None)
+                            if code == 0:
+                                await self._add_subscribed_service(
+                                    service, service_state=ServiceState.SUBSCRIBED
+                                )
+                            elif command == "ADD" and self.subscriptions.has_keys(service):
+                                self.log.error(f"Failed Add Keys - {service}, {content}")
+                            else:
+                                self.subscriptions.discard_active(service)
+                                await self._remove_subscribed_service(
+                                    service, failed_add=True, content=content
+                                )
+                    elif command == "GET":
+                        await self._add_subscribed_service(
+                            service, service_state=ServiceState.SUBSCRIBED
+                        )
+                    elif command == "UNSUBS":
+                        # Only some keys were removed while others remain
+                        if not self.subscriptions.has_keys(service):
+                            await self._remove_subscribed_service(service)
+
+        if self._on_message_received:
+            result = self._on_message_received(msg)
+            if inspect.isawaitable(result):
+                asyncio.ensure_future(result)
+
+        # Only a full `block` policy queue, set explicitly, makes the reader wait
+        blocked = self._router.dispatch(msg)
+        if blocked:
+            for put in blocked:
+                await put
+
+        if monitor is not None:
+            monitor.record_frame(
+                msg,
+                received_at,
+                decoded_at - decode_start,
+                time.perf_counter() - decoded_at,
+            )
+
+        return msg
+
     async def _resume_connection(self):
+        if self.replay_subscriptions and self.subscriptions.has_subscriptions():
+            return
         self.log.debug(
             "Waiting for new request / subscription before restarting stream"
         )
@@ -526,12 +937,15 @@ class StreamingApiClient:
         awaitable_task = self.loop.create_task(awaitable)
         awaitable_task.add_done_callback(self.background_tasks.discard)
 
-    async def _parse_json_message(self, message: str) -> dict:
+    async def _parse_json_message(self, message: str | bytes) -> dict:
         """Parses incoming messages from the stream
 
+        Well formed messages are loaded directly, only messages that fail to
+        load go through the sanitizing path.
+
         Parameters
         ----
-        message: str
+        message: str | bytes
             A JSON string needing to be parsed.
 
         Returns
@@ -539,10 +953,21 @@ class StreamingApiClient:
         dict:
             The parsed message content.
         """
+        try:
+            msg = json.loads(message)
+            self.parse_fast_count += 1
+            return msg
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            pass
+
+        self.parse_slow_count += 1
 
         # Replace bad characters
         #  inserts a question mark instead of the unencodable character
-        message = message.encode("utf-8", "replace").decode("utf-8")
+        if isinstance(message, bytes):
+            message = message.decode("utf-8", "replace")
+        else:
+            message = message.encode("utf-8", "replace").decode("utf-8")
 
         # Replace common replacements
         message = (
@@ -554,10 +979,15 @@ class StreamingApiClient:
             return json.loads(message)
         except json.JSONDecodeError as e:
             self.log.error(e)
-            message = f"Failed to parse message:\n{message}\n trying non-strict load"
-            self.log.error(message)
+            self.log.error(
+                f"Failed to parse message:\n{message}\n trying non-strict load"
+            )
 
-            return json.loads(message, strict=False)
+            try:
+                return json.loads(message, strict=False)
+            except json.JSONDecodeError:
+                self.parse_failed_count += 1
+                raise
 
     async def _restart_stream(self, initial_delay=1, max_delay=300, backoff_factor=3):
         """Attempt to restart the stream up to max_delay."""
@@ -565,6 +995,7 @@ class StreamingApiClient:
         if self._connection.open:
             return
 
+        self._restart_started_at = time.perf_counter()
         await self._resume_connection()
 
         delay = initial_delay
@@ -575,6 +1006,10 @@ class StreamingApiClient:
                     f"Restart Stream - Connection closed, attempting to restart stream... (attempt {attempt}, delay {delay}s)"
                 )
                 await self._connect(restart=True)
+                self.restarts += 1
+                self._restart_logged_in_at = time.perf_counter()
+                if self.replay_subscriptions:
+                    await self.subscriptions._replay()
                 self.is_stream_restarted = True
                 if (
                     self._on_stream_restarted
@@ -608,6 +1043,9 @@ class StreamingApiClient:
         Currently, only relevant for internal event loop.
         """
         await self.shutdown_event.wait()
+        # Wake the request sender so it exits
+        self._data_requests_event.set()
+        self.request_tracker.cancel_all()
         raise ShutdownException
 
     async def _open_stream(
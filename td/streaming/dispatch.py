@@ -0,0 +1,746 @@
+import asyncio
+import inspect
+import logging
+import time
+from collections import deque
+from enum import Enum
+
+from td.enums.enums import BackpressurePolicy
+from td.logger import TdLogger
+
+
+class HandlerRoute:
+    """A registered handler, whether it's async, and its call statistics."""
+
+    __slots__ = (
+        "response_type",
+        "service",
+        "func_",
+        "is_async",
+        "calls",
+        "errors",
+        "total_time",
+        "max_time",
+    )
+
+    def __init__(self, response_type: str, service: str, func_) -> None:
+        self.response_type = response_type
+        self.service = service
+        self.func_ = func_
+        self.is_async = inspect.iscoroutinefunction(func_) or (
+            not inspect.isfunction(func_)
+            and not inspect.ismethod(func_)
+            and inspect.iscoroutinefunction(getattr(func_, "__call__", None))
+        )
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, duration: float) -> None:
+        self.calls += 1
+        self.total_time += duration
+        if duration > self.max_time:
+            self.max_time = duration
+
+    def stats(self) -> dict:
+        """Call count, errors and durations in milliseconds."""
+        return {
+            "response_type": self.response_type,
+            "service": self.service,
+            "handler": getattr(self.func_, "__qualname__", repr(self.func_)),
+            "is_async": self.is_async,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": self.total_time * 1000,
+            "mean_ms": self.total_time / self.calls * 1000 if self.calls else None,
+            "max_ms": self.max_time * 1000,
+        }
+
+
+class ServiceExecutor:
+    """
+    Overview
+    ----
+    A queue between the websocket reader and the data handlers of a single
+    service, drained by `workers` tasks. What happens when the queue is full
+    depends on the policy:
+
+    - `block`: the reader waits for space, at most `max_block` seconds,
+      then the oldest message is dropped so the websocket keeps being read.
+      It trades reader latency for completeness: while it waits no other
+      service's messages are read either, so it's only used when asked for.
+    - `drop_oldest`: the oldest queued message is dropped.
+
+    Without a `max_queue` the queue is unbounded and never drops or blocks,
+    a warning is logged each time its depth doubles past `warn_depth`.
+
+    The `conflate` policy is handled by `ConflatingExecutor`.
+    """
+
+    def __init__(
+        self,
+        router: "HandlerRouter",
+        service: str,
+        policy: str | BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+        max_queue: int | None = 1000,
+        workers: int = 1,
+        max_block: float = 1.0,
+        warn_depth: int = 10000,
+    ) -> None:
+        if isinstance(policy, Enum):
+            policy = policy.value
+        if policy not in BackpressurePolicy.all_values():
+            raise ValueError(
+                f"Invalid policy {policy}, must be one of {BackpressurePolicy.all_values()}"
+            )
+        if (max_queue is not None and max_queue < 1) or workers < 1:
+            raise ValueError("max_queue and workers must be at least 1")
+        if policy == "conflate":
+            raise ValueError("Use ConflatingExecutor for the conflate policy")
+
+        self.router = router
+        self.service = service
+        self.policy = policy
+        self.max_queue = max_queue
+        self.workers = workers
+        self.max_block = max_block
+        # Compared on every offer, unbounded queues never reach it
+        self._limit = max_queue if max_queue is not None else float("inf")
+        self._warn_depth = warn_depth
+
+        self._queue = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        # Set while nothing is queued or being delivered
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = []
+        # Messages taken by a worker whose handlers haven't finished
+        self.in_flight = 0
+
+        self.enqueued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.blocked = 0
+        self.blocked_time = 0.0
+        self.block_timeouts = 0
+        self.max_depth = 0
+
+        self.log = router.log
+
+    @property
+    def depth(self) -> int:
+        """Messages waiting for the handlers."""
+        return len(self._queue)
+
+    def _ensure_workers(self) -> None:
+        if not self._tasks:
+            self._tasks = [
+                asyncio.ensure_future(self._worker()) for _ in range(self.workers)
+            ]
+
+    def offer(self, d: dict):
+        """
+        Queues a content item without waiting. Returns None when it was
+        queued, or a coroutine the reader has to await under the `block`
+        policy.
+        """
+        self._ensure_workers()
+        if len(self._queue) < self._limit:
+            self._append(d)
+            return None
+        if self.policy == "drop_oldest":
+            self._drop_oldest()
+            self._append(d)
+            return None
+        return self.put(d)
+
+    async def put(self, d: dict) -> None:
+        """Queues a content item, waiting for space under the `block` policy."""
+        self._ensure_workers()
+        if len(self._queue) >= self._limit:
+            self.blocked += 1
+            start = time.perf_counter()
+            while len(self._queue) >= self._limit:
+                self._not_full.clear()
+                remaining = self.max_block - (time.perf_counter() - start)
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    await asyncio.wait_for(self._not_full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    self.block_timeouts += 1
+                    self._drop_oldest()
+                    break
+            self.blocked_time += time.perf_counter() - start
+        self._append(d)
+
+    def _append(self, d: dict) -> None:
+        self._queue.append(d)
+        self.enqueued += 1
+        self._idle.clear()
+        if len(self._queue) > self.max_depth:
+            self.max_depth = len(self._queue)
+            if self.max_depth >= self._warn_depth:
+                self.log.warning(
+                    f"{self.service} handler queue is {self.max_depth} messages deep, "
+                    "the handlers don't keep up with the stream"
+                )
+                self._warn_depth *= 2
+        self._not_empty.set()
+
+    def _drop_oldest(self) -> None:
+        self._queue.popleft()
+        self.dropped += 1
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            self.log.warning(
+                f"{self.service} handler queue full ({self.max_queue}), {self.dropped} messages dropped"
+            )
+
+    def _take(self) -> dict | None:
+        if not self._queue:
+            return None
+        d = self._queue.popleft()
+        self._not_full.set()
+        return d
+
+    async def _worker(self) -> None:
+        while True:
+            await self._not_empty.wait()
+            d = self._take()
+            if d is None:
+                self._not_empty.clear()
+                continue
+            if not self.depth:
+                self._not_empty.clear()
+            self.in_flight += 1
+            try:
+                await self.router.deliver("data", self.service, d)
+            finally:
+                self.in_flight -= 1
+                if not self.in_flight and not self._queue:
+                    self._idle.set()
+            self.delivered += 1
+
+    async def wait_idle(self) -> None:
+        """Waits until every queued message went through its handlers."""
+        await self._idle.wait()
+
+    def close(self) -> list:
+        """Stops the workers, returns the messages that weren't delivered."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._idle.set()
+        pending = []
+        while True:
+            d = self._take()
+            if d is None:
+                return pending
+            pending.append(d)
+
+    def stats(self) -> dict:
+        """Queue depth, drops, merges and blocking of the service queue."""
+        return {
+            "service": self.service,
+            "policy": self.policy,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "in_flight": self.in_flight,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "blocked": self.blocked,
+            "blocked_ms": self.blocked_time * 1000,
+            "block_timeouts": self.block_timeouts,
+        }
+
+
+class _ConsumerBuffer:
+    """Merged per symbol updates waiting for a single handler."""
+
+    __slots__ = ("route", "entries", "envelope", "event", "task", "delivered")
+
+    def __init__(self, route: HandlerRoute) -> None:
+        self.route = route
+        self.entries: dict[str, dict] = {}
+        self.envelope: dict | None = None
+        self.event = asyncio.Event()
+        self.task = None
+        self.delivered = 0
+
+
+class ConflatingExecutor:
+    """
+    Overview
+    ----
+    Per symbol conflation for a service's data handlers, meant for level one
+    services where consumers only need the latest state. Each handler has
+    its own buffer keyed by symbol (the content entry `key`), partial updates
+    are merged into it, and the handler is called with one message holding
+    the merged entry of every symbol updated since its last call.
+
+    A handler gets at most one update per symbol per call, and with an
+    `interval` at most one call per `interval` seconds. A slow handler only
+    sees fewer, current updates, and doesn't hold back the other handlers.
+    """
+
+    policy = BackpressurePolicy.CONFLATE.value
+
+    def __init__(
+        self,
+        router: "HandlerRouter",
+        service: str,
+        max_queue: int = 1000,
+        interval: float = 0.0,
+        **kwargs,
+    ) -> None:
+        if max_queue is None or max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+        if interval < 0:
+            raise ValueError("interval can't be negative")
+
+        self.router = router
+        self.service = service
+        self.max_queue = max_queue
+        self.interval = interval
+
+        self._buffers: dict[HandlerRoute, _ConsumerBuffer] = {}
+        # Set while no buffer holds updates and no handler is being called
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.in_flight = 0
+
+        self.enqueued = 0
+        self.conflated = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+        self.log = router.log
+
+    @property
+    def depth(self) -> int:
+        """Most symbols waiting for any one handler."""
+        return max((len(x.entries) for x in self._buffers.values()), default=0)
+
+    @property
+    def delivered(self) -> int:
+        return sum(x.delivered for x in self._buffers.values())
+
+    def sync_routes(self, routes: tuple) -> None:
+        """Adds buffers for new handlers and stops the ones of removed handlers."""
+        buffers = {}
+        for route in routes:
+            buffers[route] = self._buffers.get(route, None) or _ConsumerBuffer(route)
+        for route, buffer in self._buffers.items():
+            if route not in buffers and buffer.task is not None:
+                buffer.task.cancel()
+        self._buffers = buffers
+
+    def offer(self, d: dict, route: HandlerRoute | None = None) -> None:
+        """
+        Merges the entries of a content item into every handler's buffer, or
+        only into `route`'s.
+        """
+        content = d.get("content", None) or []
+        if route is None:
+            buffers = self._buffers.values()
+        else:
+            buffers = [self._buffers[route]] if route in self._buffers else []
+        for buffer in buffers:
+            if buffer.task is None:
+                buffer.task = asyncio.ensure_future(self._worker(buffer))
+            entries = buffer.entries
+            for entry in content:
+                key = entry.get("key", None)
+                existing = entries.get(key, None)
+                if existing is None:
+                    if len(entries) >= self.max_queue:
+                        del entries[next(iter(entries))]
+                        self.dropped += 1
+                    # Copied, later updates are merged into it
+                    entries[key] = dict(entry)
+                else:
+                    existing.update(entry)
+                    self.conflated += 1
+            if entries:
+                buffer.envelope = d
+                self._idle.clear()
+                if len(entries) > self.max_depth:
+                    self.max_depth = len(entries)
+                buffer.event.set()
+        self.enqueued += len(content)
+        return None
+
+    async def put(self, d: dict) -> None:
+        self.offer(d)
+
+    def _take(self, buffer: _ConsumerBuffer) -> dict | None:
+        if not buffer.entries:
+            return None
+        envelope = buffer.envelope
+        d = {
+            "service": envelope.get("service", self.service),
+            "timestamp": envelope.get("timestamp", None),
+            "command": envelope.get("command", None),
+            "content": list(buffer.entries.values()),
+        }
+        buffer.entries = {}
+        return d
+
+    async def _worker(self, buffer: _ConsumerBuffer) -> None:
+        while True:
+            await buffer.event.wait()
+            buffer.event.clear()
+            d = self._take(buffer)
+            if d is None:
+                continue
+            start = time.perf_counter()
+            self.in_flight += 1
+            try:
+                await self.router.deliver_to(buffer.route, d)
+            finally:
+                self.in_flight -= 1
+                if not self.in_flight and not self.depth:
+                    self._idle.set()
+            buffer.delivered += 1
+            if self.interval:
+                remaining = self.interval - (time.perf_counter() - start)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+
+    async def wait_idle(self) -> None:
+        """Waits until every handler got the updates buffered for it."""
+        await self._idle.wait()
+
+    def close(self) -> dict:
+        """
+        Stops the workers, returns the merged message each handler hadn't
+        received yet, keyed by its route. Handlers drain at their own pace,
+        so every buffer holds different symbols and fields.
+        """
+        pending = {}
+        for route, buffer in self._buffers.items():
+            if buffer.task is not None:
+                buffer.task.cancel()
+                buffer.task = None
+            d = self._take(buffer)
+            if d is not None:
+                pending[route] = d
+        self._idle.set()
+        return pending
+
+    def stats(self) -> dict:
+        """Symbols waiting, merges and drops of the service."""
+        return {
+            "service": self.service,
+            "policy": self.policy,
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "in_flight": self.in_flight,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "interval": self.interval,
+            "consumers": len(self._buffers),
+        }
+
+
+def _make_executor(router: "HandlerRouter", service: str, settings: dict):
+    if settings.get("policy", None) in ("conflate", BackpressurePolicy.CONFLATE):
+        return ConflatingExecutor(router, service, **settings)
+    settings = {k: v for k, v in settings.items() if k != "interval"}
+    return ServiceExecutor(router, service, **settings)
+
+
+class HandlerRouter:
+    """
+    Overview
+    ----
+    Dispatches the content items of stream messages to the registered
+    handlers. The routing table is compiled whenever handlers change, so
+    dispatching a content item is a single dictionary lookup, and handlers
+    are sorted into sync and async ones at registration instead of checking
+    every result.
+
+    Sync handlers run inline and are timed per call. Async handlers are
+    scheduled as tasks and timed until they complete. Exceptions are logged
+    and counted per handler instead of stopping the reader.
+
+    Data messages of services with a backpressure policy, or with async
+    handlers, go through a `ServiceExecutor` instead, which runs all of the
+    service's data handlers. Services with async handlers and no policy use
+    `default_policy`, an unbounded queue that never drops a message or
+    makes the reader wait, only `block` policies set explicitly do.
+    """
+
+    default_policy = {
+        "policy": BackpressurePolicy.DROP_OLDEST.value,
+        "max_queue": None,
+        "workers": 16,
+    }
+
+    def __init__(self) -> None:
+        self._routes: dict[tuple, tuple[HandlerRoute, ...]] = {}
+        self._response_types = frozenset()
+        self._known: dict[tuple, HandlerRoute] = {}
+        self._policies: dict[str, dict] = {}
+        self._executors: dict[str, ServiceExecutor] = {}
+        self.tasks = set()
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    def compile(self, handlers: dict) -> None:
+        """
+        Rebuilds the routing table from a `(response_type, service) -> [func_]`
+        mapping. Statistics of handlers that are still registered are kept.
+        """
+        routes = {}
+        known = {}
+        for (response_type, service), funcs in handlers.items():
+            if not funcs:
+                continue
+            compiled = []
+            for func_ in funcs:
+                key = (response_type, service, func_)
+                route = self._known.get(key, None) or HandlerRoute(
+                    response_type, service, func_
+                )
+                known[key] = route
+                compiled.append(route)
+            routes[(response_type, service)] = tuple(compiled)
+
+        # Swap in complete tables, the reader may be dispatching
+        self._known = known
+        self._routes = routes
+        self._response_types = frozenset(x[0] for x in routes)
+        self._compile_executors()
+
+    def _compile_executors(self) -> None:
+        executors = {}
+        for (response_type, service), handlers in self._routes.items():
+            if response_type != "data":
+                continue
+            policy = self._policies.get(service, None)
+            if policy is None and not any(route.is_async for route in handlers):
+                continue
+            executor = self._executors.get(service, None)
+            if executor is None:
+                executor = _make_executor(self, service, policy or self.default_policy)
+            if isinstance(executor, ConflatingExecutor):
+                executor.sync_routes(handlers)
+            executors[service] = executor
+
+        for service, executor in self._executors.items():
+            if service not in executors:
+                executor.close()
+        self._executors = executors
+
+    def set_policy(
+        self,
+        service: str,
+        policy: str | BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+        max_queue: int | None = 1000,
+        workers: int = 1,
+        max_block: float = 1.0,
+        interval: float = 0.0,
+    ) -> list | None:
+        """
+        Sets the backpressure policy of a service's data handlers. Messages
+        queued under a previous policy are moved over under the new policy's
+        limits.
+
+        Returns
+        ----
+        list | None
+            Coroutines to await, in order, when the moved messages fill a
+            `block` policy queue, like `dispatch`.
+        """
+        settings = {
+            "policy": policy,
+            "max_queue": max_queue,
+            "workers": workers,
+            "max_block": max_block,
+            "interval": interval,
+        }
+        # Validates the settings before anything changes
+        executor = _make_executor(self, service, settings)
+        self._policies[service] = settings
+
+        previous = self._executors.pop(service, None)
+        handlers = self._routes.get(("data", service), None)
+        if handlers is not None:
+            if isinstance(executor, ConflatingExecutor):
+                executor.sync_routes(handlers)
+            self._executors[service] = executor
+        if previous is None:
+            return None
+        if handlers is None:
+            previous.close()
+            return None
+        return self._carry_over(service, previous)
+
+    def clear_policy(self, service: str) -> list | None:
+        """
+        Removes a service's policy, going back to the default behaviour.
+        Returns the coroutines to await like `set_policy`.
+        """
+        self._policies.pop(service, None)
+        executor = self._executors.pop(service, None)
+        if executor is None:
+            return None
+        self._compile_executors()
+        return self._carry_over(service, executor)
+
+    def _carry_over(self, service: str, previous) -> list | None:
+        """
+        Closes a replaced executor and re-dispatches what it hadn't delivered,
+        returns the coroutines to await like `dispatch`.
+        """
+        if not isinstance(previous, ConflatingExecutor):
+            pending = previous.close()
+            return self.dispatch({"data": pending}) if pending else None
+
+        # Each handler only gets the updates it hadn't received
+        executor = self._executors.get(service, None)
+        handlers = self._routes.get(("data", service), ())
+        for route, d in previous.close().items():
+            if route not in handlers:
+                continue
+            if isinstance(executor, ConflatingExecutor):
+                executor.offer(d, route)
+            elif route.is_async:
+                self._schedule(route, d)
+            else:
+                self._call(route, d)
+        return None
+
+    def dispatch(self, msg: dict) -> list | None:
+        """
+        Calls the handlers of each content item in a parsed message, or
+        queues it for the service's executor.
+
+        Returns
+        ----
+        list | None
+            Coroutines the reader has to await, in order, when a `block`
+            policy queue is full.
+        """
+        routes = self._routes
+        response_types = self._response_types
+        executors = self._executors
+        blocked = None
+        for type_, items in msg.items():
+            if type_ not in response_types:
+                continue
+            for d in items:
+                service = d.get("service", None)
+                handlers = routes.get((type_, service), None)
+                if handlers is None:
+                    continue
+                if type_ == "data" and service in executors:
+                    executor = executors[service]
+                    if blocked is not None and executor in blocked:
+                        # Keep the order behind a message that's waiting
+                        blocked[executor].append(executor.put(d))
+                        continue
+                    pending = executor.offer(d)
+                    if pending is not None:
+                        blocked = blocked or {}
+                        blocked[executor] = [pending]
+                    continue
+                for route in handlers:
+                    if route.is_async:
+                        self._schedule(route, d)
+                    else:
+                        self._call(route, d)
+        if blocked is None:
+            return None
+        return [x for pending in blocked.values() for x in pending]
+
+    async def deliver(self, response_type: str, service: str, d: dict) -> None:
+        """Runs the handlers of a content item, awaiting the async ones."""
+        for route in self._routes.get((response_type, service), ()):
+            await self.deliver_to(route, d)
+
+    async def deliver_to(self, route: HandlerRoute, d: dict) -> None:
+        """Runs a single handler, awaiting it if it's async."""
+        if not route.is_async:
+            self._call(route, d)
+            return
+        start = time.perf_counter()
+        try:
+            coro = route.func_(d)
+        except Exception as e:
+            route.errors += 1
+            self.log.error(f"Handler error {route.service} - {route.func_}: {e}")
+            return
+        await self._run_awaitable(route, coro, start, record=True)
+
+    def _call(self, route: HandlerRoute, d: dict) -> None:
+        start = time.perf_counter()
+        try:
+            result = route.func_(d)
+        except Exception as e:
+            route.errors += 1
+            self.log.error(f"Handler error {route.service} - {route.func_}: {e}")
+            return
+        finally:
+            route.record(time.perf_counter() - start)
+        # Sync callables returning an awaitable, e.g. lambdas around coroutines
+        if result is not None and inspect.isawaitable(result):
+            self._add_task(self._run_awaitable(route, result, start))
+
+    def _schedule(self, route: HandlerRoute, d: dict) -> None:
+        start = time.perf_counter()
+        try:
+            coro = route.func_(d)
+        except Exception as e:
+            route.errors += 1
+            self.log.error(f"Handler error {route.service} - {route.func_}: {e}")
+            return
+        self._add_task(self._run_awaitable(route, coro, start, record=True))
+
+    def _add_task(self, coro) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def _run_awaitable(
+        self, route: HandlerRoute, awaitable, start: float, record: bool = False
+    ) -> None:
+        try:
+            await awaitable
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            route.errors += 1
+            self.log.error(f"Handler error {route.service} - {route.func_}: {e}")
+        finally:
+            if record:
+                route.record(time.perf_counter() - start)
+
+    def get_stats(self) -> list[dict]:
+        """Returns the statistics of every registered handler."""
+        return [route.stats() for route in self._known.values()]
+
+    def get_queue_stats(self) -> list[dict]:
+        """Returns the statistics of every service queue."""
+        return [executor.stats() for executor in self._executors.values()]
+
+    def reset_stats(self) -> None:
+        """Resets the call counts and durations of every handler."""
+        for route in self._known.values():
+            route.calls = 0
+            route.errors = 0
+            route.total_time = 0.0
+            route.max_time = 0.0
@@ -1,24 +1,56 @@
 from abc import ABC
+from xml.etree import ElementTree
 
+from td.enums.enums import AccountActivityMessageType
+from td.enums.orders import OrderStatus
+from td.models.orders import Order
 from td.models.streaming import (
+    AccountActivityData,
+    AccountActivityOrderEvent,
     ActivesDataGroup,
     ActivesGroup,
     ActivesSymbol,
     DataResponseMessage,
     SnapshotResponseMessage,
 )
+from td.models.streaming_records import RecordMessage, get_record_type
 
 
 class BaseDataMessageHandler(ABC):
-    """Abstract base class for data message handlers."""
+    """Abstract base class for data message handlers.
 
-    def __init__(self, model):
+    With `use_records` the content entries are built as the model's compact
+    record type (see `td.models.streaming_records`) instead of being
+    validated into the model, and the message is a `RecordMessage`.
+    `to_model()` converts a record or the message back.
+    """
+
+    _record_type = None
+
+    def __init__(self, model, use_records: bool = False):
         self.model = model
+        self.use_records = use_records
+
+    @property
+    def use_records(self) -> bool:
+        return self._record_type is not None
+
+    @use_records.setter
+    def use_records(self, value: bool):
+        self._record_type = get_record_type(self.model) if value else None
 
     def construct_message(self, msg):
         content = msg.get("content", None)
 
         if content:
+            if self._record_type is not None:
+                from_wire = self._record_type.from_wire
+                return RecordMessage(
+                    msg.get("service", None),
+                    msg.get("timestamp", None),
+                    msg.get("command", None),
+                    [from_wire(data) for data in content],
+                )
             msg["content"] = [self.model(**data) for data in content]
             return DataResponseMessage(**msg)
         return None
@@ -90,6 +122,14 @@ class BaseChartHistoryHandler(BaseDataMessageHandler):
 
     def construct_message(self, msg):
         if msg.get("content", None):
+            if self._record_type is not None:
+                from_wire = self._record_type.from_wire
+                return RecordMessage(
+                    msg.get("service", None),
+                    msg.get("timestamp", None),
+                    msg.get("command", None),
+                    [from_wire(data) for data in msg["content"]],
+                )
             # print(f"self.model is {self.model}")
             # print(f"type of msg content{type(msg['content'])}")
             # print(f"len of msg content{len(msg['content'])}")
@@ -115,3 +155,149 @@ class BaseChartHistoryHandler(BaseDataMessageHandler):
 
             return SnapshotResponseMessage(**msg)
         return None
+
+
+OPEN_ORDER_STATUSES = {
+    OrderStatus.AWAITING_PARENT_ORDER.value,
+    OrderStatus.AWAITING_CONDITION.value,
+    OrderStatus.AWAITING_MANUAL_REVIEW.value,
+    OrderStatus.ACCEPTED.value,
+    OrderStatus.AWAITING_UR_OUT.value,
+    OrderStatus.PENDING_ACTIVATION.value,
+    OrderStatus.QUEUED.value,
+    OrderStatus.WORKING.value,
+    OrderStatus.PENDING_CANCEL.value,
+    OrderStatus.PENDING_REPLACE.value,
+}
+
+FILL_MESSAGE_TYPES = {
+    AccountActivityMessageType.ORDER_FILL.value,
+    AccountActivityMessageType.ORDER_PARTIAL_FILL.value,
+    AccountActivityMessageType.MANUAL_EXECUTION.value,
+}
+
+
+class BaseAccountActivityHandler(BaseDataMessageHandler):
+    """Base class for the ACCT_ACTIVITY service.
+
+    The order details of each message are sent as an XML document in field 3,
+    `parse_order_event` pulls the commonly needed fields out of it.
+    """
+
+    # Order status implied by a message type, fills depend on the leaves quantity
+    order_status_by_message_type = {
+        AccountActivityMessageType.ORDER_ENTRY_REQUEST.value: OrderStatus.QUEUED.value,
+        AccountActivityMessageType.ORDER_ACTIVATION.value: OrderStatus.WORKING.value,
+        AccountActivityMessageType.ORDER_CANCEL_REQUEST.value: OrderStatus.PENDING_CANCEL.value,
+        AccountActivityMessageType.ORDER_CANCEL_REPLACE_REQUEST.value: OrderStatus.PENDING_REPLACE.value,
+        AccountActivityMessageType.UR_OUT.value: OrderStatus.CANCELED.value,
+        AccountActivityMessageType.ORDER_REJECTION.value: OrderStatus.REJECTED.value,
+    }
+
+    def __init__(self, model=AccountActivityData, use_records: bool = False):
+        super().__init__(model, use_records)
+
+    @classmethod
+    def order_status(cls, event: AccountActivityOrderEvent) -> str | None:
+        """Returns the `OrderStatus` value an event implies, None if it implies none."""
+        if event.message_type in FILL_MESSAGE_TYPES:
+            if event.leaves_quantity == 0 or (
+                event.leaves_quantity is None
+                and event.message_type != AccountActivityMessageType.ORDER_PARTIAL_FILL.value
+            ):
+                return OrderStatus.FILLED.value
+            return OrderStatus.WORKING.value
+        return cls.order_status_by_message_type.get(event.message_type, None)
+
+    @staticmethod
+    def order_from_event(event: AccountActivityOrderEvent) -> Order:
+        """Builds a partial `Order` for an order only known from the stream."""
+        # model_construct skips validation, the event only has a few fields
+        return Order.model_construct(
+            order_id=event.order_id,
+            account_id=event.account,
+            quantity=event.original_quantity,
+            remaining_quantity=event.original_quantity,
+            filled_quantity=0,
+            price=event.limit_price,
+        )
+
+    @staticmethod
+    def is_buy(event: AccountActivityOrderEvent) -> bool:
+        """Whether the execution or order instruction is on the buy side."""
+        if event.execution_type:
+            return event.execution_type.lower().startswith("bought")
+        return (event.instruction or "").lower().startswith("buy")
+
+    @staticmethod
+    def is_option(event: AccountActivityOrderEvent) -> bool:
+        return "option" in (event.security_type or "").lower()
+
+    @staticmethod
+    def _to_float(value):
+        if value is None or value == "":
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    @classmethod
+    def parse_order_event(cls, data: AccountActivityData):
+        """
+        Parses the XML message data of an `AccountActivityData` entry.
+
+        Returns
+        ----
+        AccountActivityOrderEvent | None
+            None if the entry has no (valid) message data, e.g. SUBSCRIBED.
+        """
+        if not data.message_data or not data.message_type:
+            return None
+
+        try:
+            root = ElementTree.fromstring(data.message_data)
+        except ElementTree.ParseError:
+            return None
+
+        # Drop the namespace so paths can be written without it
+        for element in root.iter():
+            if "}" in element.tag:
+                element.tag = element.tag.split("}", 1)[1]
+
+        order_id = root.findtext(".//Order/OrderKey") or root.findtext(".//OrderKey")
+
+        return AccountActivityOrderEvent(
+            account=data.account,
+            message_type=data.message_type,
+            order_id=int(order_id) if order_id and order_id.isdigit() else None,
+            symbol=root.findtext(".//Security/Symbol"),
+            security_type=root.findtext(".//Security/SecurityType"),
+            instruction=root.findtext(".//OrderInstructions"),
+            order_type=root.findtext(".//OrderType"),
+            original_quantity=cls._to_float(root.findtext(".//OriginalQuantity")),
+            limit_price=cls._to_float(root.findtext(".//OrderPricing/Limit")),
+            execution_type=root.findtext(".//ExecutionInformation/Type"),
+            execution_quantity=cls._to_float(
+                root.findtext(".//ExecutionInformation/Quantity")
+            ),
+            execution_price=cls._to_float(
+                root.findtext(".//ExecutionInformation/ExecutionPrice")
+            ),
+            leaves_quantity=cls._to_float(
+                root.findtext(".//ExecutionInformation/LeavesQuantity")
+            ),
+            activity_timestamp=root.findtext(".//ActivityTimestamp"),
+        )
+
+    def construct_order_events(self, msg):
+        """Builds the message and returns the parsed order events it contains."""
+        message = self.construct_message(msg)
+        if not message:
+            return []
+        events = []
+        for data in message.content:
+            event = self.parse_order_event(data)
+            if event:
+                events.append(event)
+        return events
@@ -0,0 +1,653 @@
+"""
+A local stand-in for the TD streamer, for testing the login, subscription,
+restart and throughput of `StreamingApiClient` without the real one.
+
+It answers the `ADMIN` (`LOGIN`, `LOGOUT`, `QOS`) and subscription
+(`SUBS`, `ADD`, `UNSUBS`, `VIEW`) requests like the streamer does, answers
+chart history `GET`s with a snapshot, sends heartbeat `notify` frames, and
+streams synthetic (or recorded) data for the subscribed keys at a
+configurable rate. Connections can be dropped on demand or periodically to
+exercise `_restart_stream`.
+
+    >>> server = LocalStreamerServer(port=8765, rate=100)
+    >>> server.start()
+    >>> stream_client = server.make_client()
+    >>> stream_client.open_stream()
+    >>> stream_client.services.level_one_quotes(["SPY"], fields=[0, 1, 2, 3])
+    >>> server.disconnect()
+    >>> server.stop()
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from pathlib import Path
+
+import websockets
+
+from td.enums.enums import ChartHistoryServices, LevelTwoServices, TimesaleServices
+from td.logger import TdLogger
+from td.streaming.recorder import RecordingReader, open_recording
+
+LOCAL_PRINCIPALS = {
+    "streamerInfo": {
+        "streamerSocketUrl": "localhost:8765",
+        "tokenTimestamp": "2024-01-01T00:00:00+0000",
+        "token": "local",
+        "userGroup": "ACCT",
+        "accessLevel": "ACCT",
+        "appId": "local",
+        "acl": "local",
+    },
+    "accounts": [
+        {
+            "accountId": "000000000",
+            "company": "AMER",
+            "segment": "AMER",
+            "accountCdDomainId": "A000000000000000",
+        }
+    ],
+}
+
+SUBSCRIPTION_COMMANDS = ("SUBS", "ADD", "UNSUBS", "VIEW")
+CHART_SERVICES = {
+    "CHART_EQUITY": "equity",
+    "CHART_FUTURES": "other",
+    "CHART_OPTIONS": "other",
+}
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class SyntheticMarket:
+    """
+    Random walk prices per symbol, rendered as the content entries of each
+    service family. Only the requested fields are filled, fields it has no
+    value for get the price.
+    """
+
+    def __init__(self, book_depth: int = 10, seed: int | None = None) -> None:
+        self.book_depth = book_depth
+        self._random = random.Random(seed)
+        self._prices: dict[str, float] = {}
+        self._seq: dict[str, int] = {}
+
+    def _step(self, symbol: str) -> float:
+        price = self._prices.get(symbol, None)
+        if price is None:
+            price = 50 + self._random.random() * 450
+        price = max(round(price + self._random.gauss(0, 0.02), 2), 0.01)
+        self._prices[symbol] = price
+        return price
+
+    def _next_seq(self, symbol: str) -> int:
+        seq = self._seq.get(symbol, 0) + 1
+        self._seq[symbol] = seq
+        return seq
+
+    def _book_side(self, price: float, step: float) -> list:
+        levels = []
+        for i in range(self.book_depth):
+            volume = self._random.randint(1, 50) * 100
+            levels.append(
+                {
+                    "0": round(price + step * i, 2),
+                    "1": volume,
+                    "2": 1,
+                    "3": [{"0": "NSDQ", "1": volume, "2": _now_ms()}],
+                }
+            )
+        return levels
+
+    def entry(self, service: str, symbol: str, fields: list[str]) -> dict:
+        price = self._step(symbol)
+        now = _now_ms()
+        if service in LevelTwoServices.all_values():
+            return {
+                "key": symbol,
+                "1": now,
+                "2": self._book_side(price - 0.01, -0.01),
+                "3": self._book_side(price + 0.01, 0.01),
+            }
+        if service in TimesaleServices.all_values():
+            size = self._random.randint(1, 10) * 100
+            entry = {"key": symbol, "seq": self._next_seq(symbol)}
+            values = {"1": now, "2": price, "3": size, "4": size}
+        elif CHART_SERVICES.get(service, None) == "equity":
+            entry = {"key": symbol, "seq": self._next_seq(symbol)}
+            values = {
+                "1": price,
+                "2": round(price + 0.05, 2),
+                "3": round(price - 0.05, 2),
+                "4": price,
+                "5": self._random.randint(1, 100) * 100,
+                "6": self._seq[symbol],
+                "7": now,
+                "8": now // 86400000,
+            }
+        elif service in CHART_SERVICES:
+            entry = {"key": symbol, "seq": self._next_seq(symbol)}
+            values = {
+                "1": now,
+                "2": price,
+                "3": round(price + 0.05, 2),
+                "4": round(price - 0.05, 2),
+                "5": price,
+                "6": self._random.randint(1, 100),
+            }
+        else:
+            # Level one: bid, ask, last, bid size, ask size
+            entry = {"key": symbol}
+            values = {
+                "1": round(price - 0.01, 2),
+                "2": round(price + 0.01, 2),
+                "3": price,
+                "4": self._random.randint(1, 50),
+                "5": self._random.randint(1, 50),
+            }
+        for field in fields:
+            if field != "0":
+                entry[field] = values.get(field, price)
+        return entry
+
+    def candles(self, symbol: str, count: int, frequency_ms: int = 60000) -> list:
+        """Chart history candles ending now."""
+        price = self._step(symbol)
+        start = _now_ms() - count * frequency_ms
+        candles = []
+        for i in range(count):
+            price = max(round(price + self._random.gauss(0, 0.2), 2), 0.01)
+            candles.append(
+                {
+                    "0": start + i * frequency_ms,
+                    "1": price,
+                    "2": round(price + 0.1, 2),
+                    "3": round(price - 0.1, 2),
+                    "4": price,
+                    "5": float(self._random.randint(1, 1000)),
+                }
+            )
+        return candles
+
+
+class _Session:
+    """The state of a single client connection."""
+
+    __slots__ = ("websocket", "logged_in", "subscriptions", "qos", "tasks")
+
+    def __init__(self, websocket) -> None:
+        self.websocket = websocket
+        self.logged_in = False
+        # service -> {"keys": dict, "fields": list}
+        self.subscriptions: dict[str, dict] = {}
+        self.qos = None
+        self.tasks: set = set()
+
+
+class LocalStreamerServer:
+    """
+    Overview
+    ----
+    A websocket server speaking the TD streaming protocol, see the module
+    docstring. It runs its own loop in a background thread (`start` /
+    `stop`), or on the caller's loop with `await _serve()`.
+
+    Data:
+
+    - synthetic: every subscribed service gets `rate` data frames a second,
+      each with an entry for every subscribed key (`SyntheticMarket`).
+    - recorded: with a `recording` (see `StreamRecorder`) the recorded data
+      items of the subscribed services are sent instead, at the recorded
+      pace times `replay_speed` (None for as fast as possible), with their
+      timestamps moved to now.
+
+    Faults:
+
+    - `disconnect()` drops every connection, `disconnect_every` does so
+      periodically.
+    - `login_code` other than 0 fails every login like the streamer does.
+
+    Usage
+    ----
+        >>> server = LocalStreamerServer(rate=1000, heartbeat_interval=5)
+        >>> server.start()
+        >>> stream_client = server.make_client()
+        >>> stream_client.open_stream()
+        >>> server.set_rate(5000)
+        >>> server.stats()
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 8765,
+        rate: float = 10.0,
+        heartbeat_interval: float | None = 10.0,
+        recording: str | Path | RecordingReader | None = None,
+        replay_speed: float | None = 1.0,
+        disconnect_every: float | None = None,
+        login_code: int = 0,
+        book_depth: int = 10,
+        seed: int | None = None,
+    ) -> None:
+        """
+        Parameters
+        ----
+        host: str (optional, Default="localhost")
+            Interface to listen on.
+
+        port: int (optional, Default=8765)
+            Port to listen on, 0 picks a free one (see `port` after `start`).
+
+        rate: float (optional, Default=10.0)
+            Synthetic data frames per second per subscribed service.
+
+        heartbeat_interval: float | None (optional, Default=10.0)
+            Seconds between heartbeats, None for none.
+
+        recording: str | Path | RecordingReader (optional, Default=None)
+            Recorded frames to stream instead of synthetic data.
+
+        replay_speed: float | None (optional, Default=1.0)
+            Speed the recording is streamed at, None for as fast as possible.
+
+        disconnect_every: float | None (optional, Default=None)
+            Seconds between dropping every connection.
+
+        login_code: int (optional, Default=0)
+            Code of the login responses, 3 fails the login.
+
+        book_depth: int (optional, Default=10)
+            Price levels per side of the synthetic books.
+
+        seed: int (optional, Default=None)
+            Seed of the synthetic prices.
+        """
+        self.host = host
+        self.port = port
+        self.rate = rate
+        self.heartbeat_interval = heartbeat_interval
+        self.recording = recording
+        self.replay_speed = replay_speed
+        self.disconnect_every = disconnect_every
+        self.login_code = login_code
+        self.market = SyntheticMarket(book_depth=book_depth, seed=seed)
+
+        self.sessions: set[_Session] = set()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self._server = None
+        self._thread = None
+        self._stopped: asyncio.Event | None = None
+        self._started = threading.Event()
+
+        self.connections = 0
+        self.logins = 0
+        self.requests_received = 0
+        self.frames_sent = 0
+        self.data_items_sent = 0
+        self.disconnects = 0
+        # Synthetic frames the server fell too far behind `rate` to send
+        self.frames_skipped = 0
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    @property
+    def principals(self) -> dict:
+        """User principals pointing at this server."""
+        principals = json.loads(json.dumps(LOCAL_PRINCIPALS))
+        principals["streamerInfo"]["streamerSocketUrl"] = f"{self.host}:{self.port}"
+        return principals
+
+    def make_client(self, **kwargs):
+        """A `StreamingApiClient` connecting to this server, not opened yet."""
+        from td.streaming.client import StreamingApiClient
+
+        stream_client = StreamingApiClient(
+            session=None, user_principal_data=self.principals, **kwargs
+        )
+        # The client builds a wss:// url, the local server is plain ws://
+        stream_client.websocket_url = self.url
+        return stream_client
+
+    # Lifecycle
+
+    async def _serve(self) -> None:
+        """Serves until `stop`, on the running loop."""
+        self.loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        async with websockets.serve(
+            self._handle_connection, self.host, self.port, max_size=2048000
+        ) as server:
+            self._server = server
+            if self.port == 0:
+                self.port = next(iter(server.sockets)).getsockname()[1]
+            self._started.set()
+            disconnects = None
+            if self.disconnect_every:
+                disconnects = asyncio.ensure_future(self._disconnect_forever())
+            await self._stopped.wait()
+            if disconnects:
+                disconnects.cancel()
+            await self._disconnect()
+
+    def start(self, timeout: float = 5.0) -> None:
+        """Starts serving from a background thread."""
+        if self._thread is not None:
+            return
+        self._started.clear()
+        self._thread = threading.Thread(
+            target=asyncio.run,
+            args=[self._serve()],
+            name="td-local-streamer",
+            daemon=True,
+        )
+        self._thread.start()
+        if not self._started.wait(timeout):
+            raise TimeoutError(f"Local streamer did not start on {self.url}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self.loop is None or self._stopped is None:
+            return
+        self.loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # Settings, safe to change from any thread
+
+    def set_rate(self, rate: float) -> None:
+        """Synthetic data frames per second per subscribed service."""
+        self.rate = rate
+
+    def disconnect(self) -> None:
+        """Drops every connection, the clients have to restart their stream."""
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._disconnect(), self.loop).result()
+
+    async def _disconnect(self) -> None:
+        for session in list(self.sessions):
+            self.disconnects += 1
+            for task in list(session.tasks):
+                task.cancel()
+            await session.websocket.close(code=1011, reason="Injected disconnect")
+
+    async def _disconnect_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.disconnect_every)
+            self.log.info("Local streamer - injected disconnect")
+            await self._disconnect()
+
+    # Connections
+
+    async def _send(self, session: _Session, message: dict) -> None:
+        await session.websocket.send(json.dumps(message))
+        self.frames_sent += 1
+
+    def _add_task(self, session: _Session, coro) -> None:
+        task = asyncio.ensure_future(coro)
+        session.tasks.add(task)
+        task.add_done_callback(session.tasks.discard)
+
+    async def _handle_connection(self, websocket, path=None) -> None:
+        session = _Session(websocket)
+        self.sessions.add(session)
+        self.connections += 1
+        try:
+            async for frame in websocket:
+                try:
+                    message = json.loads(frame)
+                except json.JSONDecodeError:
+                    self.log.error(f"Local streamer - invalid frame {frame!r}")
+                    continue
+                requests = message.get("requests", [])
+                self.requests_received += len(requests)
+                responses = [self._handle_request(session, r) for r in requests]
+                responses = [x for x in responses if x is not None]
+                if responses:
+                    await self._send(session, {"response": responses})
+                if not session.logged_in:
+                    continue
+                for request in requests:
+                    if request.get("command", None) == "GET":
+                        await self._send_chart_history(session, request)
+                    elif request.get("command", None) == "LOGOUT":
+                        await websocket.close()
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for task in list(session.tasks):
+                task.cancel()
+            self.sessions.discard(session)
+
+    @staticmethod
+    def _response(request: dict, code: int, msg: str) -> dict:
+        return {
+            "service": request.get("service", None),
+            "requestid": str(request.get("requestid", None)),
+            "command": request.get("command", None),
+            "timestamp": _now_ms(),
+            "content": {"code": code, "msg": msg},
+        }
+
+    def _handle_request(self, session: _Session, request: dict) -> dict | None:
+        service = request.get("service", None)
+        command = request.get("command", None)
+        parameters = request.get("parameters", None) or {}
+
+        if service == "ADMIN" and command == "LOGIN":
+            if self.login_code != 0:
+                return self._response(request, self.login_code, "Login denied")
+            session.logged_in = True
+            self.logins += 1
+            if self.heartbeat_interval:
+                self._add_task(session, self._heartbeat_forever(session))
+            self._add_task(session, self._stream_forever(session))
+            return self._response(request, 0, "29-3")
+        if not session.logged_in:
+            return self._response(request, 3, "Not logged in")
+        if service == "ADMIN" and command == "LOGOUT":
+            return self._response(request, 0, "SUCCESS")
+        if service == "ADMIN" and command == "QOS":
+            session.qos = parameters.get("qoslevel", None)
+            return self._response(
+                request, 0, f"QoS command succeeded. Set qoslevel={session.qos}"
+            )
+        if command == "GET" and service in ChartHistoryServices.all_values():
+            # Answered with the snapshot
+            return None
+        if command not in SUBSCRIPTION_COMMANDS:
+            return self._response(request, 22, f"Unsupported command {command}")
+
+        keys = parameters.get("keys", None)
+        keys = [x for x in keys.split(",") if x] if keys else []
+        fields = parameters.get("fields", None)
+        fields = [x for x in fields.split(",") if x] if fields else None
+        subscription = session.subscriptions.get(service, None)
+
+        if command == "SUBS":
+            session.subscriptions[service] = {
+                "keys": dict.fromkeys(keys),
+                "fields": fields or ["0"],
+            }
+        elif command == "ADD":
+            if subscription is None:
+                subscription = session.subscriptions[service] = {
+                    "keys": {},
+                    "fields": fields or ["0"],
+                }
+            subscription["keys"].update(dict.fromkeys(keys))
+            if fields:
+                subscription["fields"] = fields
+        elif command == "UNSUBS":
+            if subscription is not None:
+                for key in keys:
+                    subscription["keys"].pop(key, None)
+                if not keys or not subscription["keys"]:
+                    del session.subscriptions[service]
+        elif command == "VIEW":
+            if subscription is not None and fields:
+                subscription["fields"] = fields
+        return self._response(request, 0, f"{command} command succeeded")
+
+    async def _heartbeat_forever(self, session: _Session) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self._send(session, {"notify": [{"heartbeat": str(_now_ms())}]})
+
+    async def _send_chart_history(self, session: _Session, request: dict) -> None:
+        parameters = request.get("parameters", None) or {}
+        symbols = (parameters.get("symbol", None) or "").split(",")
+        frequency = parameters.get("frequency", "m1")
+        minutes = {"m1": 1, "m5": 5, "m10": 10, "m30": 30, "h1": 60, "d1": 1440}
+        frequency_ms = minutes.get(frequency, 1) * 60000
+        content = []
+        for symbol in symbols:
+            candles = self.market.candles(symbol, 100, frequency_ms)
+            content.append(
+                {
+                    "key": symbol,
+                    "0": str(request.get("requestid", None)),
+                    "1": 1,
+                    "2": len(candles),
+                    "3": candles,
+                }
+            )
+        await self._send(
+            session,
+            {
+                "snapshot": [
+                    {
+                        "service": request.get("service", None),
+                        "timestamp": _now_ms(),
+                        "command": "GET",
+                        "content": content,
+                    }
+                ]
+            },
+        )
+
+    # Data
+
+    async def _stream_forever(self, session: _Session) -> None:
+        if self.recording is not None:
+            await self._stream_recording(session)
+        else:
+            await self._stream_synthetic(session)
+
+    def _data_items(self, session: _Session) -> list:
+        items = []
+        now = _now_ms()
+        entry = self.market.entry
+        for service, subscription in list(session.subscriptions.items()):
+            keys = subscription["keys"]
+            if not keys or service in ChartHistoryServices.all_values():
+                continue
+            fields = subscription["fields"]
+            items.append(
+                {
+                    "service": service,
+                    "timestamp": now,
+                    "command": "SUBS",
+                    "content": [entry(service, key, fields) for key in keys],
+                }
+            )
+        return items
+
+    async def _stream_synthetic(self, session: _Session) -> None:
+        sent = 0
+        started = time.perf_counter()
+        rate = None
+        while True:
+            if not self.rate or not session.subscriptions:
+                # Paused or not subscribed yet, the schedule starts over after
+                rate = None
+                await asyncio.sleep(0.01)
+                continue
+            if self.rate != rate:
+                # Start the schedule over at the new rate
+                rate = self.rate
+                sent = 0
+                started = time.perf_counter()
+            due = int((time.perf_counter() - started) * rate) - sent
+            # Catch up at most 50ms at a time, beyond that the rate is too high
+            max_burst = max(int(rate * 0.05), 1)
+            if due > max_burst:
+                self.frames_skipped += due - max_burst
+                sent += due - max_burst
+                due = max_burst
+            for _ in range(due):
+                # Each service is its own frame, like the streamer sends them
+                for item in self._data_items(session):
+                    await self._send(session, {"data": [item]})
+                    self.data_items_sent += 1
+            sent += due
+            next_due = started + (sent + 1) / rate
+            await asyncio.sleep(max(next_due - time.perf_counter(), 0))
+
+    def _recording_frames(self):
+        recording = self.recording
+        if isinstance(recording, (str, Path)):
+            recording = open_recording(recording)
+        return recording.frames()
+
+    async def _stream_recording(self, session: _Session) -> None:
+        while not session.subscriptions:
+            await asyncio.sleep(0.01)
+        speed = self.replay_speed
+        started = time.perf_counter()
+        first_at = None
+        for received_at, frame in self._recording_frames():
+            message = json.loads(frame)
+            items = message.get("data", None)
+            if not items:
+                continue
+            items = [x for x in items if x.get("service", None) in session.subscriptions]
+            if not items:
+                continue
+            if first_at is None:
+                first_at = received_at
+            if speed is not None:
+                delay = (received_at - first_at) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            now = _now_ms()
+            for item in items:
+                item["timestamp"] = now
+            await self._send(session, {"data": items})
+            self.data_items_sent += len(items)
+            if speed is None:
+                await asyncio.sleep(0)
+
+    # Stats
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "sessions": len(self.sessions),
+            "connections": self.connections,
+            "logins": self.logins,
+            "requests_received": self.requests_received,
+            "frames_sent": self.frames_sent,
+            "data_items_sent": self.data_items_sent,
+            "disconnects": self.disconnects,
+            "frames_skipped": self.frames_skipped,
+            "rate": self.rate,
+            "subscriptions": [
+                {
+                    service: list(subscription["keys"])
+                    for service, subscription in session.subscriptions.items()
+                }
+                for session in self.sessions
+            ],
+        }
@@ -0,0 +1,375 @@
+import asyncio
+import inspect
+import logging
+import time
+
+from td.enums.enums import ServiceState
+from td.logger import TdLogger
+from td.streaming.subscriptions import UNMANAGED_SERVICES
+from td.utils.metrics import LatencyStats
+
+ALERT_KINDS = (
+    "lag",
+    "stall",
+    "stall_resumed",
+    "heartbeat_missed",
+    "heartbeat_resumed",
+)
+
+
+class MonitorAlert:
+    """
+    An alert raised by the `StreamMonitor`. `value` is the lag (ms) of a
+    `lag` alert and the seconds without data of the others, `at` is a
+    `time.time()` value.
+    """
+
+    __slots__ = ("kind", "service", "value", "threshold", "at")
+
+    def __init__(
+        self, kind: str, service: str | None, value: float, threshold: float
+    ) -> None:
+        self.kind = kind
+        self.service = service
+        self.value = value
+        self.threshold = threshold
+        self.at = time.time()
+
+    def to_dict(self) -> dict:
+        return {x: getattr(self, x) for x in self.__slots__}
+
+    def __repr__(self) -> str:
+        return (
+            f"MonitorAlert({self.kind} service={self.service} "
+            f"value={self.value:.2f} threshold={self.threshold})"
+        )
+
+
+class _ServiceLag:
+    """The lag statistics of a single service."""
+
+    __slots__ = (
+        "messages",
+        "last_data_at",
+        "watched_since",
+        "stalled",
+        "network",
+        "decode",
+        "handler",
+        "total",
+        "interval_max",
+    )
+
+    def __init__(self, max_samples: int) -> None:
+        self.messages = 0
+        self.last_data_at: float | None = None
+        self.watched_since = time.monotonic()
+        self.stalled = False
+        self.network = LatencyStats(max_samples)
+        self.decode = LatencyStats(max_samples)
+        self.handler = LatencyStats(max_samples)
+        self.total = LatencyStats(max_samples)
+        self.interval_max: float | None = None
+
+    def stats(self, now: float) -> dict:
+        last = self.last_data_at
+        return {
+            "messages": self.messages,
+            "last_data_age": now - last if last is not None else None,
+            "stalled": self.stalled,
+            "network_lag_ms": self.network.summary(),
+            "decode_ms": self.decode.summary(),
+            "handler_ms": self.handler.summary(),
+            "total_lag_ms": self.total.summary(),
+        }
+
+
+class StreamMonitor:
+    """
+    Overview
+    ----
+    Measures how far behind the exchange each streaming service runs and
+    watches for services and heartbeats that went quiet.
+
+    Each data frame is split into stages, per service:
+
+    - `network_lag_ms`: the frame's server `timestamp` to its receipt.
+    - `decode_ms`: parsing the frame.
+    - `handler_ms`: dispatching the frame, which runs the sync handlers
+      inline. Handlers on a backpressure queue or async handlers finish
+      later, their own durations are in `get_handler_stats`.
+    - `total_lag_ms`: the server `timestamp` to the end of the dispatch.
+
+    The server timestamp comes from TD's clock, so the network and total
+    lag include the offset between the two clocks, `clock_offset_ms` is
+    subtracted from them to correct a known offset.
+
+    A timer checks every `interval` seconds for:
+
+    - `lag`: a service whose highest total lag of the interval exceeded
+      `lag_threshold_ms`.
+    - `stall`: a subscribed service without data for `stall_after` seconds,
+      followed by `stall_resumed` once data arrives again.
+    - `heartbeat_missed`: no heartbeat `notify` for `heartbeat_timeout`
+      seconds while logged in, followed by `heartbeat_resumed`.
+
+    Each alert is passed to `on_alert` as a `MonitorAlert`.
+
+    Usage
+    ----
+        >>> monitor = stream_client.enable_monitor(
+                lag_threshold_ms=500,
+                stall_after={"QUOTE": 10, "OPTIONS_BOOK": 30},
+                on_alert=lambda alert: print(alert),
+            )
+        >>> stream_client.get_monitor_stats()
+    """
+
+    def __init__(
+        self,
+        stream_client=None,
+        on_alert=None,
+        lag_threshold_ms: float | None = 1000.0,
+        stall_after: float | dict[str, float] | None = 30.0,
+        heartbeat_timeout: float | None = 30.0,
+        clock_offset_ms: float = 0.0,
+        max_samples: int = 10000,
+    ) -> None:
+        """
+        Parameters
+        ----
+        stream_client: StreamingApiClient (optional, Default=None)
+            The monitored client, needed for the stall and heartbeat checks
+            and for `start` without a running loop.
+
+        on_alert: Callable (optional, Default=None)
+            Called with each `MonitorAlert`, from the stream's loop.
+
+        lag_threshold_ms: float | None (optional, Default=1000.0)
+            Total lag that raises a `lag` alert, None to disable.
+
+        stall_after: float | dict[str, float] | None (optional, Default=30.0)
+            Seconds without data before a service is stalled, either for
+            every service or per service (services not in the dict are
+            not checked). None to disable.
+
+        heartbeat_timeout: float | None (optional, Default=30.0)
+            Seconds without a heartbeat before `heartbeat_missed`, None to
+            disable.
+
+        clock_offset_ms: float (optional, Default=0.0)
+            Subtracted from the lags measured from the server timestamp.
+
+        max_samples: int (optional, Default=10000)
+            Samples kept per stage and service for percentiles.
+        """
+        self.stream_client = stream_client
+        self._on_alert = on_alert
+        self.lag_threshold_ms = lag_threshold_ms
+        self.stall_after = stall_after
+        self.heartbeat_timeout = heartbeat_timeout
+        self.clock_offset_ms = clock_offset_ms
+        self.max_samples = max_samples
+
+        self.services: dict[str, _ServiceLag] = {}
+        self.heartbeat_lag = LatencyStats(max_samples)
+        self.last_heartbeat_at: float | None = None
+        self.heartbeat_missed = False
+        self._watched_since = time.monotonic()
+        self.alerts = 0
+        self._timer_task = None
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    def _get_service(self, service: str) -> _ServiceLag:
+        lag = self.services.get(service, None)
+        if lag is None:
+            lag = self.services[service] = _ServiceLag(self.max_samples)
+        return lag
+
+    def record_frame(
+        self, msg: dict, received_at: float, decode_time: float, handler_time: float
+    ) -> None:
+        """
+        Records a received frame.
+
+        Parameters
+        ----
+        msg: dict
+            The parsed frame.
+
+        received_at: float
+            `time.time()` when the frame was received.
+
+        decode_time: float
+            Seconds spent parsing the frame.
+
+        handler_time: float
+            Seconds spent dispatching the frame.
+        """
+        if "notify" in msg:
+            for item in msg["notify"]:
+                heartbeat = item.get("heartbeat", None)
+                if heartbeat is not None:
+                    self._record_heartbeat(heartbeat, received_at)
+
+        items = msg.get("data", None)
+        if not items:
+            return
+        now = time.monotonic()
+        received_ms = received_at * 1000 - self.clock_offset_ms
+        decode_ms = decode_time * 1000
+        handler_ms = handler_time * 1000
+        for item in items:
+            service = item.get("service", None)
+            if service is None:
+                continue
+            lag = self._get_service(service)
+            lag.messages += 1
+            lag.last_data_at = now
+            lag.decode.add(decode_ms)
+            lag.handler.add(handler_ms)
+            timestamp = item.get("timestamp", None)
+            if timestamp is None:
+                continue
+            network_ms = received_ms - timestamp
+            total_ms = network_ms + decode_ms + handler_ms
+            lag.network.add(network_ms)
+            lag.total.add(total_ms)
+            if lag.interval_max is None or total_ms > lag.interval_max:
+                lag.interval_max = total_ms
+
+    def _record_heartbeat(self, heartbeat, received_at: float) -> None:
+        self.last_heartbeat_at = time.monotonic()
+        try:
+            heartbeat_ms = int(heartbeat)
+        except (TypeError, ValueError):
+            return
+        self.heartbeat_lag.add(received_at * 1000 - self.clock_offset_ms - heartbeat_ms)
+
+    # Checks
+
+    def _alert(
+        self, kind: str, service: str | None, value: float, threshold: float
+    ) -> None:
+        alert = MonitorAlert(kind, service, value, threshold)
+        self.alerts += 1
+        if kind in ("lag", "stall", "heartbeat_missed"):
+            self.log.warning(f"Stream monitor - {alert}")
+        elif self._log_debug_enabled:
+            self.log.debug(f"Stream monitor - {alert}")
+        if self._on_alert is None:
+            return
+        result = self._on_alert(alert)
+        if inspect.isawaitable(result):
+            asyncio.ensure_future(result)
+
+    def _get_stall_after(self, service: str) -> float | None:
+        if isinstance(self.stall_after, dict):
+            return self.stall_after.get(service, None)
+        return self.stall_after
+
+    def check(self) -> None:
+        """Runs the lag, stall and heartbeat checks once, see `start`."""
+        if self.lag_threshold_ms is not None:
+            for service, lag in self.services.items():
+                worst = lag.interval_max
+                lag.interval_max = None
+                if worst is not None and worst > self.lag_threshold_ms:
+                    self._alert("lag", service, worst, self.lag_threshold_ms)
+
+        if self.stream_client is None:
+            return
+        now = time.monotonic()
+
+        if self.stall_after is not None:
+            subscribed = self.stream_client.subscribed_services
+            for service, state in list(subscribed.items()):
+                if state != ServiceState.SUBSCRIBED or service in UNMANAGED_SERVICES:
+                    continue
+                stall_after = self._get_stall_after(service)
+                if stall_after is None:
+                    continue
+                lag = self._get_service(service)
+                since = lag.last_data_at or lag.watched_since
+                age = now - since
+                if age > stall_after and not lag.stalled:
+                    lag.stalled = True
+                    self._alert("stall", service, age, stall_after)
+                elif age <= stall_after and lag.stalled:
+                    lag.stalled = False
+                    self._alert("stall_resumed", service, age, stall_after)
+
+        if self.heartbeat_timeout is not None:
+            if not self.stream_client.logged_in_event.is_set():
+                # Restarting, the heartbeats start over with the new login
+                self._watched_since = now
+                self.last_heartbeat_at = None
+                return
+            since = self.last_heartbeat_at or self._watched_since
+            age = now - since
+            if age > self.heartbeat_timeout and not self.heartbeat_missed:
+                self.heartbeat_missed = True
+                self._alert("heartbeat_missed", None, age, self.heartbeat_timeout)
+            elif age <= self.heartbeat_timeout and self.heartbeat_missed:
+                self.heartbeat_missed = False
+                self._alert("heartbeat_resumed", None, age, self.heartbeat_timeout)
+
+    def start(self, interval: float = 1.0) -> None:
+        """Runs `check` every `interval` seconds on the stream's loop."""
+        coro = self._check_forever(interval)
+        try:
+            asyncio.get_running_loop()
+            self._timer_task = asyncio.ensure_future(coro)
+        except RuntimeError:
+            if self.stream_client is None or self.stream_client.loop is None:
+                coro.close()
+                raise ValueError("start requires a running loop or a stream_client")
+            self._timer_task = asyncio.run_coroutine_threadsafe(
+                coro, self.stream_client.loop
+            )
+
+    def stop(self) -> None:
+        if self._timer_task:
+            self._timer_task.cancel()
+            self._timer_task = None
+
+    async def _check_forever(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.check()
+            except Exception as e:
+                self.log.error(f"Stream monitor error: {e}")
+
+    # Stats
+
+    def stats(self) -> dict:
+        """
+        Returns the lag percentiles of every service stage, the stalled
+        services and the heartbeat lag and age.
+        """
+        now = time.monotonic()
+        last = self.last_heartbeat_at
+        return {
+            "services": {
+                service: lag.stats(now) for service, lag in self.services.items()
+            },
+            "heartbeat": {
+                "last_age": now - last if last is not None else None,
+                "missed": self.heartbeat_missed,
+                "lag_ms": self.heartbeat_lag.summary(),
+            },
+            "alerts": self.alerts,
+        }
+
+    def reset(self) -> None:
+        """Drops the statistics, the stall and heartbeat state is kept."""
+        for lag in self.services.values():
+            for stats in (lag.network, lag.decode, lag.handler, lag.total):
+                stats.reset()
+            lag.messages = 0
+            lag.interval_max = None
+        self.heartbeat_lag.reset()
+        self.alerts = 0
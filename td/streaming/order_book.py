@@ -0,0 +1,252 @@
+import inspect
+import logging
+from array import array
+
+from td.enums.enums import LevelTwoServices
+from td.logger import TdLogger
+
+BOOK_SERVICES = tuple(LevelTwoServices.all_values())
+
+
+class OrderBook:
+    """
+    Overview
+    ----
+    The current book of a single symbol, kept as compact price, size and
+    exchange count arrays per side, best level first. The per exchange
+    detail is only kept when `keep_exchanges` is set on the engine.
+    """
+
+    __slots__ = (
+        "symbol",
+        "timestamp",
+        "bid_prices",
+        "bid_sizes",
+        "bid_counts",
+        "ask_prices",
+        "ask_sizes",
+        "ask_counts",
+        "bid_exchanges",
+        "ask_exchanges",
+        "updates",
+    )
+
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+        self.timestamp: int | None = None
+        self.bid_prices = array("d")
+        self.bid_sizes = array("d")
+        self.bid_counts = array("l")
+        self.ask_prices = array("d")
+        self.ask_sizes = array("d")
+        self.ask_counts = array("l")
+        self.bid_exchanges: list | None = None
+        self.ask_exchanges: list | None = None
+        self.updates = 0
+
+    @property
+    def best_bid(self) -> float | None:
+        return self.bid_prices[0] if self.bid_prices else None
+
+    @property
+    def best_ask(self) -> float | None:
+        return self.ask_prices[0] if self.ask_prices else None
+
+    @property
+    def spread(self) -> float | None:
+        if not self.bid_prices or not self.ask_prices:
+            return None
+        return self.ask_prices[0] - self.bid_prices[0]
+
+    @property
+    def mid(self) -> float | None:
+        if not self.bid_prices or not self.ask_prices:
+            return None
+        return (self.ask_prices[0] + self.bid_prices[0]) / 2
+
+    @property
+    def microprice(self) -> float | None:
+        """Top of book mid weighted by the opposite side's size."""
+        if not self.bid_prices or not self.ask_prices:
+            return None
+        bid_size = self.bid_sizes[0]
+        ask_size = self.ask_sizes[0]
+        if bid_size + ask_size == 0:
+            return self.mid
+        return (self.bid_prices[0] * ask_size + self.ask_prices[0] * bid_size) / (
+            bid_size + ask_size
+        )
+
+    def depth(self, side: str, levels: int | None = None) -> float:
+        """Total size of the best `levels` levels of `bid` or `ask`."""
+        sizes = self.bid_sizes if side == "bid" else self.ask_sizes
+        return sum(sizes[:levels] if levels else sizes)
+
+    def imbalance(self, levels: int | None = 1) -> float | None:
+        """(bid depth - ask depth) / (bid depth + ask depth) over `levels` levels."""
+        bid_depth = self.depth("bid", levels)
+        ask_depth = self.depth("ask", levels)
+        if bid_depth + ask_depth == 0:
+            return None
+        return (bid_depth - ask_depth) / (bid_depth + ask_depth)
+
+    def levels(self, side: str, levels: int | None = None) -> list[tuple]:
+        """(price, size, exchange count) of the best `levels` levels."""
+        if side == "bid":
+            prices, sizes, counts = self.bid_prices, self.bid_sizes, self.bid_counts
+        else:
+            prices, sizes, counts = self.ask_prices, self.ask_sizes, self.ask_counts
+        size = min(levels, len(prices)) if levels else len(prices)
+        return [(prices[i], sizes[i], counts[i]) for i in range(size)]
+
+
+def _decode_side(levels: list) -> tuple[array, array, array, list]:
+    prices = array("d")
+    sizes = array("d")
+    counts = array("l")
+    exchanges = []
+    for level in levels or []:
+        prices.append(float(level.get("0", 0.0)))
+        sizes.append(float(level.get("1", 0)))
+        counts.append(int(level.get("2", 0)))
+        exchanges.append(level.get("3", None))
+    return prices, sizes, counts, exchanges
+
+
+def _diff_side(
+    side: str,
+    old_prices: array,
+    old_sizes: array,
+    new_prices: array,
+    new_sizes: array,
+) -> list[tuple]:
+    """Changed levels between two snapshots of a side, removed levels get size 0."""
+    old = dict(zip(old_prices, old_sizes))
+    changes = []
+    for price, size in zip(new_prices, new_sizes):
+        if old.pop(price, None) != size:
+            changes.append((side, price, size))
+    for price in old:
+        changes.append((side, price, 0.0))
+    return changes
+
+
+class OrderBookEngine:
+    """
+    Overview
+    ----
+    Maintains the books of the level two services (`LISTED_BOOK`,
+    `NASDAQ_BOOK`, `OPTIONS_BOOK`, `FUTURES_BOOK`, `FOREX_BOOK`,
+    `FUTURES_OPTIONS_BOOK`) straight from the raw messages, without building
+    `LevelTwoBookData` models. Each frame is a snapshot of the book, it's
+    diffed with the previous one and callbacks only get the levels that
+    changed, as `(side, price, size)` with size 0 for removed levels.
+
+    Usage
+    ----
+        >>> book_engine = OrderBookEngine(
+                on_change=lambda book, changes: print(book.symbol, changes)
+            )
+        >>> stream_services.add_handler("data", "NASDAQ_BOOK", book_engine.data_message_handler)
+        >>> stream_services.level_two_nasdaq(["AAPL"], fields=LevelTwoQuotes.all_values())
+        >>> book = book_engine.get_book("AAPL")
+        >>> book.spread, book.imbalance(levels=5), book.microprice
+    """
+
+    def __init__(self, on_change=None, keep_exchanges: bool = False) -> None:
+        """
+        Parameters
+        ----
+        on_change: Callable (optional, Default=None)
+            Called as `on_change(book, changes)` when a frame changed the book.
+            Awaitable results are returned to the stream client's dispatcher.
+
+        keep_exchanges: bool (optional, Default=False)
+            Keep the raw per exchange data of every level.
+        """
+        self.books: dict[str, OrderBook] = {}
+        self.keep_exchanges = keep_exchanges
+        self._on_change = on_change
+        self.frames = 0
+        self.unchanged_frames = 0
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    def get_book(self, symbol: str) -> OrderBook | None:
+        return self.books.get(symbol, None)
+
+    def apply(self, entry: dict) -> tuple[OrderBook, list[tuple]]:
+        """
+        Applies a raw book content entry.
+
+        Returns
+        ----
+        tuple[OrderBook, list[tuple]]
+            The book and its changed levels.
+        """
+        symbol = entry["key"]
+        book = self.books.get(symbol, None)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol)
+
+        bid_prices, bid_sizes, bid_counts, bid_exchanges = _decode_side(
+            entry.get("2", None)
+        )
+        ask_prices, ask_sizes, ask_counts, ask_exchanges = _decode_side(
+            entry.get("3", None)
+        )
+
+        changes = _diff_side(
+            "bid", book.bid_prices, book.bid_sizes, bid_prices, bid_sizes
+        ) + _diff_side("ask", book.ask_prices, book.ask_sizes, ask_prices, ask_sizes)
+
+        book.timestamp = entry.get("1", book.timestamp)
+        book.bid_prices, book.bid_sizes, book.bid_counts = (
+            bid_prices,
+            bid_sizes,
+            bid_counts,
+        )
+        book.ask_prices, book.ask_sizes, book.ask_counts = (
+            ask_prices,
+            ask_sizes,
+            ask_counts,
+        )
+        if self.keep_exchanges:
+            book.bid_exchanges = bid_exchanges
+            book.ask_exchanges = ask_exchanges
+        book.updates += 1
+
+        self.frames += 1
+        if not changes:
+            self.unchanged_frames += 1
+        return book, changes
+
+    def data_message_handler(self, msg: dict):
+        """Handler for the raw data messages of the *_BOOK services."""
+        awaitables = []
+        for entry in msg.get("content", None) or []:
+            try:
+                book, changes = self.apply(entry)
+            except (KeyError, TypeError, ValueError) as e:
+                self.log.error(f"Book Decode Error: {e}")
+                continue
+            if changes and self._on_change:
+                result = self._on_change(book, changes)
+                if inspect.isawaitable(result):
+                    awaitables.append(result)
+        if awaitables:
+            return self._await_all(awaitables)
+        return None
+
+    @staticmethod
+    async def _await_all(awaitables: list) -> None:
+        for awaitable in awaitables:
+            await awaitable
+
+    def clear(self, symbol: str | None = None) -> None:
+        """Drops one book or all of them, e.g. after a restart."""
+        if symbol is None:
+            self.books.clear()
+        else:
+            self.books.pop(symbol, None)
@@ -0,0 +1,353 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+
+from pydantic import ValidationError
+
+from td.logger import TdLogger
+from td.models.orders import Order
+from td.models.streaming import AccountActivityOrderEvent
+from td.rest.orders import Orders
+from td.streaming.handlers import FILL_MESSAGE_TYPES, BaseAccountActivityHandler
+
+
+class OrderCache(BaseAccountActivityHandler):
+    """
+    Overview
+    ----
+    Keeps the orders of an account in memory keyed by order id. Orders are
+    updated from ACCT_ACTIVITY messages and from periodic REST queries, and
+    callbacks can be registered for status changes of a single order or of
+    all orders.
+
+    ACCT_ACTIVITY is the primary source, the REST poll only reconciles what
+    the stream missed. The orders endpoint filters `fromEnteredTime` by date
+    (yyyy-MM-dd), so a poll can't ask for a narrower window than a day and
+    returns all of the day's orders again. The orders are compared with
+    the previous response by status, entered / close time and quantities,
+    and only new or changed ones replace the cached order.
+
+    `get_order` is served from memory while the cached order is fresh and
+    falls back to `Orders.get_order` otherwise. Orders first seen on the
+    stream are partial (built from the event) and always fetched.
+
+    Usage
+    ----
+        >>> order_cache = OrderCache(
+                orders_service=td_client.orders(),
+                account_id='123456789',
+                stream_client=stream_client,
+            )
+        >>> order_cache.start()
+        >>> order_cache.add_status_callback(
+                lambda order_id, old, new, order: print(order_id, old, new),
+                order_id=12345678,
+            )
+        >>> order_cache.get_order(12345678)
+    """
+
+    def __init__(
+        self,
+        orders_service: Orders,
+        account_id: str,
+        stream_client=None,
+        max_age: float = 5.0,
+        poll_interval: float | None = 60.0,
+        poll_max_results: int | None = None,
+    ) -> None:
+        """
+        Parameters
+        ----
+        orders_service: Orders
+            The `Orders` service used for the REST queries.
+
+        account_id: str
+            The account whose orders are cached.
+
+        stream_client: StreamingApiClient (optional, Default=None)
+            The stream client delivering ACCT_ACTIVITY messages. Only required
+            for `start`.
+
+        max_age: float (optional, Default=5.0)
+            Seconds a cached order counts as fresh after it was last confirmed
+            by the stream or a REST query.
+
+        poll_interval: float | None (optional, Default=60.0)
+            Seconds between REST syncs once started, None disables polling.
+
+        poll_max_results: int | None (optional, Default=None)
+            Caps the orders returned per poll (`maxResults`), the most
+            recently entered first.
+        """
+        super().__init__()
+        from td.streaming.client import StreamingApiClient
+
+        self.orders_service = orders_service
+        self.account_id = account_id
+        self.stream_client: StreamingApiClient | None = stream_client
+        self.max_age = max_age
+        self.poll_interval = poll_interval
+        self.poll_max_results = poll_max_results
+
+        self.orders: dict[int, Order] = {}
+        self._confirmed_at: dict[int, float] = {}
+        # Orders only known from ACCT_ACTIVITY events, never fresh
+        self._stream_only: set[int] = set()
+        # Fingerprint of each order in the last REST response
+        self._fingerprints: dict[int, tuple] = {}
+        self._callbacks = defaultdict(list)
+        self._last_sync_date: date | None = None
+        self._lock = threading.RLock()
+        self._poll_task = None
+
+        self.hits = 0
+        self.misses = 0
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    def add_status_callback(self, func_, order_id: int | None = None) -> None:
+        """
+        Adds a callback called as `func_(order_id, old_status, new_status, order)`
+        when an order's status changes. Without an `order_id` it's called for
+        every order. Awaitable results are scheduled on the running loop.
+        """
+        with self._lock:
+            self._callbacks[order_id].append(func_)
+
+    def remove_status_callback(self, func_, order_id: int | None = None) -> None:
+        """Removes a status change callback."""
+        with self._lock:
+            try:
+                self._callbacks[order_id].remove(func_)
+            except ValueError:
+                self.log.error(f"Not in callbacks / already removed? {order_id} - {func_}")
+            if not self._callbacks[order_id]:
+                del self._callbacks[order_id]
+
+    def _notify(self, order_id: int, old_status, new_status, order: Order) -> None:
+        callbacks = self._callbacks.get(order_id, []) + self._callbacks.get(None, [])
+        for func_ in callbacks:
+            try:
+                result = func_(order_id, old_status, new_status, order)
+            except Exception as e:
+                self.log.error(f"Order status callback error: {e}")
+                continue
+            if inspect.isawaitable(result):
+                try:
+                    asyncio.get_running_loop()
+                    asyncio.ensure_future(result)
+                except RuntimeError:
+                    if self.stream_client is not None and self.stream_client.loop:
+                        asyncio.run_coroutine_threadsafe(result, self.stream_client.loop)
+
+    def _upsert(self, order: Order, confirmed_at: float) -> None:
+        """Stores an order, and its child orders, firing callbacks on status changes."""
+        with self._lock:
+            # The stream updated this order after the request was sent
+            if self._confirmed_at.get(order.order_id, 0) > confirmed_at:
+                return
+            previous = self.orders.get(order.order_id, None)
+            self.orders[order.order_id] = order
+            self._confirmed_at[order.order_id] = confirmed_at
+            self._stream_only.discard(order.order_id)
+        old_status = previous.status if previous is not None else None
+        if old_status != order.status:
+            self._notify(order.order_id, old_status, order.status, order)
+
+        for child in order.child_order_strategies or []:
+            if child.order_id is not None:
+                self._upsert(child, confirmed_at)
+
+    @staticmethod
+    def _fingerprint(order: Order) -> tuple:
+        """The fields of an order that change when the order does."""
+        return (
+            order.status,
+            order.entered_time,
+            order.close_time,
+            order.filled_quantity,
+            order.remaining_quantity,
+            order.cancelable,
+            tuple(
+                OrderCache._fingerprint(x) for x in order.child_order_strategies or ()
+            ),
+        )
+
+    def _confirm_unchanged(self, order: Order, confirmed_at: float) -> None:
+        """Refreshes the confirmation time of an unchanged order and its children."""
+        with self._lock:
+            order_id = order.order_id
+            if order_id in self.orders and order_id not in self._stream_only:
+                if self._confirmed_at.get(order_id, 0) < confirmed_at:
+                    self._confirmed_at[order_id] = confirmed_at
+        for child in order.child_order_strategies or ():
+            if child.order_id is not None:
+                self._confirm_unchanged(child, confirmed_at)
+
+    def sync(
+        self, from_entered_time: date | None = None, max_results: int | None = None
+    ) -> int:
+        """
+        Queries the orders entered since the last sync's date (or
+        `from_entered_time`) through `Orders.get_orders_by_query` and merges
+        the new or changed ones into the cache.
+
+        The API only filters by entry date (yyyy-MM-dd), so every sync of the
+        day returns all of the day's orders. Orders unchanged since the
+        previous response are only marked as confirmed, without replacing
+        the cached order or firing callbacks.
+
+        Returns
+        ----
+        int
+            Number of new or changed orders merged.
+        """
+        today = date.today()
+        from_entered_time = from_entered_time or self._last_sync_date or today
+        confirmed_at = time.monotonic()
+
+        orders = self.orders_service.get_orders_by_query(
+            account_id=self.account_id,
+            max_results=max_results,
+            from_entered_time=from_entered_time,
+            to_entered_time=today,
+        )
+
+        changed = 0
+        fingerprints = {}
+        for order in orders:
+            if order.order_id is None:
+                continue
+            fingerprint = fingerprints[order.order_id] = self._fingerprint(order)
+            if self._fingerprints.get(order.order_id, None) == fingerprint:
+                self._confirm_unchanged(order, confirmed_at)
+                continue
+            self._upsert(order, confirmed_at)
+            changed += 1
+
+        # Orders no longer returned (e.g. entered on a previous day) are dropped
+        self._fingerprints = fingerprints
+        self._last_sync_date = today
+        return changed
+
+    def is_fresh(self, order_id: int, max_age: float | None = None) -> bool:
+        """
+        Whether an order was confirmed within `max_age` seconds. Orders only
+        built from stream events are partial and never fresh.
+        """
+        if order_id in self._stream_only:
+            return False
+        confirmed_at = self._confirmed_at.get(order_id, None)
+        if confirmed_at is None:
+            return False
+        max_age = self.max_age if max_age is None else max_age
+        return time.monotonic() - confirmed_at <= max_age
+
+    def get_order(self, order_id: int, max_age: float | None = None) -> Order:
+        """
+        Returns an order, from memory if it's fresh, otherwise through
+        `Orders.get_order`, which also refreshes the cache.
+        """
+        order_id = int(order_id)
+        if self.is_fresh(order_id, max_age):
+            self.hits += 1
+            return self.orders[order_id]
+
+        self.misses += 1
+        confirmed_at = time.monotonic()
+        order = self.orders_service.get_order(self.account_id, order_id)
+        self._upsert(order, confirmed_at)
+        return order
+
+    def data_message_handler(self, msg) -> None:
+        """Handler for ACCT_ACTIVITY data messages."""
+        try:
+            events = self.construct_order_events(msg)
+        except ValidationError as e:
+            self.log.error(f"Message Construction Error: {e}")
+            return
+
+        for event in events:
+            self.apply_event(event)
+
+    def apply_event(self, event: AccountActivityOrderEvent) -> None:
+        """Applies a parsed account activity event to the cached order."""
+        if event.order_id is None:
+            return
+        if event.account and event.account != str(self.account_id):
+            return
+        status = self.order_status(event)
+        if status is None:
+            return
+
+        with self._lock:
+            previous = self.orders.get(event.order_id, None)
+            if previous is None:
+                order = self.order_from_event(event)
+                self._stream_only.add(event.order_id)
+            else:
+                # Copy so readers holding the previous object don't see it change
+                order = previous.model_copy()
+            old_status = previous.status if previous is not None else None
+
+            if event.message_type in FILL_MESSAGE_TYPES and event.execution_quantity:
+                order.filled_quantity = (
+                    order.filled_quantity or 0
+                ) + event.execution_quantity
+                if event.leaves_quantity is not None:
+                    order.remaining_quantity = event.leaves_quantity
+            order.status = status
+
+            self.orders[event.order_id] = order
+            self._confirmed_at[event.order_id] = time.monotonic()
+
+        if old_status != status:
+            self._notify(event.order_id, old_status, status, order)
+
+    def start(self) -> None:
+        """
+        Does an initial sync for today's orders, adds the ACCT_ACTIVITY handler,
+        subscribes to the service and starts polling on the stream client's loop.
+
+        The stream needs to be open before calling this.
+        """
+        if self.stream_client is None:
+            raise ValueError("start requires a stream_client")
+
+        self.sync()
+        self.stream_client.services.add_handler(
+            "data", "ACCT_ACTIVITY", self.data_message_handler
+        )
+        self.stream_client.services.account_activity()
+
+        if self.poll_interval:
+            self._poll_task = asyncio.run_coroutine_threadsafe(
+                self._poll_forever(), self.stream_client.loop
+            )
+
+    def stop(self) -> None:
+        """Removes the handler and stops polling."""
+        if self._poll_task:
+            self._poll_task.cancel()
+            self._poll_task = None
+        if self.stream_client is not None:
+            self.stream_client.services.remove_handler(
+                "data", "ACCT_ACTIVITY", self.data_message_handler
+            )
+
+    async def _poll_forever(self) -> None:
+        """Runs `sync` every `poll_interval` seconds off the event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await loop.run_in_executor(
+                    None, self.sync, None, self.poll_max_results
+                )
+            except Exception as e:
+                self.log.error(f"Order cache sync failed: {e}")
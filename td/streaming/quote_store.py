@@ -0,0 +1,265 @@
+import math
+import types
+import typing
+from array import array
+from enum import Enum
+
+from td.enums.enums import LevelOneServices
+from td.models.streaming import (
+    DataResponseContent,
+    LevelOneEquityData,
+    LevelOneForexData,
+    LevelOneFuturesData,
+    LevelOneFuturesOptionsData,
+    LevelOneOptionData,
+)
+
+LEVEL_ONE_MODELS = {
+    LevelOneServices.EQUITY.value: LevelOneEquityData,
+    LevelOneServices.OPTIONS.value: LevelOneOptionData,
+    LevelOneServices.FUTURES.value: LevelOneFuturesData,
+    LevelOneServices.FOREX.value: LevelOneForexData,
+    LevelOneServices.FUTURES_OPTIONS.value: LevelOneFuturesOptionsData,
+}
+
+_NAN = float("nan")
+
+
+def _base_type(annotation):
+    """The type of an `X | None` annotation."""
+    if isinstance(annotation, types.UnionType) or typing.get_origin(annotation) is typing.Union:
+        args = [x for x in typing.get_args(annotation) if x is not type(None)]
+        return args[0] if len(args) == 1 else object
+    return annotation
+
+
+class QuoteStore:
+    """
+    Overview
+    ----
+    Keeps the current level one state of every symbol of a service. Level
+    one messages only carry the fields that changed, the store merges them
+    into one preallocated column per field, indexed by a row per symbol, so
+    reading a field of a quote is a list and an array lookup.
+
+    Numeric and boolean fields are stored in `array("d")` columns with NaN
+    for fields not received yet, text fields in lists. Each column is a full
+    snapshot of the universe, `column` returns it without copying (any
+    buffer protocol consumer, e.g. `numpy.frombuffer`, can use it as is).
+    When the store grows past its capacity the columns are replaced by
+    larger copies, views taken before keep showing the old, smaller column.
+
+    Every applied update sets the field's bit in the symbol's change mask,
+    `pop_changes` returns and clears them.
+
+    Usage
+    ----
+        >>> quote_store = QuoteStore.for_service("QUOTE")
+        >>> stream_services.add_handler("data", "QUOTE", quote_store.data_message_handler)
+        >>> stream_services.level_one_quotes(["SPY", "QQQ"], fields=LevelOneEquityData.get_field_aliases())
+        >>> quote_store.get("SPY", "bid_price")
+        >>> quote_store.get_quote("SPY")
+        >>> quote_store.snapshot(["bid_price", "ask_price"])
+        >>> quote_store.pop_changes()
+    """
+
+    def __init__(
+        self, model: type[DataResponseContent] = LevelOneEquityData, capacity: int = 256
+    ) -> None:
+        """
+        Parameters
+        ----
+        model: DataResponseContent (optional, Default=LevelOneEquityData)
+            The level one model, one column is kept per field alias.
+
+        capacity: int (optional, Default=256)
+            Symbols preallocated, the columns grow as needed.
+        """
+        self.model = model
+        self.capacity = max(capacity, 1)
+
+        # alias -> (bit / column position, is numeric)
+        self._aliases: dict[str, tuple[int, bool]] = {}
+        self.fields: list[str] = []
+        self._columns: list = []
+        # int and bool values are converted back on reads
+        self._types: list = []
+        for name, field in model.model_fields.items():
+            alias = field.alias
+            if not alias or alias == "key":
+                continue
+            field_type = _base_type(field.annotation)
+            is_numeric = field_type in (float, int, bool)
+            self._aliases[alias] = (len(self.fields), is_numeric)
+            self.fields.append(name)
+            self._types.append(field_type if field_type in (int, bool) else None)
+            self._columns.append(
+                array("d", [_NAN]) * self.capacity
+                if is_numeric
+                else [None] * self.capacity
+            )
+        self._field_index = {name: i for i, name in enumerate(self.fields)}
+
+        self.symbols: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._changes: dict[int, int] = {}
+        self.updates = 0
+
+    @classmethod
+    def for_service(cls, service: str | Enum, capacity: int = 256) -> "QuoteStore":
+        """Creates a store for one of the `LevelOneServices`."""
+        if isinstance(service, Enum):
+            service = service.value
+        try:
+            return cls(LEVEL_ONE_MODELS[service], capacity)
+        except KeyError:
+            raise ValueError(
+                f"Not a level one service {service}, must be one of {list(LEVEL_ONE_MODELS)}"
+            )
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._rows
+
+    def _grow(self) -> None:
+        # New columns instead of resizing, arrays exporting a buffer can't be
+        extra = self.capacity
+        self._columns = [
+            column + array("d", [_NAN]) * extra
+            if isinstance(column, array)
+            else column + [None] * extra
+            for column in self._columns
+        ]
+        self.capacity += extra
+
+    def row(self, symbol: str) -> int:
+        """Returns the row of a symbol, adding it if it's new."""
+        row = self._rows.get(symbol, None)
+        if row is None:
+            row = len(self.symbols)
+            if row >= self.capacity:
+                self._grow()
+            self._rows[symbol] = row
+            self.symbols.append(symbol)
+        return row
+
+    def apply(self, entry: dict) -> int:
+        """
+        Merges a single raw content entry (wire aliases as keys) into the
+        store.
+
+        Returns
+        ----
+        int
+            The change mask of the fields in the entry.
+        """
+        row = self.row(entry["key"])
+        aliases = self._aliases
+        columns = self._columns
+        mask = 0
+        for alias, value in entry.items():
+            column_info = aliases.get(alias, None)
+            if column_info is None:
+                continue
+            position, is_numeric = column_info
+            if is_numeric:
+                try:
+                    columns[position][row] = float(value)
+                except (TypeError, ValueError):
+                    columns[position][row] = _NAN
+            else:
+                columns[position][row] = value
+            mask |= 1 << position
+        if mask:
+            self._changes[row] = self._changes.get(row, 0) | mask
+            self.updates += 1
+        return mask
+
+    def data_message_handler(self, msg: dict) -> None:
+        """Handler for the raw data messages of a level one service."""
+        for entry in msg.get("content", None) or []:
+            self.apply(entry)
+
+    def get(self, symbol: str, field: str):
+        """Returns the current value of a field, None if not received."""
+        row = self._rows.get(symbol, None)
+        if row is None:
+            return None
+        position = self._field_index[field]
+        value = self._columns[position][row]
+        if isinstance(value, float):
+            if math.isnan(value):
+                return None
+            if self._types[position] is not None:
+                return self._types[position](value)
+        return value
+
+    def get_quote(self, symbol: str, as_model: bool = True):
+        """
+        Returns the merged state of a symbol as the store's model (built
+        without validation), or as a dict of the received fields.
+        """
+        row = self._rows.get(symbol, None)
+        if row is None:
+            return None
+        values = {}
+        for position, name in enumerate(self.fields):
+            value = self._columns[position][row]
+            if value is None:
+                continue
+            if isinstance(value, float):
+                if math.isnan(value):
+                    continue
+                if self._types[position] is not None:
+                    value = self._types[position](value)
+            values[name] = value
+        if not as_model:
+            return values
+        return self.model.model_construct(symbol=symbol, **values)
+
+    def column(self, field: str):
+        """
+        The live column of a field, rows in `symbols` order. Numeric columns
+        are `array("d")` and may be longer than `symbols` (preallocated rows).
+        Adding symbols past the capacity replaces the columns, call this again
+        afterwards to see them.
+        """
+        return self._columns[self._field_index[field]]
+
+    def snapshot(self, fields: list[str] | None = None) -> dict:
+        """
+        Copies the columns of the whole universe.
+
+        Returns
+        ----
+        dict
+            `symbols` and one column per field, each with one value per symbol.
+        """
+        size = len(self.symbols)
+        snapshot = {"symbols": list(self.symbols)}
+        for field in fields or self.fields:
+            snapshot[field] = self._columns[self._field_index[field]][:size]
+        return snapshot
+
+    def field_mask(self, fields: list[str]) -> int:
+        """The change mask bits of some fields, to test `pop_changes` results."""
+        mask = 0
+        for field in fields:
+            mask |= 1 << self._field_index[field]
+        return mask
+
+    def mask_fields(self, mask: int) -> list[str]:
+        """The field names set in a change mask."""
+        return [name for i, name in enumerate(self.fields) if mask >> i & 1]
+
+    def pop_changes(self) -> dict[str, int]:
+        """Returns the change mask of every symbol updated since the last call."""
+        changes, self._changes = self._changes, {}
+        symbols = self.symbols
+        return {symbols[row]: mask for row, mask in changes.items()}
+
+    def clear(self) -> None:
+        """Drops all symbols and values."""
+        self.__init__(self.model, self.capacity)
@@ -0,0 +1,575 @@
+"""
+Compressed recordings of the raw stream frames.
+
+A recording is a directory of segment files. Each segment is made of:
+
+- a header: `SEGMENT_MAGIC` and the compression id (1 byte).
+- blocks: a `BLOCK_HEADER` (compressed size, raw size, frame count, first
+  and last receive time) followed by the compressed frames. Each frame is a
+  `FRAME_HEADER` (receive time, size) followed by the raw frame bytes.
+- an index, written when the segment is closed: a `INDEX_ENTRY` (offset,
+  frame count, first and last receive time) per block, followed by the
+  `INDEX_TRAILER` (index offset, block count, `INDEX_MAGIC`).
+
+Blocks describe themselves, so a segment that was never closed (e.g. after
+a crash) is still read by scanning its blocks. Receive times are
+`time.time()` values.
+
+    >>> recorder = stream_client.start_recording("recordings/2024-01-19")
+    >>> ...
+    >>> stream_client.stop_recording()
+    >>> for received_at, frame in open_recording("recordings/2024-01-19").frames():
+            print(received_at, frame)
+"""
+
+import bz2
+import lzma
+import logging
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from td.logger import TdLogger
+
+SEGMENT_MAGIC = b"TDSTRM01"
+SEGMENT_SUFFIX = ".tdrec"
+INDEX_MAGIC = b"TDINDX01"
+
+# compressed size, raw size, frame count, first and last receive time
+BLOCK_HEADER = struct.Struct("<IIIdd")
+# receive time, frame size
+FRAME_HEADER = struct.Struct("<dI")
+# block offset, frame count, first and last receive time
+INDEX_ENTRY = struct.Struct("<QIdd")
+# index offset, block count, magic
+INDEX_TRAILER = struct.Struct("<QI8s")
+
+# name -> (id, compress(data, level), decompress(data))
+COMPRESSIONS = {
+    "none": (0, lambda data, level: data, lambda data: data),
+    "zlib": (1, zlib.compress, zlib.decompress),
+    "lzma": (
+        2,
+        lambda data, level: lzma.compress(data, preset=level),
+        lzma.decompress,
+    ),
+    "bz2": (3, lambda data, level: bz2.compress(data, max(level, 1)), bz2.decompress),
+}
+_DECOMPRESS = {x[0]: x[2] for x in COMPRESSIONS.values()}
+
+
+class BlockInfo:
+    """The index entry of a block."""
+
+    __slots__ = ("offset", "frames", "first_at", "last_at")
+
+    def __init__(self, offset: int, frames: int, first_at: float, last_at: float):
+        self.offset = offset
+        self.frames = frames
+        self.first_at = first_at
+        self.last_at = last_at
+
+    def __repr__(self) -> str:
+        return (
+            f"BlockInfo(offset={self.offset}, frames={self.frames}, "
+            f"first_at={self.first_at}, last_at={self.last_at})"
+        )
+
+
+class _SegmentWriter:
+    """Writes the blocks of a single segment file."""
+
+    def __init__(self, path: Path, compression: str, level: int) -> None:
+        self.path = path
+        self.compression_id, self._compress, _ = COMPRESSIONS[compression]
+        self.level = level
+        self.file = open(path, "wb")
+        self.file.write(SEGMENT_MAGIC + bytes([self.compression_id]))
+        self.blocks: list[BlockInfo] = []
+        self.opened_at = time.monotonic()
+        self.size = self.file.tell()
+
+    def write_block(self, frames: list[tuple[float, bytes]]) -> int:
+        """Compresses and writes the frames, returns the bytes written."""
+        raw = b"".join(
+            FRAME_HEADER.pack(received_at, len(frame)) + frame
+            for received_at, frame in frames
+        )
+        data = self._compress(raw, self.level)
+        first_at = frames[0][0]
+        last_at = frames[-1][0]
+        offset = self.size
+        self.file.write(
+            BLOCK_HEADER.pack(len(data), len(raw), len(frames), first_at, last_at)
+        )
+        self.file.write(data)
+        self.file.flush()
+        self.blocks.append(BlockInfo(offset, len(frames), first_at, last_at))
+        written = BLOCK_HEADER.size + len(data)
+        self.size += written
+        return written
+
+    def close(self) -> None:
+        index_offset = self.size
+        for block in self.blocks:
+            self.file.write(
+                INDEX_ENTRY.pack(
+                    block.offset, block.frames, block.first_at, block.last_at
+                )
+            )
+        self.file.write(
+            INDEX_TRAILER.pack(index_offset, len(self.blocks), INDEX_MAGIC)
+        )
+        self.file.close()
+
+
+class StreamRecorder:
+    """
+    Overview
+    ----
+    Appends raw stream frames and their receive times to compressed,
+    block indexed segment files, see the module docstring for the format.
+
+    `record` only appends the frame to an in-memory buffer, a background
+    thread encodes, compresses and writes the blocks, so the stream's loop
+    never waits on the disk. A block is written once it holds `block_size`
+    raw bytes or is `block_interval` seconds old, a segment is rotated once
+    it's `max_segment_size` bytes or `max_segment_age` seconds old.
+
+    When the writer falls `max_pending` frames behind, new frames are
+    dropped and counted instead of growing the buffer without bound.
+
+    Usage
+    ----
+        >>> recorder = StreamRecorder("recordings", compression="zlib", level=1)
+        >>> recorder.start()
+        >>> recorder.record(raw_frame)
+        >>> recorder.stop()
+        >>> recorder.stats()
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        prefix: str = "stream",
+        compression: str = "zlib",
+        level: int = 1,
+        block_size: int = 1 << 20,
+        block_interval: float = 1.0,
+        max_segment_size: int = 256 << 20,
+        max_segment_age: float = 3600.0,
+        max_pending: int = 1000000,
+    ) -> None:
+        """
+        Parameters
+        ----
+        directory: str | Path
+            Where the segments are written, created if missing.
+
+        prefix: str (optional, Default="stream")
+            Segment files are named `{prefix}-{opened at}-{number}.tdrec`.
+
+        compression: str (optional, Default="zlib")
+            One of `COMPRESSIONS`.
+
+        level: int (optional, Default=1)
+            Compression level, low levels keep up with level two traffic.
+
+        block_size: int (optional, Default=1 MiB)
+            Raw bytes per block.
+
+        block_interval: float (optional, Default=1.0)
+            Seconds before a partial block is written anyway.
+
+        max_segment_size: int (optional, Default=256 MiB)
+            Compressed bytes before a new segment is started.
+
+        max_segment_age: float (optional, Default=3600.0)
+            Seconds before a new segment is started.
+
+        max_pending: int (optional, Default=1000000)
+            Frames buffered for the writer before new ones are dropped.
+        """
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Invalid compression {compression}, must be one of {tuple(COMPRESSIONS)}"
+            )
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.compression = compression
+        self.level = level
+        self.block_size = block_size
+        self.block_interval = block_interval
+        self.max_segment_size = max_segment_size
+        self.max_segment_age = max_segment_age
+        self.max_pending = max_pending
+
+        self._pending = deque()
+        self._stop_event = threading.Event()
+        # Set by `record` and `stop` to wake the writer
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._segment: _SegmentWriter | None = None
+        self._segment_number = 0
+        self._rotate_requested = False
+        self.segments: list[Path] = []
+
+        self.frames = 0
+        self.dropped = 0
+        self.raw_bytes = 0
+        self.written_bytes = 0
+        self.blocks = 0
+        self.write_errors = 0
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def record(self, frame: str | bytes, received_at: float | None = None) -> None:
+        """Buffers a frame for the writer, safe to call from any thread."""
+        pending = self._pending
+        if len(pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        pending.append((time.time() if received_at is None else received_at, frame))
+        # Appended first, the writer checks the buffer again after clearing it
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+    # Writer
+
+    def start(self) -> None:
+        if self.is_running:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._stop_event.clear()
+        self._wakeup.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="td-stream-recorder", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 10.0) -> None:
+        """
+        Writes the buffered frames, closes the segment and stops the writer.
+        Raises a `TimeoutError` if the writer is still busy after `timeout`
+        seconds, it keeps writing in the background.
+        """
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            message = (
+                f"The recorder didn't finish writing within {timeout}s, "
+                f"{len(self._pending)} frames still pending"
+            )
+            self.log.error(message)
+            raise TimeoutError(message)
+        self._thread = None
+
+    def _open_segment(self) -> _SegmentWriter:
+        self._segment_number += 1
+        opened = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = (
+            self.directory
+            / f"{self.prefix}-{opened}-{self._segment_number:04d}{SEGMENT_SUFFIX}"
+        )
+        self.segments.append(path)
+        if self._log_debug_enabled:
+            self.log.debug(f"Recording to {path}")
+        return _SegmentWriter(path, self.compression, self.level)
+
+    def _close_segment(self) -> None:
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def rotate(self) -> None:
+        """Starts a new segment with the next block."""
+        self._rotate_requested = True
+
+    def _write_block(self, frames: list) -> None:
+        segment = self._segment
+        if segment is not None and (
+            self._rotate_requested
+            or segment.size >= self.max_segment_size
+            or time.monotonic() - segment.opened_at >= self.max_segment_age
+        ):
+            self._rotate_requested = False
+            self._close_segment()
+            segment = None
+        if segment is None:
+            segment = self._segment = self._open_segment()
+        self.written_bytes += segment.write_block(frames)
+        self.blocks += 1
+
+    def _run(self) -> None:
+        pending = self._pending
+        block = []
+        block_bytes = 0
+        block_started = time.monotonic()
+        try:
+            while True:
+                stopping = self._stop_event.is_set()
+                while pending:
+                    received_at, frame = pending.popleft()
+                    if isinstance(frame, str):
+                        frame = frame.encode("utf-8")
+                    block.append((received_at, frame))
+                    block_bytes += len(frame) + FRAME_HEADER.size
+                    if block_bytes >= self.block_size:
+                        break
+                if block and (
+                    stopping
+                    or block_bytes >= self.block_size
+                    or time.monotonic() - block_started >= self.block_interval
+                ):
+                    try:
+                        self._write_block(block)
+                        self.frames += len(block)
+                        self.raw_bytes += block_bytes
+                    except OSError as e:
+                        self.write_errors += 1
+                        self.dropped += len(block)
+                        self.log.error(f"Failed to write recording block: {e}")
+                    block = []
+                    block_bytes = 0
+                    block_started = time.monotonic()
+                    continue
+                if stopping and not pending:
+                    break
+                if not pending:
+                    self._wakeup.clear()
+                    # A frame recorded before the clear didn't set it again
+                    if pending or self._stop_event.is_set():
+                        continue
+                    timeout = None
+                    if block:
+                        elapsed = time.monotonic() - block_started
+                        timeout = max(self.block_interval - elapsed, 0)
+                    self._wakeup.wait(timeout)
+        finally:
+            self._close_segment()
+
+    def stats(self) -> dict:
+        """Frames and bytes recorded, drops, buffered frames and segments."""
+        return {
+            "running": self.is_running,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "pending": len(self._pending),
+            "raw_bytes": self.raw_bytes,
+            "written_bytes": self.written_bytes,
+            "compression_ratio": (
+                self.raw_bytes / self.written_bytes if self.written_bytes else None
+            ),
+            "blocks": self.blocks,
+            "segments": [str(x) for x in self.segments],
+            "write_errors": self.write_errors,
+        }
+
+
+class SegmentReader:
+    """
+    Reads the frames of a single segment file, using its index when it was
+    closed and scanning its blocks otherwise.
+
+    Usage
+    ----
+        >>> reader = SegmentReader("recordings/stream-20240119-093000-0001.tdrec")
+        >>> for received_at, frame in reader.frames(start=1705674600.0):
+                print(received_at, frame)
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            header = f.read(len(SEGMENT_MAGIC) + 1)
+        if len(header) < len(SEGMENT_MAGIC) + 1 or header[:-1] != SEGMENT_MAGIC:
+            raise ValueError(f"{self.path} is not a stream recording segment")
+        self.compression_id = header[-1]
+        if self.compression_id not in _DECOMPRESS:
+            raise ValueError(f"Unknown compression {self.compression_id} in {self.path}")
+        self._decompress = _DECOMPRESS[self.compression_id]
+        self._blocks: list[BlockInfo] | None = None
+        self.indexed = False
+
+        self.log = TdLogger(__name__).logger
+
+    @property
+    def blocks(self) -> list[BlockInfo]:
+        if self._blocks is None:
+            self._blocks = self._read_index()
+            self.indexed = self._blocks is not None
+            if self._blocks is None:
+                self._blocks = self._scan_blocks()
+        return self._blocks
+
+    def _read_index(self) -> list[BlockInfo] | None:
+        with open(self.path, "rb") as f:
+            f.seek(0, 2)
+            size = f.tell()
+            if size < len(SEGMENT_MAGIC) + 1 + INDEX_TRAILER.size:
+                return None
+            f.seek(size - INDEX_TRAILER.size)
+            index_offset, count, magic = INDEX_TRAILER.unpack(
+                f.read(INDEX_TRAILER.size)
+            )
+            if magic != INDEX_MAGIC:
+                return None
+            f.seek(index_offset)
+            data = f.read(count * INDEX_ENTRY.size)
+        return [BlockInfo(*x) for x in INDEX_ENTRY.iter_unpack(data)]
+
+    def _scan_blocks(self) -> list[BlockInfo]:
+        blocks = []
+        with open(self.path, "rb") as f:
+            offset = len(SEGMENT_MAGIC) + 1
+            while True:
+                f.seek(offset)
+                header = f.read(BLOCK_HEADER.size)
+                if len(header) < BLOCK_HEADER.size:
+                    break
+                size, raw_size, frames, first_at, last_at = BLOCK_HEADER.unpack(header)
+                if not (
+                    size > 0
+                    and frames > 0
+                    and raw_size >= frames * FRAME_HEADER.size
+                    and 0 < first_at <= last_at
+                ):
+                    # Not a block, e.g. the start of a partly written index
+                    self.log.warning(
+                        f"{self.path} has no index and ends in an invalid block "
+                        f"at {offset}, read up to there"
+                    )
+                    break
+                if len(f.read(size)) < size:
+                    # Partly written block
+                    break
+                blocks.append(BlockInfo(offset, frames, first_at, last_at))
+                offset += BLOCK_HEADER.size + size
+        return blocks
+
+    @property
+    def first_at(self) -> float | None:
+        return self.blocks[0].first_at if self.blocks else None
+
+    @property
+    def last_at(self) -> float | None:
+        return self.blocks[-1].last_at if self.blocks else None
+
+    def read_block(self, block: BlockInfo, f=None) -> list[tuple[float, bytes]]:
+        """The frames of a block."""
+        if f is None:
+            with open(self.path, "rb") as f:
+                return self.read_block(block, f)
+        f.seek(block.offset)
+        size, raw_size, frames, _, _ = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+        raw = self._decompress(f.read(size))
+        if len(raw) != raw_size:
+            raise ValueError(
+                f"Block at {block.offset} of {self.path} is {len(raw)} bytes, "
+                f"expected {raw_size}"
+            )
+        result = []
+        offset = 0
+        unpack_from = FRAME_HEADER.unpack_from
+        header_size = FRAME_HEADER.size
+        for _ in range(frames):
+            received_at, length = unpack_from(raw, offset)
+            offset += header_size
+            result.append((received_at, raw[offset : offset + length]))
+            offset += length
+        return result
+
+    def frames(self, start: float | None = None, end: float | None = None):
+        """
+        Yields `(received_at, frame)` received between `start` and `end`.
+        A segment without an index (never closed) ends at its first block
+        that can't be read.
+        """
+        with open(self.path, "rb") as f:
+            for block in self.blocks:
+                if start is not None and block.last_at < start:
+                    continue
+                if end is not None and block.first_at > end:
+                    break
+                try:
+                    block_frames = self.read_block(block, f)
+                except Exception as e:
+                    if self.indexed:
+                        raise
+                    self.log.warning(
+                        f"{self.path} has no index and an unreadable block at "
+                        f"{block.offset}, read up to there: {e}"
+                    )
+                    return
+                for received_at, frame in block_frames:
+                    if start is not None and received_at < start:
+                        continue
+                    if end is not None and received_at > end:
+                        return
+                    yield received_at, frame
+
+    def __len__(self) -> int:
+        return sum(x.frames for x in self.blocks)
+
+
+class RecordingReader:
+    """
+    Reads the frames of a recording's segments in order.
+
+    Usage
+    ----
+        >>> recording = open_recording("recordings")
+        >>> len(recording), recording.first_at, recording.last_at
+        >>> for received_at, frame in recording.frames():
+                print(received_at, frame)
+    """
+
+    def __init__(self, paths: list[str | Path]) -> None:
+        self.segments = [SegmentReader(x) for x in paths]
+        self.segments.sort(key=lambda x: (x.first_at is None, x.first_at or 0, x.path))
+
+    @property
+    def first_at(self) -> float | None:
+        times = [x.first_at for x in self.segments if x.first_at is not None]
+        return min(times) if times else None
+
+    @property
+    def last_at(self) -> float | None:
+        times = [x.last_at for x in self.segments if x.last_at is not None]
+        return max(times) if times else None
+
+    def frames(self, start: float | None = None, end: float | None = None):
+        """Yields `(received_at, frame)` of every segment, see `SegmentReader`."""
+        for segment in self.segments:
+            if start is not None and (segment.last_at or 0) < start:
+                continue
+            if end is not None and (segment.first_at or 0) > end:
+                break
+            yield from segment.frames(start, end)
+
+    def __len__(self) -> int:
+        return sum(len(x) for x in self.segments)
+
+
+def open_recording(path: str | Path, prefix: str | None = None) -> RecordingReader:
+    """
+    Opens a recording, either a directory of segments (optionally only the
+    ones named `{prefix}-...`) or a single segment file.
+    """
+    path = Path(path)
+    if path.is_dir():
+        pattern = f"{prefix}-*{SEGMENT_SUFFIX}" if prefix else f"*{SEGMENT_SUFFIX}"
+        return RecordingReader(sorted(path.glob(pattern)))
+    return RecordingReader([path])
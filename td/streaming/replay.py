@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import threading
+import time
+from pathlib import Path
+
+from td.logger import TdLogger
+from td.streaming.recorder import RecordingReader, open_recording
+
+# Stand-in principals for a client that never logs in
+OFFLINE_PRINCIPALS = {
+    "streamerInfo": {
+        "streamerSocketUrl": "localhost",
+        "tokenTimestamp": "1970-01-01T00:00:00+0000",
+        "token": "offline",
+        "userGroup": "offline",
+        "accessLevel": "offline",
+        "appId": "offline",
+        "acl": "offline",
+    },
+    "accounts": [
+        {
+            "accountId": "0",
+            "company": "offline",
+            "segment": "offline",
+            "accountCdDomainId": "offline",
+        }
+    ],
+}
+
+
+def make_offline_client(**kwargs):
+    """
+    Creates a `StreamingApiClient` that never connects, with its loop
+    running in a background thread, so handlers can be added as usual and
+    recordings replayed into it. Set its `shutdown_event` to stop the loop.
+
+    Usage
+    ----
+        >>> stream_client = make_offline_client()
+        >>> stream_client.add_handler("data", "QUOTE", level_one_handler.data_message_handler)
+        >>> StreamReplayer(stream_client, "recordings", speed=None).replay()
+    """
+    from td.streaming.client import StreamingApiClient
+
+    kwargs.setdefault("user_principal_data", OFFLINE_PRINCIPALS)
+    stream_client = StreamingApiClient(session=None, **kwargs)
+    stream_client.loop = asyncio.new_event_loop()
+    stream_client.background_thread = threading.Thread(
+        target=stream_client.loop.run_until_complete,
+        args=[stream_client.shutdown_event.wait()],
+        name="td-stream-offline",
+        daemon=True,
+    )
+    stream_client.background_thread.start()
+    return stream_client
+
+
+class StreamReplayer:
+    """
+    Overview
+    ----
+    Feeds recorded frames back through a `StreamingApiClient`'s own frame
+    processing (`_process_message`): parsing, the notify / response
+    bookkeeping, `on_message_received`, the handler router with its
+    backpressure queues, and the monitor.
+
+    Speeds:
+
+    - `1.0`: the recorded pace, from the receive times of the frames.
+    - `> 1.0`: accelerated, e.g. `10` replays an hour in six minutes.
+    - `None`: as fast as the handlers allow.
+
+    Sync handlers run inline in the recorded order. With
+    `wait_for_handlers` each frame also waits for the async handlers and
+    queues it started, so the whole pipeline sees the frames strictly in
+    order and a run is repeatable; without it async handlers overlap like
+    they do live.
+
+    The client can be an offline client (`make_offline_client`) for
+    backtests and benchmarks, or a live one, whose stream keeps running
+    alongside the replay.
+
+    Usage
+    ----
+        >>> stream_client = make_offline_client()
+        >>> stream_client.add_handler("data", "NASDAQ_BOOK", book.data_message_handler)
+        >>> replayer = StreamReplayer(stream_client, "recordings/2024-01-19", speed=None)
+        >>> replayer.replay()
+        >>> replayer.stats()
+    """
+
+    def __init__(
+        self,
+        stream_client,
+        source,
+        speed: float | None = 1.0,
+        start: float | None = None,
+        end: float | None = None,
+        wait_for_handlers: bool = False,
+        yield_every: int = 100,
+    ) -> None:
+        """
+        Parameters
+        ----
+        stream_client: StreamingApiClient
+            The client the frames are processed by.
+
+        source: str | Path | RecordingReader | Iterable[tuple[float, str | bytes]]
+            A recording (directory or segment file), an open recording or
+            `(received_at, frame)` pairs.
+
+        speed: float | None (optional, Default=1.0)
+            Replay speed, None for as fast as possible.
+
+        start: float (optional, Default=None)
+            Only frames received at or after this `time.time()`.
+
+        end: float (optional, Default=None)
+            Only frames received at or before this `time.time()`.
+
+        wait_for_handlers: bool (optional, Default=False)
+            Wait for the async handlers and queues after each frame.
+
+        yield_every: int (optional, Default=100)
+            Frames between yields to the loop when frames are due at once,
+            so other tasks (e.g. queue workers) keep running.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError(f"Replay speed must be positive or None, got {speed}")
+        self.stream_client = stream_client
+        self.source = source
+        self.speed = speed
+        self.start = start
+        self.end = end
+        self.wait_for_handlers = wait_for_handlers
+        self.yield_every = yield_every
+
+        self._stop_requested = False
+        self.running = False
+        self.frames = 0
+        self.data_items = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        # Most behind the recorded schedule (s), handlers slower than the pace
+        self.max_behind = 0.0
+        self.first_at: float | None = None
+        self.last_at: float | None = None
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    def _frames(self):
+        source = self.source
+        if isinstance(source, (str, Path)):
+            source = open_recording(source)
+        if isinstance(source, RecordingReader):
+            return source.frames(self.start, self.end)
+        if self.start is None and self.end is None:
+            return iter(source)
+        return (
+            x
+            for x in source
+            if (self.start is None or x[0] >= self.start)
+            and (self.end is None or x[0] <= self.end)
+        )
+
+    async def _drain(self) -> None:
+        """Waits for the handler tasks and the queued and running deliveries."""
+        router = self.stream_client._router
+        while True:
+            if router.tasks:
+                await asyncio.wait(list(router.tasks))
+                continue
+            busy = [x for x in router._executors.values() if x.depth or x.in_flight]
+            if not busy:
+                return
+            await asyncio.gather(*(x.wait_idle() for x in busy))
+
+    async def _replay(self) -> dict:
+        """Replays the frames, has to run on the client's loop."""
+        stream_client = self.stream_client
+        process = stream_client._process_message
+        speed = self.speed
+        wait_for_handlers = self.wait_for_handlers
+        yield_every = self.yield_every
+
+        self._stop_requested = False
+        self.running = True
+        started = time.perf_counter()
+        first_at = None
+        since_yield = 0
+        try:
+            for received_at, frame in self._frames():
+                if self._stop_requested:
+                    break
+                if first_at is None:
+                    first_at = self.first_at = received_at
+
+                if speed is not None:
+                    due = (received_at - first_at) / speed
+                    delay = due - (time.perf_counter() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                        since_yield = 0
+                    elif -delay > self.max_behind:
+                        self.max_behind = -delay
+
+                try:
+                    msg = await process(frame, received_at)
+                except Exception as e:
+                    self.errors += 1
+                    self.log.error(f"Failed to replay frame: {e}")
+                    continue
+                self.frames += 1
+                self.last_at = received_at
+                data = msg.get("data", None)
+                if data:
+                    self.data_items += len(data)
+
+                if wait_for_handlers:
+                    await self._drain()
+                else:
+                    since_yield += 1
+                    if since_yield >= yield_every:
+                        since_yield = 0
+                        await asyncio.sleep(0)
+            await self._drain()
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self.running = False
+        return self.stats()
+
+    def replay(self, timeout: float | None = None) -> dict:
+        """
+        Replays the frames on the client's loop and returns the `stats`,
+        blocking until done. Await `_replay` instead from the loop itself.
+        """
+        loop = self.stream_client.loop
+        if loop is None:
+            raise ValueError(
+                "The stream client has no loop, open it or use make_offline_client"
+            )
+        return asyncio.run_coroutine_threadsafe(self._replay(), loop).result(timeout)
+
+    def stop(self) -> None:
+        """Stops the replay before the next frame."""
+        self._stop_requested = True
+
+    def stats(self) -> dict:
+        """Frames replayed, errors, throughput and how far it fell behind."""
+        recorded = (
+            self.last_at - self.first_at
+            if self.first_at is not None and self.last_at is not None
+            else None
+        )
+        return {
+            "frames": self.frames,
+            "data_items": self.data_items,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "recorded_span": recorded,
+            "frames_per_sec": self.frames / self.elapsed if self.elapsed else None,
+            "data_items_per_sec": (
+                self.data_items / self.elapsed if self.elapsed else None
+            ),
+            "max_behind_ms": self.max_behind * 1000,
+        }
@@ -0,0 +1,239 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from td.utils.metrics import LatencyStats
+
+
+class RequestResult:
+    """
+    The outcome of a data request, `code` and `message` come from the
+    matching `response` (0 is success). Times are `time.perf_counter()`
+    values.
+    """
+
+    __slots__ = (
+        "request_id",
+        "service",
+        "command",
+        "code",
+        "message",
+        "timed_out",
+        "enqueued_at",
+        "sent_at",
+        "acked_at",
+    )
+
+    def __init__(self, request_id: int, service: str, command: str) -> None:
+        self.request_id = request_id
+        self.service = service
+        self.command = command
+        self.code: int | None = None
+        self.message: str | None = None
+        self.timed_out = False
+        self.enqueued_at = time.perf_counter()
+        self.sent_at: float | None = None
+        self.acked_at: float | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.code == 0
+
+    @property
+    def latency_ms(self) -> float | None:
+        """Enqueue to response."""
+        if self.acked_at is None:
+            return None
+        return (self.acked_at - self.enqueued_at) * 1000
+
+    @property
+    def round_trip_ms(self) -> float | None:
+        """Sent to response."""
+        if self.acked_at is None or self.sent_at is None:
+            return None
+        return (self.acked_at - self.sent_at) * 1000
+
+    def __repr__(self) -> str:
+        latency = self.latency_ms
+        latency = f"{latency:.2f}ms" if latency is not None else None
+        return (
+            f"RequestResult({self.request_id} {self.service} {self.command} "
+            f"code={self.code} message={self.message} timed_out={self.timed_out} "
+            f"latency={latency})"
+        )
+
+
+class RequestTracker:
+    """
+    Overview
+    ----
+    Keeps a future per data request, resolved with a `RequestResult` when
+    the `response` with the same `requestid` arrives, or when the request
+    times out. The futures never raise, a timed out request resolves with
+    `timed_out` set and no code.
+
+    Chart history `GET`s aren't answered with a `response`, they're
+    resolved by their snapshot instead, which carries the request id in
+    field 0 of each content entry.
+
+    Usage
+    ----
+        >>> request_id = stream_services.level_one_quotes(["SPY"])
+        >>> result = stream_client.wait_for_request(request_id, timeout=5)
+        >>> result.ok, result.latency_ms
+    """
+
+    def __init__(
+        self, timeout: float = 30.0, max_done: int = 1000, max_samples: int = 10000
+    ) -> None:
+        """
+        Parameters
+        ----
+        timeout: float (optional, Default=30.0)
+            Default seconds before a request without a response times out.
+
+        max_done: int (optional, Default=1000)
+            Resolved futures kept, so a request can still be awaited after
+            its response arrived.
+
+        max_samples: int (optional, Default=10000)
+            Latency samples kept for percentiles.
+        """
+        self.timeout = timeout
+        # request id -> (future, result, timeout handle)
+        self._pending: dict[int, tuple] = {}
+        self._done: OrderedDict[int, asyncio.Future] = OrderedDict()
+        self.max_done = max_done
+        # Enqueue to response latency (ms)
+        self.response_latency = LatencyStats(max_samples)
+        self.succeeded = 0
+        self.failed = 0
+        self.timed_out = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def track(self, request: dict, timeout: float | None = None) -> asyncio.Future:
+        """Creates the future of a request, has to run on the stream's loop."""
+        loop = asyncio.get_running_loop()
+        request_id = request["requestid"]
+        result = RequestResult(request_id, request["service"], request["command"])
+        future = loop.create_future()
+        timeout = self.timeout if timeout is None else timeout
+        handle = loop.call_later(timeout, self._expire, request_id) if timeout else None
+        self._pending[request_id] = (future, result, handle)
+        return future
+
+    def get_future(self, request_id: int) -> asyncio.Future | None:
+        """The future of a request, None if unknown or long resolved."""
+        pending = self._pending.get(request_id, None)
+        if pending:
+            return pending[0]
+        return self._done.get(request_id, None)
+
+    def _set_done(self, future: asyncio.Future, result: RequestResult) -> None:
+        if not future.done():
+            future.set_result(result)
+        self._done[result.request_id] = future
+        if len(self._done) > self.max_done:
+            self._done.popitem(last=False)
+
+    def mark_sent(self, request_ids: list[int], sent_at: float) -> None:
+        for request_id in request_ids:
+            pending = self._pending.get(request_id, None)
+            if pending:
+                pending[1].sent_at = sent_at
+
+    def resolve(self, response: dict) -> bool:
+        """
+        Resolves the request of a `response` item.
+
+        Returns
+        ----
+        bool
+            False if no request was waiting for it.
+        """
+        content = response.get("content", None) or {}
+        return self._resolve(
+            response.get("requestid", None),
+            content.get("code", None),
+            content.get("msg", None),
+        )
+
+    def resolve_snapshot(self, snapshot: dict) -> bool:
+        """
+        Resolves the chart history `GET`s answered by a `snapshot` item, the
+        request id is field 0 of each content entry.
+
+        Returns
+        ----
+        bool
+            False if no request was waiting for any of the entries.
+        """
+        resolved = False
+        for entry in snapshot.get("content", None) or ():
+            if self._resolve(entry.get("0", None), 0, "snapshot received"):
+                resolved = True
+        return resolved
+
+    def _resolve(self, request_id, code: int | None, message: str | None) -> bool:
+        try:
+            request_id = int(request_id)
+        except (TypeError, ValueError):
+            return False
+        pending = self._pending.pop(request_id, None)
+        if pending is None:
+            return False
+        future, result, handle = pending
+        if handle:
+            handle.cancel()
+
+        result.acked_at = time.perf_counter()
+        result.code = code
+        result.message = message
+        self.response_latency.add(result.latency_ms)
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self._set_done(future, result)
+        return True
+
+    def fail(self, request_ids: list[int], message: str) -> None:
+        """Resolves requests that couldn't be sent, with no code and `message`."""
+        for request_id in request_ids:
+            pending = self._pending.pop(request_id, None)
+            if pending is None:
+                continue
+            future, result, handle = pending
+            if handle:
+                handle.cancel()
+            result.message = message
+            self.failed += 1
+            self._set_done(future, result)
+
+    def _expire(self, request_id: int) -> None:
+        pending = self._pending.pop(request_id, None)
+        if pending is None:
+            return
+        future, result, _ = pending
+        result.timed_out = True
+        self.timed_out += 1
+        self._set_done(future, result)
+
+    def cancel_all(self) -> None:
+        """Resolves every pending request as timed out, e.g. on shutdown."""
+        for request_id in list(self._pending):
+            pending = self._pending[request_id]
+            if pending[2]:
+                pending[2].cancel()
+            self._expire(request_id)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "response_latency_ms": self.response_latency.summary(),
+        }
@@ -513,9 +513,40 @@ class StreamingServices:
             Request number
         """
 
-        # Handle datetimes.
-        start_time = convert_to_unix_time_ms(start_time)
-        end_time = convert_to_unix_time_ms(end_time)
+        request = self.chart_history_request(
+            service, symbol, frequency, period, start_time, end_time
+        )
+
+        # NOTE: ADD doesn't work, only 1 symbol per sub, but it's documented it should
+        if request["service"] in self.stream_client.subscribed_services:
+            request["command"] = "ADD"
+
+        return self.stream_client.add_data_request(request)
+
+    def chart_history_request(
+        self,
+        service: str | Enum,
+        symbol: List[str] | str,
+        frequency: str | ChartFuturesFrequencies,
+        period: str | ChartFuturesPeriods = None,
+        start_time: int | datetime | date = None,
+        end_time: int | datetime | date = None,
+    ) -> dict:
+        """
+        Builds and validates a chart history `GET` request without sending it,
+        see `chart_history` for the parameters.
+
+        Returns
+        ----
+        dict
+            The service request.
+        """
+
+        # Handle datetimes, period only requests have neither.
+        if start_time is not None:
+            start_time = convert_to_unix_time_ms(start_time)
+        if end_time is not None:
+            end_time = convert_to_unix_time_ms(end_time)
 
         if isinstance(frequency, Enum):
             frequency = frequency.value
@@ -548,9 +579,6 @@ class StreamingServices:
         else:
             request["parameters"]["symbol"] = symbol
 
-        # NOTE: ADD doesn't work, only 1 symbol per sub, but it's documented it should
-        if service in self.stream_client.subscribed_services:
-            request["command"] = "ADD"
         # handle the case where we get a start time or end time. DO FURTHER VALIDATION.
         if start_time is not None or end_time is not None:
             if start_time is None or end_time is None:
@@ -563,7 +591,7 @@ class StreamingServices:
         del request["parameters"]["keys"]
         del request["parameters"]["fields"]
 
-        return self.stream_client.add_data_request(request)
+        return request
 
     def futures_chart_history(
         self,
@@ -646,6 +674,63 @@ class StreamingServices:
             return
         return self.unsubscribe(ChartHistoryServices.CHART_HISTORY_FUTURES.value)
 
+    async def chart_history_bulk(
+        self,
+        requests: List[dict],
+        service: str | Enum = ChartHistoryServices.CHART_HISTORY_FUTURES,
+        max_concurrency: int = 10,
+        timeout: float = 15.0,
+        as_model: bool = True,
+    ):
+        """
+        Downloads chart history for many symbols / frequencies concurrently
+        and yields a `ChartHistoryResult` per request as the snapshots come
+        in. Snapshots are matched to their request by the echoed request id,
+        a single handler is used for all of them.
+
+        Has to be iterated on the stream client's event loop.
+
+        Parameters
+        ---
+        requests: List[dict]
+            `chart_history` keyword arguments, one symbol per request.
+
+        service: str | Enum (optional, Default=CHART_HISTORY_FUTURES)
+            The chart history service.
+
+        max_concurrency: int (optional, Default=10)
+            Requests waiting for a snapshot at the same time.
+
+        timeout: float (optional, Default=15.0)
+            Seconds to wait for the snapshot of a request, timed out requests
+            are yielded with `error` set.
+
+        as_model: bool (optional, Default=True)
+            Parse the snapshots into `ChartHistorySnapshot`.
+
+        Usage
+        ----
+            >>> requests = [
+                    {"symbol": future, "frequency": frequency, "start_time": start, "end_time": end}
+                    for future in ["/ES", "/NQ"]
+                    for frequency in [ChartFuturesFrequencies.ONE_MINUTE, ChartFuturesFrequencies.ONE_DAY]
+                ]
+            >>> async for result in stream_services.chart_history_bulk(requests, max_concurrency=4):
+                    if result.ok:
+                        print(result.symbol, len(result.snapshot.data))
+        """
+        from td.streaming.chart_history import ChartHistoryDownloader
+
+        downloader = ChartHistoryDownloader(
+            self,
+            service=service,
+            max_concurrency=max_concurrency,
+            timeout=timeout,
+            as_model=as_model,
+        )
+        async for result in downloader.download(requests):
+            yield result
+
     # LEVEL ONE - QUOTE
     def level_one_quotes(
         self,
@@ -1441,6 +1526,76 @@ class StreamingServices:
 
         self.stream_client.has_handler(response_type, service, func_)
 
+    def set_backpressure_policy(
+        self,
+        service: str | Enum,
+        policy: str | Enum = "drop_oldest",
+        max_queue: int | None = 1000,
+        workers: int = 1,
+        max_block: float = 1.0,
+        interval: float = 0.0,
+    ):
+        """
+        Sets how the data handlers of a service deal with bursts, see
+        `StreamingApiClient.set_backpressure_policy`.
+
+        Usage
+        ----
+            >>> stream_client = td_client.streaming_api_client()
+            >>> stream_services = stream_client.services
+            >>> stream_services.set_backpressure_policy(
+                "QUOTE",
+                "conflate",
+            )
+        """
+        if isinstance(service, Enum):
+            service = service.value
+
+        self.stream_client.set_backpressure_policy(
+            service, policy, max_queue, workers, max_block, interval
+        )
+
+    def enable_conflation(
+        self,
+        services: List[str | Enum] | None = None,
+        interval: float = 0.0,
+        max_queue: int = 1000,
+    ):
+        """
+        Conflates the level one services per symbol: partial updates are
+        merged and each handler gets at most one update per symbol per call,
+        at most every `interval` seconds. Handlers of these services are
+        called with the merged state instead of every partial update.
+
+        Parameters
+        ----
+        services: List[str | Enum] (optional, Default=None)
+            The services to conflate, defaults to all `LevelOneServices`.
+
+        interval: float (optional, Default=0.0)
+            The least seconds between calls of a handler, 0 calls it as soon
+            as it's done with the previous update.
+
+        max_queue: int (optional, Default=1000)
+            Symbols held per handler.
+
+        Usage
+        ----
+            >>> stream_services.add_handler("data", "QUOTE", quote_handler)
+            >>> stream_services.enable_conflation(interval=0.25)
+        """
+        for service in services or LevelOneServices:
+            self.set_backpressure_policy(
+                service, "conflate", max_queue=max_queue, interval=interval
+            )
+
+    def disable_conflation(self, services: List[str | Enum] | None = None):
+        """Goes back to delivering every update of the level one services."""
+        for service in services or LevelOneServices:
+            if isinstance(service, Enum):
+                service = service.value
+            self.stream_client.clear_backpressure_policy(service)
+
     def is_subscribed(self, service: str | Enum):
         """
         Are you subscribed to given service.
@@ -0,0 +1,434 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from enum import Enum
+
+from td.logger import TdLogger
+
+SHARD_MODES = ("thread", "process")
+
+# Service name of the stats messages the worker processes send
+_STATS = "__stats__"
+
+
+def default_stream_client_factory():
+    """Creates a streaming client from the default credentials and config."""
+    from td.client import TdAmeritradeClient
+
+    return TdAmeritradeClient().streaming_api_client()
+
+
+def _client_stats(stream_client) -> dict:
+    connection = stream_client._connection
+    return {
+        "connected": bool(connection is not None and connection.open),
+        "restarts": stream_client.restarts,
+        "subscribed_services": list(stream_client.subscribed_services),
+        "parse_failed": stream_client.parse_failed_count,
+        "request_stats": stream_client.get_request_stats(),
+    }
+
+
+def _run_shard_process(
+    index: int,
+    services: list[str],
+    out_queue,
+    control_queue,
+    client_factory,
+    transform,
+    stats_interval: float,
+) -> None:
+    """Runs one shard's stream in a worker process until told to stop."""
+    stream_client = client_factory()
+    stream_client.open_stream()
+    # Data messages handled and dropped because the merged queue was full
+    counts = {"received": 0, "dropped": 0}
+
+    def handler(msg):
+        counts["received"] += 1
+        payload = transform(msg) if transform else msg
+        try:
+            out_queue.put_nowait((index, msg.get("service", None), payload))
+        except queue.Full:
+            counts["dropped"] += 1
+
+    for service in services:
+        stream_client.add_handler("data", service, handler)
+
+    while True:
+        try:
+            command, args = control_queue.get(timeout=stats_interval)
+        except queue.Empty:
+            try:
+                out_queue.put_nowait(
+                    (index, _STATS, {**_client_stats(stream_client), **counts})
+                )
+            except queue.Full:
+                # Sent again with the next interval
+                pass
+            continue
+        if command == "subscribe":
+            if args[0] not in services:
+                services.append(args[0])
+                stream_client.add_handler("data", args[0], handler)
+            stream_client.subscriptions.subscribe(*args)
+        elif command == "unsubscribe":
+            stream_client.subscriptions.unsubscribe(*args)
+        elif command == "stop":
+            # The event belongs to the client's loop thread
+            stream_client.loop.call_soon_threadsafe(stream_client.shutdown_event.set)
+            break
+
+
+class _Shard:
+    """The parent side state of a shard."""
+
+    __slots__ = (
+        "index",
+        "services",
+        "stream_client",
+        "process",
+        "control_queue",
+        "received",
+        "consumed",
+        "dropped",
+        "last_message_at",
+        "worker_stats",
+        "_rate_received",
+        "_rate_consumed",
+        "_rate_at",
+    )
+
+    def __init__(self, index: int, services: list[str]) -> None:
+        self.index = index
+        self.services = services
+        self.stream_client = None
+        self.process = None
+        self.control_queue = None
+        # Data messages the shard's client handled
+        self.received = 0
+        # Merged messages read by the consumer
+        self.consumed = 0
+        # Data messages dropped because the merged queue was full
+        self.dropped = 0
+        self.last_message_at: float | None = None
+        self.worker_stats: dict = {}
+        self._rate_received = 0
+        self._rate_consumed = 0
+        self._rate_at = time.monotonic()
+
+
+class ShardedStreamClient:
+    """
+    Overview
+    ----
+    Spreads the streaming services over several connections, each with its
+    own `StreamingApiClient`, so a heavy feed (e.g. `OPTIONS_BOOK` or
+    timesale) doesn't hold up the level one quotes of another shard. The
+    output of all shards is merged into one queue, read with `get` /
+    `messages` or passed to `on_message`.
+
+    Modes:
+
+    - `thread`: each client runs its own loop in its own thread.
+    - `process`: each client runs in a worker process, which parses and
+      `transform`s its own traffic, so decoding uses more than one core.
+      `client_factory` and `transform` have to be picklable (module level
+      functions) unless processes are forked.
+
+    Each shard logs in with its own connection, the account has to allow
+    more than one streaming connection at a time.
+
+    Usage
+    ----
+        >>> sharded = ShardedStreamClient(
+                [["QUOTE", "LEVELONE_FUTURES"], ["OPTIONS_BOOK"], ["TIMESALE_EQUITY"]],
+                mode="process",
+            )
+        >>> sharded.start()
+        >>> sharded.subscribe("QUOTE", ["SPY", "QQQ"], fields=[0, 1, 2, 3])
+        >>> sharded.subscribe("OPTIONS_BOOK", ["SPY_011924C470"], fields=[0, 1, 2, 3])
+        >>> for shard, service, msg in sharded.messages():
+                print(shard, service, msg)
+        >>> sharded.get_stats()
+    """
+
+    def __init__(
+        self,
+        shards: list[list[str | Enum]],
+        mode: str = "thread",
+        client_factory=None,
+        transform=None,
+        on_message=None,
+        max_queue: int = 100000,
+        stats_interval: float = 1.0,
+    ) -> None:
+        """
+        Parameters
+        ----
+        shards: list[list[str | Enum]]
+            The services of each shard. Services not listed go to the first
+            shard.
+
+        mode: str (optional, Default="thread")
+            `thread` or `process`.
+
+        client_factory: Callable (optional, Default=None)
+            Returns a new (not opened) `StreamingApiClient`, defaults to one
+            built from the default credentials and config.
+
+        transform: Callable (optional, Default=None)
+            Applied to each data message on its shard before it's merged,
+            e.g. to decode it into records or reduce it.
+
+        on_message: Callable (optional, Default=None)
+            Called as `on_message(shard, service, msg)` from a consumer
+            thread, instead of reading the messages with `get`.
+
+        max_queue: int (optional, Default=100000)
+            Merged messages held, shards drop newer messages when full
+            instead of waiting for the consumer.
+
+        stats_interval: float (optional, Default=1.0)
+            Seconds between the stats updates of worker processes.
+        """
+        if mode not in SHARD_MODES:
+            raise ValueError(
+                f"Invalid shard mode {mode}, must be one of {SHARD_MODES}"
+            )
+        if not shards:
+            raise ValueError("At least one shard is required")
+
+        self.mode = mode
+        self.client_factory = client_factory or default_stream_client_factory
+        self.transform = transform
+        self.stats_interval = stats_interval
+        self._on_message = on_message
+
+        self.shards: list[_Shard] = []
+        self._service_shards: dict[str, int] = {}
+        for index, services in enumerate(shards):
+            services = [x.value if isinstance(x, Enum) else x for x in services]
+            for service in services:
+                if service in self._service_shards:
+                    raise ValueError(f"{service} is assigned to more than one shard")
+                self._service_shards[service] = index
+            self.shards.append(_Shard(index, services))
+
+        if mode == "process":
+            self._queue = multiprocessing.Queue(max_queue)
+        else:
+            self._queue = queue.Queue(max_queue)
+
+        self._consumer_thread = None
+        self._running = False
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    def get_shard(self, service: str | Enum) -> int:
+        """The shard a service is streamed on."""
+        if isinstance(service, Enum):
+            service = service.value
+        return self._service_shards.get(service, 0)
+
+    # Lifecycle
+
+    def _thread_handler(self, shard: _Shard):
+        transform = self.transform
+        merged = self._queue
+
+        def handler(msg):
+            shard.received += 1
+            payload = transform(msg) if transform else msg
+            try:
+                merged.put_nowait((shard.index, msg.get("service", None), payload))
+            except queue.Full:
+                shard.dropped += 1
+
+        return handler
+
+    def start(self) -> None:
+        """Opens the stream of every shard."""
+        if self._running:
+            return
+        self._running = True
+        for shard in self.shards:
+            if self.mode == "thread":
+                shard.stream_client = self.client_factory()
+                shard.stream_client.open_stream()
+                handler = self._thread_handler(shard)
+                for service in shard.services:
+                    shard.stream_client.add_handler("data", service, handler)
+            else:
+                shard.control_queue = multiprocessing.Queue()
+                shard.process = multiprocessing.Process(
+                    target=_run_shard_process,
+                    args=(
+                        shard.index,
+                        shard.services,
+                        self._queue,
+                        shard.control_queue,
+                        self.client_factory,
+                        self.transform,
+                        self.stats_interval,
+                    ),
+                    name=f"td-stream-shard-{shard.index}",
+                    daemon=True,
+                )
+                shard.process.start()
+
+        if self._on_message is not None:
+            self._consumer_thread = threading.Thread(
+                target=self._consume, name="td-stream-shards-consumer", daemon=True
+            )
+            self._consumer_thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stops the shards, worker processes are terminated after `timeout`."""
+        self._running = False
+        for shard in self.shards:
+            if shard.stream_client is not None:
+                shard.stream_client.loop.call_soon_threadsafe(
+                    shard.stream_client.shutdown_event.set
+                )
+            if shard.process is not None:
+                shard.control_queue.put(("stop", ()))
+        for shard in self.shards:
+            if shard.process is not None:
+                shard.process.join(timeout)
+                if shard.process.is_alive():
+                    shard.process.terminate()
+
+    # Subscriptions
+
+    def subscribe(
+        self,
+        service: str | Enum,
+        keys: list[str] | str,
+        fields: list[str] | list[int] | None = None,
+    ) -> None:
+        """Subscribes keys on the shard of the service, see `SubscriptionManager`."""
+        if isinstance(service, Enum):
+            service = service.value
+        shard = self.shards[self.get_shard(service)]
+        if shard.process is not None:
+            if service not in shard.services:
+                shard.services.append(service)
+            shard.control_queue.put(("subscribe", (service, keys, fields)))
+            return
+        if service not in shard.services:
+            shard.services.append(service)
+            shard.stream_client.add_handler(
+                "data", service, self._thread_handler(shard)
+            )
+        shard.stream_client.subscriptions.subscribe(service, keys, fields)
+
+    def unsubscribe(self, service: str | Enum, keys: list[str] | str | None = None):
+        if isinstance(service, Enum):
+            service = service.value
+        shard = self.shards[self.get_shard(service)]
+        if shard.process is not None:
+            shard.control_queue.put(("unsubscribe", (service, keys)))
+        else:
+            shard.stream_client.subscriptions.unsubscribe(service, keys)
+
+    # Output
+
+    def get(self, timeout: float | None = None) -> tuple | None:
+        """
+        The next merged message as `(shard, service, msg)`, None if none
+        came within `timeout`.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            shard = self.shards[item[0]]
+            if item[1] == _STATS:
+                worker_stats = dict(item[2])
+                shard.received = worker_stats.pop("received")
+                shard.dropped = worker_stats.pop("dropped")
+                shard.worker_stats = worker_stats
+                continue
+            shard.consumed += 1
+            shard.last_message_at = time.time()
+            return item
+
+    def messages(self, timeout: float | None = None):
+        """Yields the merged messages until none came within `timeout`."""
+        while self._running:
+            item = self.get(timeout)
+            if item is None:
+                if timeout is not None:
+                    return
+                continue
+            yield item
+
+    def _consume(self) -> None:
+        while self._running:
+            item = self.get(timeout=0.5)
+            if item is None:
+                continue
+            try:
+                self._on_message(*item)
+            except Exception as e:
+                self.log.error(f"Shard consumer error: {e}")
+
+    # Health
+
+    def get_stats(self) -> list[dict]:
+        """
+        Returns the services, message counts and rates, last message age and
+        connection health of every shard.
+
+        `received` counts the data messages the shard handled and `dropped`
+        the ones that didn't fit in the merged queue, `consumed` the merged
+        messages read by the consumer. Worker processes report their counts
+        every `stats_interval`. Rates are per second since the previous call.
+        """
+        stats = []
+        now = time.monotonic()
+        for shard in self.shards:
+            elapsed = now - shard._rate_at
+            received_rate = consumed_rate = 0.0
+            if elapsed:
+                received_rate = (shard.received - shard._rate_received) / elapsed
+                consumed_rate = (shard.consumed - shard._rate_consumed) / elapsed
+            shard._rate_received = shard.received
+            shard._rate_consumed = shard.consumed
+            shard._rate_at = now
+
+            if shard.stream_client is not None:
+                health = _client_stats(shard.stream_client)
+                alive = shard.stream_client.background_thread.is_alive()
+            else:
+                health = dict(shard.worker_stats)
+                alive = shard.process is not None and shard.process.is_alive()
+
+            stats.append(
+                {
+                    "shard": shard.index,
+                    "services": shard.services,
+                    "alive": alive,
+                    "received": shard.received,
+                    "received_per_sec": received_rate,
+                    "consumed": shard.consumed,
+                    "consumed_per_sec": consumed_rate,
+                    "dropped": shard.dropped,
+                    "last_message_age": (
+                        time.time() - shard.last_message_at
+                        if shard.last_message_at
+                        else None
+                    ),
+                    **health,
+                }
+            )
+        return stats
@@ -0,0 +1,408 @@
+import asyncio
+import logging
+from enum import Enum
+
+from td.enums.enums import (
+    ChartHistoryServices,
+    LevelTwoServices,
+    StreamApiCommands,
+)
+from td.logger import TdLogger
+
+# Keys per service, conservative defaults, override with `key_limits`
+DEFAULT_KEY_LIMIT = 500
+DEFAULT_KEY_LIMITS = {service: 100 for service in LevelTwoServices.all_values()}
+
+# Services that aren't keyed subscriptions
+UNMANAGED_SERVICES = {"ADMIN", *ChartHistoryServices.all_values()}
+
+
+def _split(value) -> list[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [x for x in value.split(",") if x]
+    return [x.value if isinstance(x, Enum) else str(x) for x in value]
+
+
+def _field_order(field: str) -> tuple:
+    # Numeric wire keys in numeric order, anything else after them
+    return (not field.isdigit(), int(field) if field.isdigit() else 0, field)
+
+
+def _sort_fields(fields) -> tuple[str, ...]:
+    return tuple(sorted(set(fields), key=_field_order))
+
+
+class ServiceSubscription:
+    """The keys and fields of a single service."""
+
+    __slots__ = ("service", "keys", "fields")
+
+    def __init__(self, service: str, keys=None, fields=None) -> None:
+        self.service = service
+        # dict as an ordered set
+        self.keys: dict[str, None] = dict.fromkeys(keys or ())
+        self.fields: tuple[str, ...] = _sort_fields(fields or ())
+
+    def copy(self) -> "ServiceSubscription":
+        return ServiceSubscription(self.service, self.keys, self.fields)
+
+    def to_dict(self) -> dict:
+        return {
+            "service": self.service,
+            "keys": list(self.keys),
+            "fields": list(self.fields),
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"ServiceSubscription({self.service} keys={len(self.keys)} "
+            f"fields={list(self.fields)})"
+        )
+
+
+class SubscriptionManager:
+    """
+    Overview
+    ----
+    Tracks the symbols and fields wanted per service and sends only what
+    changed: `SUBS` for a new service, `ADD` for new keys, `UNSUBS` with the
+    removed keys (or without keys once none are left) and `VIEW` when the
+    fields change. Changes made by any number of callers in the same loop
+    iteration (or within `flush_window` seconds) go out together in a
+    single frame.
+
+    Fields are merged per service, every caller gets the union of the fields
+    asked for. Keys over a service's limit are refused with a ValueError.
+
+    Requests sent through the `StreamingServices` methods are tracked too,
+    a `SUBS` from them replaces the keys of the service as it does on the
+    server.
+
+    Usage
+    ----
+        >>> subscriptions = stream_client.subscriptions
+        >>> subscriptions.subscribe("QUOTE", ["SPY", "QQQ"], fields=[0, 1, 2, 3])
+        >>> subscriptions.subscribe("QUOTE", ["IWM"])
+        >>> subscriptions.unsubscribe("QUOTE", ["QQQ"])
+        >>> subscriptions.get_keys("QUOTE")
+    """
+
+    def __init__(
+        self,
+        stream_client,
+        key_limits: dict[str, int] | None = None,
+        flush_window: float = 0.01,
+    ) -> None:
+        """
+        Parameters
+        ----
+        stream_client: StreamingApiClient
+            The client the requests are sent with.
+
+        key_limits: dict[str, int] (optional, Default=None)
+            Keys allowed per service, merged over `DEFAULT_KEY_LIMITS`.
+
+        flush_window: float (optional, Default=0.01)
+            Seconds changes are collected before they're sent.
+        """
+        self.stream_client = stream_client
+        self.key_limits = {**DEFAULT_KEY_LIMITS, **(key_limits or {})}
+        self.flush_window = flush_window
+
+        # What callers asked for and what was sent to the server
+        self.desired: dict[str, ServiceSubscription] = {}
+        self.active: dict[str, ServiceSubscription] = {}
+        self._dirty: set[str] = set()
+        self._flush_task = None
+        self.requests_sent = 0
+        # Parameters of the last QOS request, replayed after a restart
+        self.qos_parameters: dict | None = None
+
+        self.log = TdLogger(__name__).logger
+        self._log_debug_enabled = self.log.isEnabledFor(logging.DEBUG)
+
+    def get_key_limit(self, service: str) -> int:
+        return self.key_limits.get(service, DEFAULT_KEY_LIMIT)
+
+    def get_keys(self, service: str | Enum, active: bool = False) -> list[str]:
+        """The wanted keys of a service, or the ones sent with `active`."""
+        if isinstance(service, Enum):
+            service = service.value
+        subscription = (self.active if active else self.desired).get(service, None)
+        return list(subscription.keys) if subscription else []
+
+    def get_fields(self, service: str | Enum, active: bool = False) -> list[str]:
+        if isinstance(service, Enum):
+            service = service.value
+        subscription = (self.active if active else self.desired).get(service, None)
+        return list(subscription.fields) if subscription else []
+
+    def has_keys(self, service: str) -> bool:
+        """Whether keys of the service are still subscribed on the server."""
+        subscription = self.active.get(service, None)
+        return bool(subscription and subscription.keys)
+
+    def snapshot(self) -> list[dict]:
+        """The wanted state of every service."""
+        return [x.to_dict() for x in self.desired.values() if x.keys]
+
+    def has_subscriptions(self) -> bool:
+        return any(x.keys for x in self.desired.values())
+
+    # Changes
+
+    def _mark(self, service: str) -> None:
+        self._dirty.add(service)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._scheduled_flush())
+
+    async def _scheduled_flush(self) -> None:
+        # Let the callers of this loop iteration add their changes first
+        await asyncio.sleep(self.flush_window)
+        try:
+            await self._flush()
+        except Exception as e:
+            self.log.error(f"Subscription flush error: {e}")
+
+    async def _subscribe(
+        self,
+        service: str | Enum,
+        keys: list[str] | str,
+        fields: list[str] | list[int] | None = None,
+    ) -> None:
+        """Adds keys (and fields) to the wanted state of a service"""
+        if isinstance(service, Enum):
+            service = service.value
+        keys = _split(keys)
+        fields = _split(fields)
+
+        subscription = self.desired.get(service, None)
+        if subscription is None:
+            subscription = ServiceSubscription(service)
+        new_keys = [x for x in dict.fromkeys(keys) if x not in subscription.keys]
+        limit = self.get_key_limit(service)
+        if len(subscription.keys) + len(new_keys) > limit:
+            raise ValueError(
+                f"{service} is limited to {limit} keys, "
+                f"{len(subscription.keys)} subscribed and {len(new_keys)} new"
+            )
+
+        self.desired[service] = subscription
+        subscription.keys.update(dict.fromkeys(new_keys))
+        if fields and not set(fields) <= set(subscription.fields):
+            subscription.fields = _sort_fields((*subscription.fields, *fields))
+        self._mark(service)
+
+    def subscribe(
+        self,
+        service: str | Enum,
+        keys: list[str] | str,
+        fields: list[str] | list[int] | None = None,
+    ) -> None:
+        """
+        Adds keys to a service, fields are added to the service's fields.
+
+        Usage
+        ----
+            >>> stream_client.subscriptions.subscribe(
+                LevelOneServices.EQUITY, ["SPY"], fields=LevelOneEquityData.get_field_aliases()
+            )
+        """
+        return self.stream_client._run_threadsafe_wrapper(
+            self._subscribe, service, keys, fields
+        )
+
+    async def _unsubscribe(
+        self, service: str | Enum, keys: list[str] | str | None = None
+    ) -> None:
+        """Removes keys, or all of them, from the wanted state of a service"""
+        if isinstance(service, Enum):
+            service = service.value
+        subscription = self.desired.get(service, None)
+        if subscription is None:
+            return
+        if keys is None:
+            subscription.keys.clear()
+        else:
+            for key in _split(keys):
+                subscription.keys.pop(key, None)
+        self._mark(service)
+
+    def unsubscribe(self, service: str | Enum, keys: list[str] | str | None = None):
+        """
+        Removes keys from a service, the service is unsubscribed once no keys
+        are left.
+
+        Usage
+        ----
+            >>> stream_client.subscriptions.unsubscribe("QUOTE", ["QQQ"])
+            >>> stream_client.subscriptions.unsubscribe("QUOTE")
+        """
+        return self.stream_client._run_threadsafe_wrapper(
+            self._unsubscribe, service, keys
+        )
+
+    async def _set_fields(
+        self, service: str | Enum, fields: list[str] | list[int]
+    ) -> None:
+        """Replaces the fields of a service"""
+        if isinstance(service, Enum):
+            service = service.value
+        subscription = self.desired.setdefault(service, ServiceSubscription(service))
+        subscription.fields = _sort_fields(_split(fields))
+        self._mark(service)
+
+    def set_fields(self, service: str | Enum, fields: list[str] | list[int]):
+        """Replaces the fields of a service, sent as a `VIEW` if subscribed."""
+        return self.stream_client._run_threadsafe_wrapper(
+            self._set_fields, service, fields
+        )
+
+    # Diffing
+
+    def _request(self, service: str, command: str, keys=None, fields=None) -> dict:
+        request = self.stream_client.services.new_request_template()
+        request["service"] = service
+        request["command"] = command
+        if keys:
+            request["parameters"]["keys"] = ",".join(keys)
+        else:
+            del request["parameters"]["keys"]
+        if fields:
+            request["parameters"]["fields"] = ",".join(fields)
+        else:
+            del request["parameters"]["fields"]
+        return request
+
+    def diff(self, service: str) -> list[dict]:
+        """The requests that take the server from the active to the wanted state."""
+        desired = self.desired.get(service, None) or ServiceSubscription(service)
+        active = self.active.get(service, None)
+        SUBS = StreamApiCommands.SUBS.value
+
+        if not desired.keys:
+            if active is None or not active.keys:
+                return []
+            return [self._request(service, StreamApiCommands.UNSUBS.value)]
+
+        if active is None or not active.keys:
+            return [self._request(service, SUBS, desired.keys, desired.fields)]
+
+        requests = []
+        removed = [x for x in active.keys if x not in desired.keys]
+        added = [x for x in desired.keys if x not in active.keys]
+        if removed:
+            requests.append(
+                self._request(service, StreamApiCommands.UNSUBS.value, removed)
+            )
+        if desired.fields != active.fields:
+            requests.append(
+                self._request(service, StreamApiCommands.VIEW.value, fields=desired.fields)
+            )
+        if added:
+            requests.append(
+                self._request(service, StreamApiCommands.ADD.value, added, desired.fields)
+            )
+        return requests
+
+    def _apply(self, request: dict) -> None:
+        """Updates the active state with a request sent to the server"""
+        service = request["service"]
+        command = request["command"]
+        parameters = request.get("parameters", None) or {}
+        keys = _split(parameters.get("keys", None))
+        fields = _split(parameters.get("fields", None))
+
+        active = self.active.get(service, None)
+        if command == StreamApiCommands.SUBS.value:
+            self.active[service] = ServiceSubscription(service, keys, fields)
+        elif command == StreamApiCommands.ADD.value:
+            if active is None:
+                active = self.active[service] = ServiceSubscription(service)
+            active.keys.update(dict.fromkeys(keys))
+            if fields:
+                active.fields = _sort_fields(fields)
+        elif command == StreamApiCommands.UNSUBS.value:
+            if active is not None:
+                if keys:
+                    for key in keys:
+                        active.keys.pop(key, None)
+                else:
+                    active.keys.clear()
+                if not active.keys:
+                    del self.active[service]
+        elif command == StreamApiCommands.VIEW.value and active is not None:
+            active.fields = _sort_fields(fields)
+
+    def discard_active(self, service: str) -> None:
+        """Forgets what was sent for a service, e.g. after a failed `SUBS`."""
+        self.active.pop(service, None)
+
+    def observe(self, request: dict) -> None:
+        """
+        Tracks a request sent without the manager, the wanted state follows
+        it so the manager doesn't undo it.
+        """
+        service = request.get("service", None)
+        if service == "ADMIN" and request.get("command", None) == "QOS":
+            self.qos_parameters = dict(request.get("parameters", None) or {})
+            return
+        if service in UNMANAGED_SERVICES or service is None:
+            return
+        self._apply(request)
+        active = self.active.get(service, None)
+        self.desired[service] = active.copy() if active else ServiceSubscription(service)
+        self._dirty.discard(service)
+
+    async def _flush(self) -> list[int]:
+        """Sends the changes of every changed service in one frame"""
+        dirty, self._dirty = self._dirty, set()
+        requests = []
+        for service in dirty:
+            requests.extend(self.diff(service))
+        if not requests:
+            return []
+        for request in requests:
+            self._apply(request)
+        self.requests_sent += len(requests)
+        if self._log_debug_enabled:
+            self.log.debug(
+                f"Subscription changes - {[(r['service'], r['command']) for r in requests]}"
+            )
+        return await self.stream_client._add_data_requests(requests, observe=False)
+
+    def flush(self) -> list[int]:
+        """Sends the pending changes now, returns their request numbers."""
+        return self.stream_client._run_threadsafe_wrapper(self._flush)
+
+    async def _replay(self) -> list[int]:
+        """
+        Sends the whole wanted state (QOS and a `SUBS` per service) in one
+        frame, after a new connection logged in. Pending changes are part of
+        it.
+        """
+        self.active.clear()
+        self._dirty.clear()
+        requests = []
+        if self.qos_parameters is not None:
+            request = self.stream_client.services.new_request_template()
+            request["service"] = "ADMIN"
+            request["command"] = StreamApiCommands.QOS.value
+            request["parameters"] = dict(self.qos_parameters)
+            requests.append(request)
+        for service, desired in self.desired.items():
+            if desired.keys:
+                requests.append(
+                    self._request(
+                        service, StreamApiCommands.SUBS.value, desired.keys, desired.fields
+                    )
+                )
+        if not requests:
+            return []
+        for request in requests:
+            if request["service"] != "ADMIN":
+                self._apply(request)
+        self.requests_sent += len(requests)
+        return await self.stream_client._add_data_requests(requests, observe=False)
@@ -0,0 +1,81 @@
+import math
+import threading
+from collections import deque
+
+
+class LatencyStats:
+    """
+    Overview
+    ----
+    Collects latency samples (in milliseconds) and summarizes them. Counts,
+    min, max and mean cover every sample, percentiles are computed over the
+    most recent `max_samples`.
+
+    Usage
+    ----
+        >>> stats = LatencyStats()
+        >>> stats.add(1.25)
+        >>> stats.percentile(99)
+        >>> stats.summary()
+    """
+
+    __slots__ = ("count", "total", "min", "max", "_samples", "_lock")
+
+    def __init__(self, max_samples: int = 10000) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def add(self, value: float) -> None:
+        """Adds a single sample."""
+        with self._lock:
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if self.max is None or value > self.max:
+                self.max = value
+            self._samples.append(value)
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    @staticmethod
+    def _nearest_rank(samples: list, percent: float) -> float | None:
+        if not samples:
+            return None
+        rank = max(math.ceil(percent / 100 * len(samples)), 1)
+        return samples[min(rank, len(samples)) - 1]
+
+    def percentile(self, percent: float) -> float | None:
+        """Nearest rank percentile of the retained samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        return self._nearest_rank(samples, percent)
+
+    def summary(self, percentiles: tuple = (50, 90, 99)) -> dict:
+        """Returns count, min, mean, max and the requested percentiles."""
+        with self._lock:
+            samples = sorted(self._samples)
+            summary = {
+                "count": self.count,
+                "min": self.min,
+                "mean": self.total / self.count if self.count else None,
+                "max": self.max,
+            }
+        for percent in percentiles:
+            summary[f"p{percent}"] = self._nearest_rank(samples, percent)
+        return summary
+
+    def reset(self) -> None:
+        """Drops all samples."""
+        with self._lock:
+            self.count = 0
+            self.total = 0.0
+            self.min = None
+            self.max = None
+            self._samples.clear()
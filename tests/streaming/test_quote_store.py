@@ -0,0 +1,20 @@
+from td.streaming.quote_store import QuoteStore
+
+
+def test_grow_while_a_column_view_exists():
+    quote_store = QuoteStore(capacity=2)
+    quote_store.apply({"key": "SPY", "1": 470.1})
+    quote_store.apply({"key": "QQQ", "1": 410.2})
+
+    view = memoryview(quote_store.column("bid_price"))
+    quote_store.apply({"key": "IWM", "1": 195.3, "2": 195.4})
+
+    assert quote_store.symbols == ["SPY", "QQQ", "IWM"]
+    assert quote_store.capacity == 4
+    assert quote_store.get("IWM", "bid_price") == 195.3
+    assert quote_store.get("IWM", "ask_price") == 195.4
+    assert quote_store.get("SPY", "bid_price") == 470.1
+    assert all(len(column) == 4 for column in quote_store._columns)
+    # The old view still shows the column it was taken from
+    assert view.tolist() == [470.1, 410.2]
+    view.release()